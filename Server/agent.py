@@ -2,7 +2,8 @@ import os
 import json
 from datetime import datetime
 from flask import Blueprint, request, jsonify, current_app
-import requests
+import http_client
+from settings import invalidate_cached_settings
 
 
 agent_bp = Blueprint("agent_bp", __name__)
@@ -50,11 +51,13 @@ def build_prompt(user_text: str) -> str:
     )
 
 
-def call_gemini(prompt: str) -> str:
+GEMINI_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
+
+
+def gemini_request(prompt: str) -> tuple[dict, dict]:
     api_key = os.getenv("GOOGLE_API_KEY")
     if not api_key:
         raise RuntimeError("Missing GOOGLE_API_KEY")
-    url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
     headers = {"Content-Type": "application/json", "x-goog-api-key": api_key}
     payload = {
         "generationConfig": {
@@ -67,9 +70,10 @@ def call_gemini(prompt: str) -> str:
             }
         ]
     }
-    resp = requests.post(url, headers=headers, json=payload, timeout=30)
-    resp.raise_for_status()
-    data = resp.json()
+    return headers, payload
+
+
+def gemini_text(data: dict) -> str:
     try:
         text = data["candidates"][0]["content"]["parts"][0]["text"]
     except Exception:
@@ -77,7 +81,14 @@ def call_gemini(prompt: str) -> str:
     return text or "{}"
 
 
-def _parse_json_lenient(raw_text: str) -> dict:
+def call_gemini(prompt: str) -> str:
+    headers, payload = gemini_request(prompt)
+    resp = http_client.post(GEMINI_URL, headers=headers, json=payload, timeout=30)
+    resp.raise_for_status()
+    return gemini_text(resp.json())
+
+
+def parse_json_lenient(raw_text: str) -> dict:
     if not isinstance(raw_text, str):
         return {}
     text = (raw_text or "").strip()
@@ -103,9 +114,8 @@ def _parse_json_lenient(raw_text: str) -> dict:
         return {}
 
 
-def apply_intent(db, intent: str, params: dict) -> str:
-    coll = db["settings"]
-    doc = coll.find_one({"_id": "global"}) or {"_id": "global"}
+def build_intent_update(intent: str, params: dict) -> tuple[dict, str]:
+    """Maps an intent to a settings update; an empty update means ``msg`` is an error reply."""
     update = {}
     intent = (intent or "").strip()
 
@@ -117,30 +127,35 @@ def apply_intent(db, intent: str, params: dict) -> str:
         event_key = normalize_event_key(params.get("eventKey", ""))
         color = (params.get("color") or "").strip().lower()
         if not event_key:
-            return "Please specify which event (e.g., door knocking, baby crying)."
+            return {}, "Please specify which event (e.g., door knocking, baby crying)."
         if color not in SYSTEM_SCHEMA["colors"]:
-            return "Please choose a basic color like red, green, blue, or white."
+            return {}, "Please choose a basic color like red, green, blue, or white."
         update = {"$set": {f"colors.{event_key}": color}}
         msg = f"Set {event_key.replace('_',' ')} color to {color}."
     elif intent == "SetQuietHours":
         start = (params.get("start") or "").strip()
         end = (params.get("end") or "").strip()
         if not start or not end:
-            return "Please provide quiet hours like '21:00' to '07:00'."
+            return {}, "Please provide quiet hours like '21:00' to '07:00'."
         update = {"$set": {"quietHours": {"start": start, "end": end}}}
         msg = f"Quiet hours set from {start} to {end}."
     elif intent == "SetPriority":
         event_key = normalize_event_key(params.get("eventKey", ""))
         important = bool(params.get("important", True))
         if not event_key:
-            return "Please specify which event to prioritize."
+            return {}, "Please specify which event to prioritize."
         update = {"$set": {f"priorities.{event_key}": important}}
         msg = f"Priority for {event_key.replace('_',' ')} set to {important}."
     else:
-        return "Sorry, I couldn't understand that change. Try: 'turn off vibration' or 'set door knocking color to blue'."
+        return {}, "Sorry, I couldn't understand that change. Try: 'turn off vibration' or 'set door knocking color to blue'."
 
+    return update, msg
+
+
+def apply_intent(db, intent: str, params: dict) -> str:
+    update, msg = build_intent_update(intent, params)
     if update:
-        coll.update_one({"_id": "global"}, update, upsert=True)
+        db["settings"].update_one({"_id": "global"}, update, upsert=True)
     return msg
 
 
@@ -155,7 +170,7 @@ def command():
     try:
         prompt = build_prompt(text)
         raw = call_gemini(prompt)
-        parsed = _parse_json_lenient(raw)
+        parsed = parse_json_lenient(raw)
         if not isinstance(parsed, dict) or not parsed:
             raise ValueError("Model did not return valid JSON")
     except Exception as exc:
@@ -164,6 +179,7 @@ def command():
     intent = parsed.get("intent")
     params = parsed.get("params") or {}
     reply = apply_intent(db, intent, params)
+    invalidate_cached_settings()
     return jsonify({"ok": True, "answer": reply, "intent": intent, "params": params})
 
 
@@ -7,9 +7,14 @@ from flask_cors import CORS
 from pymongo import MongoClient
 from bson import ObjectId
 from events import events_bp
-from settings import settings_bp
+from settings import SettingsCache, settings_bp
 from weekly_reports import weekly_reports_bp
 from agent import agent_bp
+from cameras import cameras_bp
+from dedupe import EventDeduplicator
+from event_stream import EventBroadcaster
+from indexes import ensure_indexes
+from notifications import NOTIFY_WORKERS, NotificationWorker
 from flasgger import Swagger
 
 
@@ -31,6 +36,23 @@ def create_app():
     users = db["users"]
     app.config["DB"] = db
 
+    try:
+        ensure_indexes(db)
+    except Exception as exc:
+        print(f"[INDEXES] Could not ensure indexes: {exc}")
+
+    settings_cache = SettingsCache(db)
+    settings_cache.start()
+    app.config["SETTINGS_CACHE"] = settings_cache
+    app.config["EVENT_DEDUPER"] = EventDeduplicator(db)
+    app.config["EVENT_BROADCASTER"] = EventBroadcaster(db)
+
+    # NOTIFY_WORKERS=0 leaves the outbox to a standalone `python notifications.py`
+    if NOTIFY_WORKERS > 0:
+        notify_worker = NotificationWorker(db, threads=NOTIFY_WORKERS)
+        notify_worker.start()
+        app.config["NOTIFY_WORKER"] = notify_worker
+
     @app.route("/health", methods=["GET"])
     def health():
         """Service healthcheck
@@ -99,6 +121,7 @@ def create_app():
     app.register_blueprint(settings_bp, url_prefix="/settings")
     app.register_blueprint(weekly_reports_bp, url_prefix="/weekly_reports")
     app.register_blueprint(agent_bp, url_prefix="/agent")
+    app.register_blueprint(cameras_bp, url_prefix="/cameras")
 
     return app
 
@@ -0,0 +1,360 @@
+"""Async (ASGI) variant of api_server serving the same routes.
+
+Uses Motor for Mongo and httpx for Gemini so a single process can hold many
+concurrent detector and app connections. Run with:
+
+    uvicorn --factory asgi_server:create_app --host 0.0.0.0 --port 5000
+"""
+import os
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import timedelta
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+import http_client
+from agent import GEMINI_URL, build_intent_update, build_prompt, gemini_request, gemini_text, parse_json_lenient
+from cameras import build_camera_doc, serialize_camera
+from dedupe import EventDeduplicator
+from event_rollups import ROLLUPS_COLLECTION, rollup_id, serialize_rollup, weekly_summary
+from event_service import (
+    MAX_ROLLUP_BUCKETS,
+    EventPage,
+    EventStore,
+    StreamSession,
+    build_event_update,
+    build_list_query,
+    build_rollups_query,
+    create_event as ingest_event,
+    create_events_batch as ingest_batch,
+    find_page,
+    serialize_event,
+)
+from event_stream import (
+    HEARTBEAT_FRAME,
+    HEARTBEAT_SECONDS,
+    RETRY_FRAME,
+    SSE_HEADERS,
+    SUBSCRIBER_QUEUE_SIZE,
+    EventBroadcaster,
+)
+from indexes import ensure_indexes
+from notifications import NOTIFY_WORKERS, NotificationWorker
+from settings import AsyncSettingsCache, build_settings_update, serialize_settings
+from weekly_reports import build_reports_query, serialize_report, summary_week
+
+
+async def _json_body(request):
+    try:
+        return await request.json()
+    except Exception:
+        return None
+
+
+def _error(message: str, status: int) -> JSONResponse:
+    return JSONResponse({"ok": False, "message": message}, status_code=status)
+
+
+async def health(request):
+    return JSONResponse({"ok": True, "service": "auth", "ts": int(time.time())})
+
+
+async def db_health(request):
+    try:
+        await request.app.state.mongo.admin.command("ping")
+        return JSONResponse({"ok": True, "message": "MongoDB connection is healthy"})
+    except Exception as exc:
+        return _error(str(exc), 500)
+
+
+async def register_fcm(request):
+    data = await _json_body(request) or {}
+    uid = (data.get("uid") or "").strip()
+    token = (data.get("token") or "").strip()
+    if not uid or not token:
+        return _error("Missing uid or token", 400)
+    try:
+        await request.app.state.db["users"].update_one(
+            {"_id": ObjectId(uid)},
+            {"$addToSet": {"fcmTokens": token}},
+        )
+        return JSONResponse({"ok": True})
+    except Exception as exc:
+        return _error(str(exc), 500)
+
+
+async def _stream_events(cursor, page: EventPage):
+    yield page.open()
+    async for doc in cursor:
+        chunk = page.add(doc)
+        if chunk is None:
+            break
+        yield chunk
+    yield page.close()
+
+
+async def list_events(request):
+    try:
+        q, limit = build_list_query(request.query_params)
+    except ValueError as exc:
+        return _error(str(exc), 400)
+    cursor = find_page(request.app.state.db["events"], q, limit)
+    return StreamingResponse(_stream_events(cursor, EventPage(limit)), media_type="application/json")
+
+
+def _put_drop_oldest(pending: asyncio.Queue, doc: dict):
+    if pending.full():
+        pending.get_nowait()
+    pending.put_nowait(doc)
+
+
+async def stream_events(request):
+    state = request.app.state
+    uid = (request.query_params.get("uid") or "").strip()
+    last_event_id = (request.headers.get("last-event-id") or request.query_params.get("lastEventId") or "").strip()
+    session = StreamSession(uid, last_event_id)
+
+    loop = asyncio.get_running_loop()
+    pending: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    # The broadcaster thread hands events over to this connection's loop
+    sub_id = state.broadcaster.subscribe(uid, lambda doc: loop.call_soon_threadsafe(_put_drop_oldest, pending, doc))
+
+    async def generate():
+        try:
+            yield RETRY_FRAME
+            replay = session.replay_cursor(state.db["events"])
+            if replay is not None:
+                async for doc in replay:
+                    yield session.replayed(doc)
+            while True:
+                try:
+                    doc = await asyncio.wait_for(pending.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield HEARTBEAT_FRAME
+                    continue
+                frame = session.live(doc)
+                if frame is not None:
+                    yield frame
+        finally:
+            state.broadcaster.unsubscribe(sub_id)
+
+    return StreamingResponse(generate(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+async def _load_settings(state) -> dict:
+    try:
+        return await state.settings_cache.get()
+    except Exception:
+        return {}
+
+
+async def create_event(request):
+    state = request.app.state
+    data = await _json_body(request) or {}
+    settings_doc = await _load_settings(state)
+    # Ingest is blocking pymongo code; run it off the event loop like Motor does
+    body, status = await asyncio.to_thread(ingest_event, state.event_store, data, settings_doc)
+    return JSONResponse(body, status_code=status)
+
+
+async def create_events_batch(request):
+    state = request.app.state
+    data = await _json_body(request)
+    settings_doc = await _load_settings(state)
+    body, status = await asyncio.to_thread(ingest_batch, state.event_store, data, settings_doc)
+    return JSONResponse(body, status_code=status)
+
+
+async def update_event(request):
+    coll = request.app.state.db["events"]
+    try:
+        oid = ObjectId(request.path_params["event_id"])
+    except Exception:
+        return _error("Invalid id", 400)
+
+    try:
+        update = build_event_update(await _json_body(request) or {})
+    except ValueError as exc:
+        return _error(str(exc), 400)
+    if not update:
+        return _error("Nothing to update", 400)
+
+    await coll.update_one({"_id": oid}, {"$set": update})
+    after = await coll.find_one({"_id": oid})
+    if not after:
+        return _error("Not found", 404)
+    return JSONResponse({"ok": True, "event": serialize_event(after)})
+
+
+async def list_rollups(request):
+    try:
+        q = build_rollups_query(request.query_params)
+    except ValueError as exc:
+        return _error(str(exc), 400)
+    docs = await request.app.state.db[ROLLUPS_COLLECTION].find(q).sort("bucketStart", 1).to_list(MAX_ROLLUP_BUCKETS)
+    return JSONResponse({"ok": True, "rollups": [serialize_rollup(d) for d in docs]})
+
+
+async def get_settings(request):
+    doc = await request.app.state.settings_cache.get()
+    return JSONResponse({"ok": True, "settings": serialize_settings(doc)})
+
+
+async def save_settings(request):
+    state = request.app.state
+    try:
+        update_fields = build_settings_update(await _json_body(request) or {})
+    except ValueError as exc:
+        return _error(str(exc), 400)
+    await state.db["settings"].update_one({"_id": "global"}, {"$set": update_fields}, upsert=True)
+    state.settings_cache.invalidate()
+    return JSONResponse({"ok": True})
+
+
+async def list_weekly_reports(request):
+    coll = request.app.state.db["weekly_reports"]
+    user_id = (request.query_params.get("userId") or "").strip()
+    email = (request.query_params.get("email") or "").strip().lower()
+    query = build_reports_query(user_id, email)
+
+    items = await coll.find(query).sort("createdAt", -1).to_list(None)
+    if not items:
+        items = await coll.find({}).sort("createdAt", -1).limit(20).to_list(None)
+    return JSONResponse({"ok": True, "reports": [serialize_report(x) for x in items]})
+
+
+async def weekly_report_summary(request):
+    try:
+        uid, week_start = summary_week(request.query_params)
+    except ValueError as exc:
+        return _error(str(exc), 400)
+    coll = request.app.state.db[ROLLUPS_COLLECTION]
+    current = await coll.find_one({"_id": rollup_id(uid, "week", week_start)})
+    previous = await coll.find_one({"_id": rollup_id(uid, "week", week_start - timedelta(days=7))})
+    return JSONResponse({"ok": True, "summary": weekly_summary(uid, week_start, current, previous)})
+
+
+async def agent_command(request):
+    state = request.app.state
+    data = await _json_body(request) or {}
+    text = (data.get("question") or data.get("command") or "").strip()
+    if not text:
+        return _error("Missing question/command", 400)
+
+    try:
+        headers, payload = gemini_request(build_prompt(text))
+        resp = await state.http.post(GEMINI_URL, headers=headers, json=payload, timeout=30)
+        resp.raise_for_status()
+        parsed = parse_json_lenient(gemini_text(resp.json()))
+        if not isinstance(parsed, dict) or not parsed:
+            raise ValueError("Model did not return valid JSON")
+    except Exception as exc:
+        return _error(f"Parsing error: {exc}", 400)
+
+    intent = parsed.get("intent")
+    params = parsed.get("params") or {}
+    update, reply = build_intent_update(intent, params)
+    if update:
+        await state.db["settings"].update_one({"_id": "global"}, update, upsert=True)
+    state.settings_cache.invalidate()
+    return JSONResponse({"ok": True, "answer": reply, "intent": intent, "params": params})
+
+
+async def list_cameras(request):
+    docs = await request.app.state.db["cameras"].find({}).sort("_id", 1).to_list(None)
+    return JSONResponse({"ok": True, "cameras": [serialize_camera(d) for d in docs]})
+
+
+async def save_camera(request):
+    camera_id = request.path_params["camera_id"].strip()
+    try:
+        fields = build_camera_doc(camera_id, await _json_body(request) or {})
+    except ValueError as exc:
+        return _error(str(exc), 400)
+    coll = request.app.state.db["cameras"]
+    await coll.update_one({"_id": camera_id}, {"$set": fields}, upsert=True)
+    return JSONResponse({"ok": True, "camera": serialize_camera(await coll.find_one({"_id": camera_id}))})
+
+
+async def delete_camera(request):
+    res = await request.app.state.db["cameras"].delete_one({"_id": request.path_params["camera_id"]})
+    if res.deleted_count == 0:
+        return _error("Not found", 404)
+    return JSONResponse({"ok": True})
+
+
+ROUTES = [
+    Route("/health", health, methods=["GET"]),
+    Route("/db/health", db_health, methods=["GET"]),
+    Route("/auth/register-fcm", register_fcm, methods=["POST"]),
+    Route("/events/", list_events, methods=["GET"]),
+    Route("/events/", create_event, methods=["POST"]),
+    Route("/events/batch", create_events_batch, methods=["POST"]),
+    Route("/events/stream", stream_events, methods=["GET"]),
+    Route("/events/rollups", list_rollups, methods=["GET"]),
+    Route("/events/{event_id}", update_event, methods=["PATCH"]),
+    Route("/settings/", get_settings, methods=["GET"]),
+    Route("/settings/", save_settings, methods=["POST"]),
+    Route("/weekly_reports/", list_weekly_reports, methods=["GET"]),
+    Route("/weekly_reports/summary", weekly_report_summary, methods=["GET"]),
+    Route("/agent/command", agent_command, methods=["POST"]),
+    Route("/cameras/", list_cameras, methods=["GET"]),
+    Route("/cameras/{camera_id}", save_camera, methods=["PUT"]),
+    Route("/cameras/{camera_id}", delete_camera, methods=["DELETE"]),
+]
+
+
+def create_app() -> Starlette:
+    mongodb_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
+    db_name = os.getenv("DB_NAME", "hearyou")
+
+    @asynccontextmanager
+    async def lifespan(app):
+        state = app.state
+        state.mongo = AsyncIOMotorClient(mongodb_uri)
+        state.db = state.mongo[db_name]
+        state.http = http_client.build_async_client()
+
+        # Index bootstrap, the outbox worker and event ingest (in worker
+        # threads, see create_event) use the sync driver.
+        sync_db = MongoClient(mongodb_uri)[db_name]
+        try:
+            ensure_indexes(sync_db)
+        except Exception as exc:
+            print(f"[INDEXES] Could not ensure indexes: {exc}")
+        state.notify_worker = None
+        if NOTIFY_WORKERS > 0:
+            state.notify_worker = NotificationWorker(sync_db, threads=NOTIFY_WORKERS)
+            state.notify_worker.start()
+
+        state.settings_cache = AsyncSettingsCache(state.db)
+        state.settings_cache.start()
+        state.event_store = EventStore(sync_db, EventDeduplicator(sync_db), state.notify_worker)
+        state.broadcaster = EventBroadcaster(sync_db)
+        try:
+            yield
+        finally:
+            state.broadcaster.stop()
+            await state.settings_cache.stop()
+            if state.notify_worker is not None:
+                state.notify_worker.stop(timeout=5)
+            await state.http.aclose()
+            state.mongo.close()
+            sync_db.client.close()
+
+    middleware = [Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])]
+    return Starlette(routes=ROUTES, middleware=middleware, lifespan=lifespan)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run("asgi_server:create_app", factory=True, host="0.0.0.0", port=int(os.getenv("PORT", "5000")))
@@ -1,96 +1,116 @@
 import os
 import time
-import requests
-import sounddevice as sd
+import argparse
+import threading
 import numpy as np
-import tensorflow as tf
-import tensorflow_hub as hub
 from datetime import datetime
 
-print("🔄 Loading YAMNet model...")
-yamnet_model = hub.load("https://tfhub.dev/google/yamnet/1")
-print("✅ Model loaded!")
-
-class_map_path = yamnet_model.class_map_path().numpy().decode("utf-8")
-class_names = []
-with open(class_map_path, "r") as f:
-    next(f)
-    for line in f:
-        parts = line.strip().split(",")
-        if len(parts) >= 3:
-            class_names.append(parts[2])
+from event_spool import spool_event
+from audio_stream import AudioRingBuffer, MicrophoneSource, WavFileSource, iter_windows
+from audio_backends import BACKEND, load_backend
+from audio_gate import GATE_MODE, AudioGate
+from audio_events import DEFAULT_THRESHOLD, EVENT_KEYS, EVENT_THRESHOLDS, EVENT_TOKENS, EventSmoother, triggered
+from inference_server import INFERENCE_ADDR, InferenceClient
 
 SAMPLE_RATE = 16000
-DURATION = 1.0
-CONF_THRESHOLD = 0.3
+WINDOW_SECONDS = float(os.getenv("AUDIO_WINDOW_SECONDS", "0.96"))  # one YAMNet patch
+HOP_SECONDS = float(os.getenv("AUDIO_HOP_SECONDS", "0.48"))
+RING_SECONDS = 10.0
+CONF_THRESHOLD = DEFAULT_THRESHOLD  # per event: AUDIO_EVENT_THRESHOLDS="baby crying=0.35,doorbell=0.3"
 COOLDOWN_SECONDS = 120.0
-HISTORY_LEN = 5
-
-API_BASE = os.getenv("API_BASE", "http://localhost:5000")
-
-BABY_TOKENS = ["baby", "infant", "cry", "crying", "whimper", "wail", "scream", "sob"]
-DOOR_TOKENS = ["door", "doorbell", "door bell", "knock", "knocking"]
-
-def record_audio(duration, sample_rate):
-    audio = sd.rec(
-        int(duration * sample_rate),
-        samplerate=sample_rate,
-        channels=1,
-        dtype="float32"
-    )
-    sd.wait()
-    return np.squeeze(audio)
+HISTORY_LEN = int(os.getenv("AUDIO_HISTORY_LEN", "5"))  # windows smoothed before thresholding
 
-def predict(audio_data):
-    scores, embeddings, spectrogram = yamnet_model(audio_data)
-    mean_scores = np.mean(scores.numpy(), axis=0)
-    top_index = np.argmax(mean_scores)
-    return class_names[top_index], mean_scores[top_index]
+SILENCE = np.zeros(len(EVENT_KEYS), dtype=np.float32)
 
 def post_event(title: str, event_dt: float):
     try:
-        iso_time = datetime.utcfromtimestamp(event_dt).isoformat()
-        resp = requests.post(
-            f"{API_BASE}/events/",
-            json={"title": title, "eventAt": iso_time},
-            timeout=5,
-        )
-        if resp.status_code not in (200, 201):
-            print(f"[❌] Failed to post event: {resp.status_code} {resp.text}")
+        spool_event(title, datetime.utcfromtimestamp(event_dt).isoformat())
     except Exception as exc:
-        print(f"[⚠️] Error posting event: {exc}")
-
-print("🎤 Starting continuous audio detection... Press Ctrl+C to stop.")
-
-last_sent = {"baby crying": 0.0, "doorbell": 0.0}
+        print(f"[⚠️] Could not spool event: {exc}")
 
 def classify_title(label_lc: str) -> str | None:
-    if any(tok in label_lc for tok in BABY_TOKENS):
-        return "baby crying"
-    if any(tok in label_lc for tok in DOOR_TOKENS):
-        return "doorbell"
+    """Event for a single top-class label (the pre-matrix rule, kept for comparisons)."""
+    for key, tokens in EVENT_TOKENS.items():
+        if any(tok in label_lc for tok in tokens):
+            return key
     return None
 
-try:
-    while True:
-        audio_chunk = record_audio(DURATION, SAMPLE_RATE)
-        audio_tensor = tf.convert_to_tensor(audio_chunk, dtype=tf.float32)
-
-        class_name, confidence = predict(audio_tensor)
-        lc = class_name.lower()
-        now_ts = time.time()
-
-        print(f"Detected: {class_name} | Confidence: {confidence:.2f}")
-
-        if confidence >= CONF_THRESHOLD:
-            title = classify_title(lc)
-            if title is not None:
-                if now_ts - last_sent.get(title, 0) > COOLDOWN_SECONDS:
-                    post_event(title, now_ts)
-                    print(f"✅ Event saved: {title}")
-                    last_sent[title] = now_ts
-
-        time.sleep(0.1)
-
-except KeyboardInterrupt:
-    print("\n🛑 Stopped by user.")
+def handle_window(predictor, gate: AudioGate, audio_chunk: np.ndarray, smoother: EventSmoother, last_sent: dict):
+    gate.maybe_report()
+    if not gate.should_run(audio_chunk):
+        # Nothing audible: count the window as silence so the history decays
+        smoother.update(SILENCE)
+        return
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    try:
+        class_name, confidence, events = predictor.classify(audio_chunk)
+    except OSError as exc:
+        print(f"[⚠️] Inference failed: {exc}")
+        return
+    gate.record_inference(time.process_time() - cpu_start, time.perf_counter() - wall_start)
+    smoothed = smoother.update(events)
+    now_ts = time.time()
+
+    scores = ", ".join(f"{key} {score:.2f}" for key, score in zip(EVENT_KEYS, smoothed))
+    print(f"Detected: {class_name} | Confidence: {confidence:.2f} | {scores}")
+
+    for title in triggered(smoothed, EVENT_THRESHOLDS):
+        if now_ts - last_sent.get(title, 0) > COOLDOWN_SECONDS:
+            post_event(title, now_ts)
+            print(f"✅ Event saved: {title}")
+            last_sent[title] = now_ts
+
+
+def inference_worker(predictor, gate: AudioGate, ring: AudioRingBuffer, source, stop_event: threading.Event):
+    last_sent = {key: 0.0 for key in EVENT_KEYS}
+    smoother = EventSmoother(HISTORY_LEN)
+    window = int(WINDOW_SECONDS * SAMPLE_RATE)
+    hop = int(HOP_SECONDS * SAMPLE_RATE)
+    for _, audio_chunk in iter_windows(ring, window, hop, stop_event, source):
+        handle_window(predictor, gate, audio_chunk, smoother, last_sent)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Continuous YAMNet audio event detection")
+    parser.add_argument("--wav", help="replay a WAV file instead of the microphone")
+    parser.add_argument("--fast", action="store_true", help="replay --wav as fast as inference allows")
+    parser.add_argument(
+        "--server", nargs="?", const=INFERENCE_ADDR,
+        help=f"classify on a shared inference_server.py (default {INFERENCE_ADDR}) instead of loading YAMNet here",
+    )
+    parser.add_argument("--backend", choices=["tf", "tflite"], default=BACKEND)
+    parser.add_argument("--model", help="SavedModel directory (tf) or .tflite file (tflite)")
+    parser.add_argument("--gate", choices=["off", "rms", "vad", "flux"], default=GATE_MODE)
+    args = parser.parse_args()
+
+    if args.server:
+        predictor = InferenceClient(args.server)
+    else:
+        predictor = load_backend(args.backend, args.model)
+
+    ring = AudioRingBuffer(int(RING_SECONDS * SAMPLE_RATE))
+    if args.wav:
+        source = WavFileSource(ring, args.wav, SAMPLE_RATE, realtime=not args.fast)
+    else:
+        source = MicrophoneSource(ring, SAMPLE_RATE)
+
+    gate = AudioGate(args.gate)
+    stop_event = threading.Event()
+    worker = threading.Thread(target=inference_worker, args=(predictor, gate, ring, source, stop_event), name="inference", daemon=True)
+
+    print("🎤 Starting continuous audio detection... Press Ctrl+C to stop.")
+    source.start()
+    worker.start()
+    try:
+        while worker.is_alive():
+            worker.join(0.5)
+    except KeyboardInterrupt:
+        print("\n🛑 Stopped by user.")
+    finally:
+        stop_event.set()
+        source.stop()
+        gate.maybe_report(every=0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Inference backends for the audio detector.
+
+    tf      full TensorFlow SavedModel YAMNet (yamnet.YamnetModel)
+    tflite  any waveform-in, scores-out .tflite model through tflite-runtime,
+            e.g. a float16/int8 YAMNet or the app's baby_cry_model.tflite
+
+Every backend turns a mono 16 kHz float32 window into per-frame class
+scores; predict() and classify() are built on top of that.
+"""
+import os
+import json
+import zipfile
+
+import numpy as np
+
+from audio_events import EventIndex
+
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+BACKEND = os.getenv("AUDIO_BACKEND", "tf")
+YAMNET_MODEL_DIR = os.getenv("YAMNET_MODEL_DIR", os.path.join(MODELS_DIR, "yamnet"))
+CLASS_CACHE_FILE = "class_names.json"
+TFLITE_MODEL = os.getenv("AUDIO_TFLITE_MODEL", os.path.join(MODELS_DIR, "yamnet.tflite"))
+TFLITE_THREADS = int(os.getenv("AUDIO_TFLITE_THREADS", "2"))
+FRAME_HOP_SAMPLES = 7680  # 0.48 s, matches YAMNet's patch hop
+
+# Used when a single-output model carries no label list of its own
+BABY_CRY_LABEL = "Baby cry, infant cry"
+
+
+class AudioBackend:
+    name = "base"
+    class_names: list[str] = []
+    _event_index: EventIndex | None = None
+
+    def scores(self, samples: np.ndarray) -> np.ndarray:
+        """Class scores per frame, shape (frames, classes)."""
+        raise NotImplementedError
+
+    def _top(self, mean_scores: np.ndarray) -> tuple[str, float]:
+        top_index = int(np.argmax(mean_scores))
+        return self.class_names[top_index], float(mean_scores[top_index])
+
+    @property
+    def event_index(self) -> EventIndex:
+        if self._event_index is None:
+            self._event_index = EventIndex(self.class_names)
+        return self._event_index
+
+    def predict(self, samples: np.ndarray) -> tuple[str, float]:
+        return self._top(np.mean(self.scores(samples), axis=0))
+
+    def _classify_rows(self, class_scores: np.ndarray) -> list[tuple[str, float, np.ndarray]]:
+        events = self.event_index.event_scores(class_scores)
+        return [(*self._top(row), ev) for row, ev in zip(class_scores, events)]
+
+    def classify(self, samples: np.ndarray) -> tuple[str, float, np.ndarray]:
+        """Top class, its score and the event score vector (audio_events.EVENT_KEYS order)."""
+        return self._classify_rows(np.mean(self.scores(samples), axis=0, keepdims=True))[0]
+
+    def classify_batch(self, windows: list[np.ndarray]) -> list[tuple[str, float, np.ndarray]]:
+        return [self.classify(w) for w in windows]
+
+
+def _load_interpreter(model_path: str, num_threads: int):
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        try:
+            from ai_edge_litert.interpreter import Interpreter
+        except ImportError:
+            # Full TensorFlow ships the same interpreter
+            from tensorflow.lite import Interpreter
+    return Interpreter(model_path=model_path, num_threads=num_threads)
+
+
+def _read_labels(model_path: str, num_classes: int) -> list[str]:
+    # 1. label file packed into the model's metadata (TF-Hub/Model Maker models)
+    try:
+        with zipfile.ZipFile(model_path) as zf:
+            for name in zf.namelist():
+                if name.endswith(".txt") or name.endswith(".csv"):
+                    lines = [ln.strip() for ln in zf.read(name).decode("utf-8").splitlines() if ln.strip()]
+                    if name.endswith(".csv"):
+                        lines = [ln.split(",")[-1].strip('"') for ln in lines[1:]]
+                    if len(lines) == num_classes:
+                        return lines
+    except (zipfile.BadZipFile, OSError):
+        pass
+    # 2. labels file next to the model, one per line
+    for path in (os.path.splitext(model_path)[0] + ".labels.txt", os.path.splitext(model_path)[0] + ".txt"):
+        try:
+            with open(path, "r") as f:
+                lines = [ln.strip() for ln in f if ln.strip()]
+            if len(lines) == num_classes:
+                return lines
+        except OSError:
+            pass
+    # 3. a YAMNet-sized head shares the SavedModel store's cached class list
+    if num_classes == 521:
+        try:
+            with open(os.path.join(YAMNET_MODEL_DIR, CLASS_CACHE_FILE), "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            pass
+    if num_classes == 1:
+        return [BABY_CRY_LABEL]
+    return [f"class_{i}" for i in range(num_classes)]
+
+
+class TFLiteBackend(AudioBackend):
+    """Runs a .tflite audio classifier, dequantizing int8 inputs and outputs.
+
+    Fixed-length models (YAMNet takes 15600 samples) see the window cut into
+    0.48 s-hop frames, zero-padded like YAMNet pads a short waveform; the
+    frame scores are then averaged by predict() like the full model's patches.
+    """
+
+    name = "tflite"
+
+    def __init__(self, model_path: str = TFLITE_MODEL, num_threads: int = TFLITE_THREADS):
+        if not os.path.isfile(model_path) or os.path.getsize(model_path) == 0:
+            raise RuntimeError(f"No TFLite model at {model_path}")
+        self.model_path = model_path
+        self.interpreter = _load_interpreter(model_path, num_threads)
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+
+        shape = [int(d) for d in self.input["shape"]]
+        self.input_rank = len(shape)
+        self.input_length = shape[-1] if shape and shape[-1] > 0 else None
+        num_classes = int(self.output["shape"][-1])
+        self.class_names = _read_labels(model_path, num_classes)
+        self._resized_to = None
+
+        print(
+            f"✅ TFLite model {os.path.basename(model_path)}: input {shape} {np.dtype(self.input['dtype']).name}, "
+            f"{num_classes} classes"
+        )
+
+    def _quantize(self, frame: np.ndarray) -> np.ndarray:
+        dtype = self.input["dtype"]
+        scale, zero_point = self.input.get("quantization", (0.0, 0))
+        if np.issubdtype(dtype, np.integer) and scale:
+            info = np.iinfo(dtype)
+            frame = np.clip(np.round(frame / scale + zero_point), info.min, info.max)
+        return frame.astype(dtype)
+
+    def _dequantize(self, out: np.ndarray) -> np.ndarray:
+        scale, zero_point = self.output.get("quantization", (0.0, 0))
+        if np.issubdtype(out.dtype, np.integer) and scale:
+            return (out.astype(np.float32) - zero_point) * scale
+        return out.astype(np.float32)
+
+    def _frames(self, samples: np.ndarray) -> list[np.ndarray]:
+        if self.input_length is None:
+            return [samples]
+        n = self.input_length
+        if len(samples) <= n:
+            return [np.pad(samples, (0, n - len(samples)))]
+        return [samples[i:i + n] for i in range(0, len(samples) - n + 1, FRAME_HOP_SAMPLES)]
+
+    def _invoke(self, frame: np.ndarray) -> np.ndarray:
+        if self.input_length is None and self._resized_to != len(frame):
+            shape = [len(frame)] if self.input_rank == 1 else [1, len(frame)]
+            self.interpreter.resize_tensor_input(self.input["index"], shape)
+            self.interpreter.allocate_tensors()
+            self._resized_to = len(frame)
+        data = self._quantize(frame)
+        if self.input_rank > 1:
+            data = data.reshape(1, -1)
+        self.interpreter.set_tensor(self.input["index"], data)
+        self.interpreter.invoke()
+        out = self._dequantize(self.interpreter.get_tensor(self.output["index"]))
+        return out.reshape(-1, out.shape[-1])
+
+    def scores(self, samples: np.ndarray) -> np.ndarray:
+        samples = np.asarray(samples, dtype=np.float32)
+        return np.concatenate([self._invoke(f) for f in self._frames(samples)], axis=0)
+
+
+def load_backend(name: str = BACKEND, model_path: str | None = None) -> AudioBackend:
+    if name == "tf":
+        from yamnet import YamnetModel
+
+        return YamnetModel(model_path or YAMNET_MODEL_DIR)
+    if name == "tflite":
+        return TFLiteBackend(model_path or TFLITE_MODEL)
+    raise ValueError(f"Unknown audio backend: {name}")
@@ -0,0 +1,85 @@
+"""Map classifier scores onto the detector's event keys.
+
+The class list is scanned for event tokens once, into a (classes, events)
+0/1 matrix; each window's event scores are then one matrix product over the
+full score vector, so several related classes (e.g. "Baby cry, infant cry"
+and "Crying, sobbing") add up even when neither is the top class.
+"""
+import os
+
+import numpy as np
+
+
+EVENT_TOKENS = {
+    "baby crying": ["baby", "infant", "cry", "crying", "whimper", "wail", "scream", "sob"],
+    "doorbell": ["door", "doorbell", "door bell", "knock", "knocking"],
+}
+EVENT_KEYS = list(EVENT_TOKENS)
+DEFAULT_THRESHOLD = 0.3
+# Impulsive events (a knock or a chime lasts a window or two) are smoothed
+# with a peak hold instead of a mean, so the quiet windows around them do not
+# dilute the score below threshold.
+PEAK_EVENTS = [key.strip() for key in os.getenv("AUDIO_PEAK_EVENTS", "doorbell").split(",") if key.strip()]
+
+
+def parse_thresholds(spec: str, default: float = DEFAULT_THRESHOLD) -> dict[str, float]:
+    """``"baby crying=0.35,doorbell=0.25"`` -> per-event thresholds, unspecified ones at ``default``."""
+    thresholds = {key: default for key in EVENT_KEYS}
+    for part in (spec or "").split(","):
+        key, sep, value = part.partition("=")
+        if sep and key.strip() in thresholds:
+            try:
+                thresholds[key.strip()] = float(value)
+            except ValueError:
+                pass
+    return thresholds
+
+
+EVENT_THRESHOLDS = parse_thresholds(os.getenv("AUDIO_EVENT_THRESHOLDS", ""))
+
+
+class EventIndex:
+    def __init__(self, class_names: list[str], event_tokens: dict[str, list[str]] = EVENT_TOKENS):
+        self.keys = list(event_tokens)
+        self.matrix = np.zeros((len(class_names), len(self.keys)), dtype=np.float32)
+        for i, name in enumerate(class_names):
+            lc = name.lower()
+            for j, key in enumerate(self.keys):
+                if any(tok in lc for tok in event_tokens[key]):
+                    self.matrix[i, j] = 1.0
+
+    def event_scores(self, class_scores: np.ndarray) -> np.ndarray:
+        """Event scores for one (classes,) vector or a (windows, classes) batch.
+
+        Classifier scores are independent sigmoids, so the summed mass is
+        capped at 1.
+        """
+        return np.minimum(np.asarray(class_scores, dtype=np.float32) @ self.matrix, 1.0)
+
+
+class EventSmoother:
+    """Smooths event scores over the last ``history_len`` windows.
+
+    Sustained events (crying) take the running mean, which rides out a
+    window or two of misclassification; events in ``peak_events`` take the
+    maximum, which holds a short burst for the whole history instead of
+    averaging it away.
+    """
+
+    def __init__(self, history_len: int, keys: list[str] = EVENT_KEYS, peak_events: list[str] = PEAK_EVENTS):
+        self.history = np.zeros((max(1, history_len), len(keys)), dtype=np.float32)
+        self.peak = np.array([key in peak_events for key in keys], dtype=bool)
+        self.count = 0
+
+    def update(self, scores: np.ndarray) -> np.ndarray:
+        self.history[self.count % len(self.history)] = scores
+        self.count += 1
+        recent = self.history[:min(self.count, len(self.history))]
+        return np.where(self.peak, recent.max(axis=0), recent.mean(axis=0))
+
+    def reset(self):
+        self.count = 0
+
+
+def triggered(smoothed: np.ndarray, thresholds: dict[str, float] = EVENT_THRESHOLDS, keys: list[str] = EVENT_KEYS) -> list[str]:
+    return [key for key, score in zip(keys, smoothed) if score >= thresholds.get(key, DEFAULT_THRESHOLD)]
@@ -0,0 +1,143 @@
+"""Cheap activity gate in front of the audio classifier.
+
+    rms   window level against an adaptive noise floor
+    vad   share of 10 ms frames above the floor (catches short knocks that
+          barely move a 0.96 s average), WebRTC-VAD style
+    flux  spectral flux onsets (or a level jump), for steady background noise
+          with events on top
+    off   run the model on every window
+
+Levels are dBFS. The floor follows quiet stretches down immediately and
+creeps up slowly, so a fan switching on reopens the gate only for a while.
+After the gate opens it stays open for AUDIO_GATE_HANGOVER more windows so
+an event's tail and the event smoother still see model output.
+"""
+import os
+import time
+
+import numpy as np
+
+
+GATE_MODE = os.getenv("AUDIO_GATE", "rms")
+GATE_MARGIN_DB = float(os.getenv("AUDIO_GATE_MARGIN_DB", "10"))
+GATE_MIN_DB = float(os.getenv("AUDIO_GATE_MIN_DB", "-65"))  # never run below this level
+GATE_FLUX = float(os.getenv("AUDIO_GATE_FLUX", "0.6"))
+GATE_VAD_RATIO = float(os.getenv("AUDIO_GATE_VAD_RATIO", "0.03"))  # 3 of ~96 frames
+GATE_HANGOVER = int(os.getenv("AUDIO_GATE_HANGOVER", "3"))
+GATE_REPORT_SECONDS = float(os.getenv("AUDIO_GATE_REPORT_SECONDS", "300"))
+
+FLOOR_RISE_DB = 0.1  # per quiet window (~12 dB/min at a 0.48 s hop)
+VAD_FRAME = 160  # 10 ms at 16 kHz
+FLUX_FRAME = 512
+FLUX_HOP = 256
+EPS = 1e-10
+
+
+def level_db(samples: np.ndarray) -> float:
+    return float(10.0 * np.log10(np.mean(np.square(samples, dtype=np.float32)) + EPS))
+
+
+def frame_levels_db(samples: np.ndarray, frame: int = VAD_FRAME) -> np.ndarray:
+    n = len(samples) // frame
+    frames = samples[:n * frame].reshape(n, frame)
+    return 10.0 * np.log10(np.mean(np.square(frames, dtype=np.float32), axis=1) + EPS)
+
+
+def spectral_flux(samples: np.ndarray) -> float:
+    """Largest frame-to-frame rise in magnitude spectrum, relative to the mean spectrum."""
+    n = 1 + (len(samples) - FLUX_FRAME) // FLUX_HOP
+    if n < 2:
+        return 0.0
+    idx = np.arange(FLUX_FRAME)[None, :] + FLUX_HOP * np.arange(n)[:, None]
+    mags = np.abs(np.fft.rfft(samples[idx] * np.hanning(FLUX_FRAME).astype(np.float32), axis=1))
+    rise = np.maximum(np.diff(mags, axis=0), 0.0).sum(axis=1)
+    return float(rise.max() / (mags.sum(axis=1).mean() + EPS))
+
+
+class AudioGate:
+    def __init__(self, mode: str = GATE_MODE, margin_db: float = GATE_MARGIN_DB, hangover: int = GATE_HANGOVER):
+        if mode not in ("off", "rms", "vad", "flux"):
+            raise ValueError(f"Unknown audio gate: {mode}")
+        self.mode = mode
+        self.margin_db = margin_db
+        self.hangover = hangover
+        self.floor_db: float | None = None
+        self._open_for = 0
+
+        self.windows = 0
+        self.skipped = 0
+        self.gate_cpu = 0.0
+        self.inference_cpu = 0.0
+        self.inference_wall = 0.0
+        self.inferences = 0
+        self._last_report = time.monotonic()
+
+    def _track_floor(self, level: float, active: bool):
+        if self.floor_db is None or level < self.floor_db:
+            self.floor_db = level
+        else:
+            self.floor_db += FLOOR_RISE_DB / 10 if active else FLOOR_RISE_DB
+
+    def _active(self, samples: np.ndarray) -> bool:
+        level = level_db(samples)
+        floor = level if self.floor_db is None else self.floor_db
+        threshold = floor + self.margin_db
+        if level < GATE_MIN_DB:
+            active = False
+        elif self.mode == "rms":
+            active = level >= threshold
+        elif self.mode == "vad":
+            active = float(np.mean(frame_levels_db(samples) >= threshold)) >= GATE_VAD_RATIO
+        else:
+            # A sound that starts on a window boundary has no onset inside
+            # any window, so a level jump opens the gate too
+            active = level >= threshold or spectral_flux(samples) >= GATE_FLUX
+        self._track_floor(level, active)
+        return active
+
+    def should_run(self, samples: np.ndarray) -> bool:
+        self.windows += 1
+        if self.mode == "off":
+            return True
+        started = time.process_time()
+        if self._active(samples):
+            self._open_for = self.hangover + 1
+        run = self._open_for > 0
+        self._open_for = max(0, self._open_for - 1)
+        self.gate_cpu += time.process_time() - started
+        if not run:
+            self.skipped += 1
+        return run
+
+    def record_inference(self, cpu_seconds: float, wall_seconds: float):
+        self.inferences += 1
+        self.inference_cpu += cpu_seconds
+        self.inference_wall += wall_seconds
+
+    def stats(self) -> dict:
+        per_cpu = self.inference_cpu / self.inferences if self.inferences else 0.0
+        per_wall = self.inference_wall / self.inferences if self.inferences else 0.0
+        return {
+            "mode": self.mode,
+            "windows": self.windows,
+            "skipped": self.skipped,
+            "skipRatio": self.skipped / self.windows if self.windows else 0.0,
+            "gateCpuSeconds": self.gate_cpu,
+            "inferenceCpuSeconds": self.inference_cpu,
+            # What the skipped windows would have cost at the measured average
+            "cpuSavedSeconds": self.skipped * per_cpu - self.gate_cpu,
+            "inferenceSecondsSaved": self.skipped * per_wall,
+            "floorDb": self.floor_db,
+        }
+
+    def maybe_report(self, every: float = GATE_REPORT_SECONDS):
+        now = time.monotonic()
+        if now - self._last_report < every:
+            return
+        self._last_report = now
+        s = self.stats()
+        print(
+            f"[GATE] {s['mode']}: {s['windows']} windows, {s['skipRatio'] * 100:.1f}% skipped, "
+            f"~{s['cpuSavedSeconds']:.1f}s CPU saved (gate {s['gateCpuSeconds']:.2f}s, "
+            f"inference {s['inferenceCpuSeconds']:.1f}s), floor {s['floorDb'] or 0:.1f} dBFS"
+        )
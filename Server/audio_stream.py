@@ -0,0 +1,192 @@
+import threading
+import time
+import wave
+
+import numpy as np
+
+
+class AudioRingBuffer:
+    """Single-producer/single-consumer ring of mono float32 samples.
+
+    The buffer itself is never locked: the capture callback only advances
+    ``writing`` (before it copies a block in) and ``written`` (after), and
+    the inference worker only reads. A reader copies its window and then
+    re-checks ``writing``, so a window the producer lapped, even by a write
+    still in progress during the copy, is dropped instead of returned torn.
+    The only lock on the audio thread is the one inside ``Event.set`` that
+    wakes the reader, which neither side holds for more than a few
+    instructions.
+    """
+
+    def __init__(self, capacity: int):
+        self.buf = np.zeros(capacity, dtype=np.float32)
+        self.capacity = capacity
+        self.written = 0  # total samples ever written
+        self.writing = 0  # ``written`` once the write in progress completes
+        self._ready = threading.Event()
+
+    def write(self, samples: np.ndarray):
+        n = len(samples)
+        if n == 0:
+            return
+        data = samples[-self.capacity:] if n > self.capacity else samples
+        start = (self.written + n - len(data)) % self.capacity
+        first = min(len(data), self.capacity - start)
+        self.writing = self.written + n
+        self.buf[start:start + first] = data[:first]
+        if first < len(data):
+            self.buf[:len(data) - first] = data[first:]
+        self.written = self.writing
+        self._ready.set()
+
+    def read(self, end: int, length: int) -> np.ndarray | None:
+        """Copy of samples ``[end - length, end)``, or None if (being) overwritten."""
+        begin = end - length
+        if begin < 0 or end > self.written or self.writing - begin > self.capacity:
+            return None
+        start = begin % self.capacity
+        first = min(length, self.capacity - start)
+        out = np.empty(length, dtype=np.float32)
+        out[:first] = self.buf[start:start + first]
+        if first < length:
+            out[first:] = self.buf[:length - first]
+        if self.writing - begin > self.capacity:
+            return None  # lapped while copying
+        return out
+
+    def wait_for(self, sample_count: int, timeout: float) -> bool:
+        """Blocks until at least ``sample_count`` samples have been written."""
+        deadline = time.monotonic() + timeout
+        while self.written < sample_count:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            self._ready.clear()
+            if self.written >= sample_count:
+                break
+            self._ready.wait(remaining)
+        return True
+
+
+class MicrophoneSource:
+    """Callback-driven capture from the default input device into a ring."""
+
+    def __init__(self, ring: AudioRingBuffer, sample_rate: int, block_seconds: float = 0.05):
+        self.ring = ring
+        self.sample_rate = sample_rate
+        self.block_size = int(sample_rate * block_seconds)
+        self.overflows = 0
+        self.stream = None
+
+    @property
+    def finished(self) -> bool:
+        return False
+
+    def _callback(self, indata, frames, time_info, status):
+        if status:
+            self.overflows += 1
+        self.ring.write(indata[:, 0])
+
+    def start(self):
+        import sounddevice as sd
+
+        self.stream = sd.InputStream(
+            samplerate=self.sample_rate,
+            channels=1,
+            dtype="float32",
+            blocksize=self.block_size,
+            callback=self._callback,
+        )
+        self.stream.start()
+
+    def stop(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+
+
+def load_wav(path: str, sample_rate: int) -> np.ndarray:
+    """Reads a PCM WAV file as mono float32 at ``sample_rate``."""
+    with wave.open(path, "rb") as wf:
+        channels = wf.getnchannels()
+        width = wf.getsampwidth()
+        rate = wf.getframerate()
+        raw = wf.readframes(wf.getnframes())
+    if width == 1:
+        data = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        data = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 4:
+        data = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported sample width: {width} bytes")
+    if channels > 1:
+        data = data.reshape(-1, channels).mean(axis=1)
+    if rate != sample_rate and len(data):
+        duration = len(data) / rate
+        target = np.linspace(0.0, duration, int(duration * sample_rate), endpoint=False)
+        data = np.interp(target, np.arange(len(data)) / rate, data).astype(np.float32)
+    return data
+
+
+class WavFileSource:
+    """Replays a WAV file into a ring, in real time or as fast as the ring drains."""
+
+    def __init__(self, ring: AudioRingBuffer, path: str, sample_rate: int, realtime: bool = True, block_seconds: float = 0.05):
+        self.ring = ring
+        self.samples = load_wav(path, sample_rate)
+        self.sample_rate = sample_rate
+        self.realtime = realtime
+        self.block_size = int(sample_rate * block_seconds)
+        self._done = threading.Event()
+        self._stop = threading.Event()
+        self.consumed = 0  # updated by the reader when not running in real time
+
+    @property
+    def finished(self) -> bool:
+        return self._done.is_set()
+
+    def _run(self):
+        started = time.monotonic()
+        for offset in range(0, len(self.samples), self.block_size):
+            if self._stop.is_set():
+                break
+            if self.realtime:
+                delay = started + offset / self.sample_rate - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                # Never lap the reader when replaying faster than real time
+                while self.ring.written - self.consumed > self.ring.capacity - self.block_size and not self._stop.is_set():
+                    time.sleep(0.001)
+            self.ring.write(self.samples[offset:offset + self.block_size])
+        self._done.set()
+
+    def start(self):
+        threading.Thread(target=self._run, name="wav-source", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+
+def iter_windows(ring: AudioRingBuffer, window: int, hop: int, stop_event: threading.Event, source=None):
+    """Yields ``(end_sample, samples)`` for overlapping windows as audio arrives.
+
+    If the consumer falls so far behind that a window was overwritten, it
+    skips ahead to the newest complete window instead of stalling capture.
+    """
+    next_end = window
+    while not stop_event.is_set():
+        if not ring.wait_for(next_end, timeout=0.5):
+            if source is not None and source.finished and ring.written < next_end:
+                return
+            continue
+        samples = ring.read(next_end, window)
+        if samples is None:
+            next_end = ring.written
+            continue
+        yield next_end, samples
+        next_end += hop
+        if source is not None and hasattr(source, "consumed"):
+            # Oldest sample the next window still needs
+            source.consumed = next_end - window
@@ -7,10 +7,10 @@ from datetime import datetime, timezone
 import serial  # pyserial
 from pymongo import MongoClient
 from pymongo.errors import PyMongoError
-import requests
+
+from event_spool import spool_event
 
 
-API_BASE = os.getenv("API_BASE", "http://127.0.0.1:5000")
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 MONGO_DB = os.getenv("MONGO_DB", "hearyou")
 EVENTS_COLLECTION = os.getenv("MONGO_EVENTS_COLLECTION", "events")
@@ -204,15 +204,9 @@ def watch_events(db, settings: SettingsCache, bracelet: BraceletSerial, stop_eve
 
 def post_door_knocking_event():
     try:
-        now_iso = datetime.now(timezone.utc).isoformat()
-        payload = {
-            "title": "door knocking",
-            "isImportant": False,
-            "eventAt": now_iso,
-        }
-        requests.post(f"{API_BASE}/events/", json=payload, timeout=3)
-    except Exception:
-        pass
+        spool_event("door knocking", datetime.now(timezone.utc).isoformat())
+    except Exception as exc:
+        print(f"[BRIDGE] Could not spool door knocking event: {exc}")
 
 
 def listen_button(bracelet: BraceletSerial, stop_event: threading.Event):
@@ -0,0 +1,58 @@
+"""Which camera sources and annotation targets a camera config may name.
+
+Camera configs come in over the unauthenticated /cameras API, so neither
+field may point at an arbitrary path: a source is a device index, a stream
+URL, a frame bus or a file under CAMERA_MEDIA_DIR, and annotated output
+always lands under CAMERA_OUTPUT_DIR.
+"""
+import os
+import re
+from urllib.parse import urlparse
+
+
+CAMERA_MEDIA_DIR = os.path.abspath(os.getenv("CAMERA_MEDIA_DIR", "media"))
+CAMERA_OUTPUT_DIR = os.path.abspath(os.getenv("CAMERA_OUTPUT_DIR", "annotated"))
+STREAM_SCHEMES = ("rtsp", "rtsps", "http", "https")
+BUS_PREFIX = "bus:"  # frame_bus.BUS_PREFIX
+_BUS_NAME = re.compile(r"[A-Za-z0-9_.-]+")
+
+
+def _under(base: str, relative: str, what: str) -> str:
+    """Resolves ``relative`` inside ``base``; raises ValueError if it would leave it."""
+    parts = relative.replace("\\", "/").split("/")
+    if os.path.isabs(relative) or ".." in parts:
+        raise ValueError(f"{what} must be a relative path without '..'")
+    root = os.path.realpath(base)
+    path = os.path.realpath(os.path.join(root, relative))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"{what} resolves outside {base}")
+    return path
+
+
+def check_source(source: str) -> str:
+    """Returns what to open for ``source``; raises ValueError if it is not allowed.
+
+    Device indexes, stream URLs and ``bus:<name>`` come back unchanged; a
+    file path, relative to CAMERA_MEDIA_DIR, comes back resolved.
+    """
+    source = (source or "").strip()
+    if source.isdigit():
+        return source
+    if source.startswith(BUS_PREFIX):
+        if not _BUS_NAME.fullmatch(source[len(BUS_PREFIX):]):
+            raise ValueError("bus name may only contain letters, digits, '_', '.' and '-'")
+        return source
+    url = urlparse(source)
+    if url.scheme and len(url.scheme) > 1:  # not a Windows drive letter
+        if url.scheme.lower() not in STREAM_SCHEMES or not url.netloc:
+            raise ValueError(f"stream URLs must be {', '.join(STREAM_SCHEMES)}")
+        return source
+    return _under(CAMERA_MEDIA_DIR, source, "source file")
+
+
+def resolve_annotate(target: str) -> str:
+    """Path under CAMERA_OUTPUT_DIR for an ``annotate`` target; raises ValueError if not allowed."""
+    target = (target or "").strip()
+    if not target:
+        raise ValueError("annotate is empty")
+    return _under(CAMERA_OUTPUT_DIR, target, "annotate")
@@ -1,72 +1,52 @@
-from flask import Flask, Response
+import os
+import sys
+import argparse
+
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
-import cv2
+
+from frame_broadcast import FrameBroadcaster, log, parse_profile
 
 app = Flask(__name__)
 CORS(app)
 
 
-camera = cv2.VideoCapture(0)
+CAMERA_SOURCE = os.getenv("CAMERA_SOURCE", "0")  # device index, file path, stream URL or bus:<name> (frame_bus.py)
+# Every /video_feed viewer holds a server thread for as long as it watches
+SERVER_THREADS = int(os.getenv("CAMERA_SERVER_THREADS", "16"))
+# Bytes queued for a slow viewer before its stream blocks and skips to the newest frame
+OUTBUF_BYTES = int(os.getenv("CAMERA_OUTBUF_BYTES", str(1024 * 1024)))
 
+# Started by main(), or by the first viewer under gunicorn / the debug server
+broadcaster = FrameBroadcaster(CAMERA_SOURCE)
 
-zoom_level = 1.0 
 pan = 0
 tilt = 0
 
-if not camera.isOpened():
-    print("Error: Could not open camera")
-else:
-    print(f"Camera opened successfully. Initial zoom level: {zoom_level}")
-
-def generate_frames():
-    global camera, zoom_level
-    while True:
-        success, frame = camera.read()
-        if not success:
-            print("Failed to read frame from camera")
-            break
-
-        height, width = frame.shape[:2]
-        
-        if zoom_level != 1.0:
-            print(f"Applying zoom: {zoom_level:.1f}x")
-
-        if zoom_level > 1.01: 
-            center_x, center_y = width // 2, height // 2
-            new_w, new_h = int(width / zoom_level), int(height / zoom_level)
-            x1 = max(center_x - new_w // 2, 0)
-            y1 = max(center_y - new_h // 2, 0)
-            x2 = min(center_x + new_w // 2, width)
-            y2 = min(center_y + new_h // 2, height)
-
-            frame = frame[y1:y2, x1:x2]
-            frame = cv2.resize(frame, (width, height))  
-
-        ret, buffer = cv2.imencode('.jpg', frame)
-        if not ret:
-            print("Failed to encode frame")
-            continue
-
-        frame_bytes = buffer.tobytes()
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-
 @app.route('/video_feed')
 def video_feed():
-    print(f"Serving video feed with zoom level: {zoom_level}")
-    return Response(generate_frames(),
+    # ?profile=low|medium|high, optionally &width=&quality=&fps=
+    try:
+        profile = parse_profile(request.args)
+    except ValueError as exc:
+        return jsonify({"ok": False, "message": str(exc)}), 400
+    log("viewer_connected", zoom=broadcaster.zoom_level, profile=profile.key, viewers=broadcaster.viewers + 1)
+    return Response(broadcaster.frames(profile),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
 
+@app.route('/stats')
+def stats():
+    return jsonify({"ok": True, **broadcaster.snapshot()})
+
 @app.route('/reset_zoom')
 def reset_zoom():
-    global zoom_level
-    zoom_level = 1.0
-    print(f"Zoom reset to: {zoom_level}")
+    broadcaster.zoom_level = 1.0
+    print(f"Zoom reset to: {broadcaster.zoom_level}")
     return "OK"
 
 @app.route('/control/<action>')
 def control(action):
-    global zoom_level, pan, tilt
+    global pan, tilt
 
     if action == "up":
         tilt += 10
@@ -81,16 +61,47 @@ def control(action):
         pan += 10
         print("Move right (prototype)")
     elif action == "zoom_in":
-        zoom_level = min(zoom_level + 0.2, 3.0)
-        print(f"Zoom in: {zoom_level:.1f}x")
+        broadcaster.zoom_level = min(broadcaster.zoom_level + 0.2, 3.0)
+        print(f"Zoom in: {broadcaster.zoom_level:.1f}x")
     elif action == "zoom_out":
-        zoom_level = max(zoom_level - 0.2, 1.0)
-        print(f"Zoom out: {zoom_level:.1f}x")
+        broadcaster.zoom_level = max(broadcaster.zoom_level - 0.2, 1.0)
+        print(f"Zoom out: {broadcaster.zoom_level:.1f}x")
     else:
         print("Unknown action:", action)
 
     return "OK"
 
+def main():
+    parser = argparse.ArgumentParser(description="MJPEG camera server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--debug", action="store_true", help="Flask debug server with the reloader (development only)")
+    args = parser.parse_args()
+
+    if args.debug:
+        print("Starting server with default zoom level: 1.0 (no zoom)")
+        app.run(host=args.host, port=args.port, debug=True)
+        return
+
+    # One process owns the camera; each viewer gets a thread
+    try:
+        from waitress import create_server
+    except ImportError:
+        sys.exit(
+            "waitress is not installed (pip install waitress); or serve with\n"
+            f"  gunicorn camera_server:app -k gthread -w 1 --threads {SERVER_THREADS} -b {args.host}:{args.port}"
+        )
+
+    broadcaster.start()
+    server = create_server(app, host=args.host, port=args.port, threads=SERVER_THREADS, outbuf_high_watermark=OUTBUF_BYTES)
+    log("server_started", host=args.host, port=args.port, source=CAMERA_SOURCE, threads=SERVER_THREADS)
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        broadcaster.stop()
+
+
 if __name__ == "__main__":
-    print("Starting server with default zoom level: 1.0 (no zoom)")
-    app.run(host="0.0.0.0", port=5001, debug=True)
\ No newline at end of file
+    main()
@@ -0,0 +1,91 @@
+from datetime import datetime, timezone
+
+from flask import Blueprint, current_app, jsonify, request
+
+from camera_paths import check_source, resolve_annotate
+
+
+cameras_bp = Blueprint("cameras_bp", __name__)
+
+CAMERA_MODELS = ("pose", "holistic")
+
+
+def serialize_camera(doc: dict) -> dict:
+    updated_at = doc.get("updatedAt")
+    return {
+        "id": str(doc.get("_id", "")),
+        "source": doc.get("source", ""),
+        "uid": doc.get("uid", ""),
+        "enabled": bool(doc.get("enabled", True)),
+        "flip": bool(doc.get("flip", True)),
+        "model": doc.get("model", "pose"),
+        "inferWidth": int(doc.get("inferWidth", 320)),
+        "diffThreshold": float(doc.get("diffThreshold", 1.5)),
+        "annotate": doc.get("annotate", ""),
+        "updatedAt": updated_at.isoformat() if isinstance(updated_at, datetime) else "",
+    }
+
+
+def build_camera_doc(camera_id: str, data: dict) -> dict:
+    """Returns the $set fields for PUT /cameras/<id>; raises ValueError on bad input."""
+    camera_id = (camera_id or "").strip()
+    if not camera_id or "/" in camera_id:
+        raise ValueError("Invalid camera id")
+    source = data.get("source")
+    if isinstance(source, int):
+        source = str(source)
+    if not isinstance(source, str) or not source.strip():
+        raise ValueError("source is required (file path, stream URL, device index or bus:<name>)")
+    check_source(source)
+
+    doc = {"source": source.strip(), "updatedAt": datetime.now(timezone.utc)}
+    if "uid" in data:
+        doc["uid"] = str(data.get("uid") or "").strip()
+    for key in ("enabled", "flip"):
+        if key in data:
+            doc[key] = bool(data[key])
+    if "model" in data:
+        if data["model"] not in CAMERA_MODELS:
+            raise ValueError(f"model must be one of {', '.join(CAMERA_MODELS)}")
+        doc["model"] = data["model"]
+    try:
+        if "inferWidth" in data:
+            doc["inferWidth"] = max(0, int(data["inferWidth"]))
+        if "diffThreshold" in data:
+            doc["diffThreshold"] = max(0.0, float(data["diffThreshold"]))
+    except (TypeError, ValueError):
+        raise ValueError("inferWidth and diffThreshold must be numbers")
+    if "annotate" in data:
+        doc["annotate"] = str(data.get("annotate") or "").strip()
+        if doc["annotate"]:
+            resolve_annotate(doc["annotate"])
+    return doc
+
+
+@cameras_bp.route("/", methods=["GET"])
+def list_cameras():
+    db = current_app.config["DB"]
+    docs = db["cameras"].find({}).sort("_id", 1)
+    return jsonify({"ok": True, "cameras": [serialize_camera(d) for d in docs]})
+
+
+@cameras_bp.route("/<camera_id>", methods=["PUT"])
+def save_camera(camera_id):
+    db = current_app.config["DB"]
+    data = request.get_json(force=True, silent=True) or {}
+    try:
+        fields = build_camera_doc(camera_id, data)
+    except ValueError as exc:
+        return jsonify({"ok": False, "message": str(exc)}), 400
+    db["cameras"].update_one({"_id": camera_id.strip()}, {"$set": fields}, upsert=True)
+    doc = db["cameras"].find_one({"_id": camera_id.strip()})
+    return jsonify({"ok": True, "camera": serialize_camera(doc)})
+
+
+@cameras_bp.route("/<camera_id>", methods=["DELETE"])
+def delete_camera(camera_id):
+    db = current_app.config["DB"]
+    res = db["cameras"].delete_one({"_id": camera_id})
+    if res.deleted_count == 0:
+        return jsonify({"ok": False, "message": "Not found"}), 404
+    return jsonify({"ok": True})
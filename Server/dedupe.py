@@ -0,0 +1,181 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+
+DEDUPE_COLLECTION = "event_dedupe"
+
+EVENT_COOLDOWN_SECONDS = float(os.getenv("EVENT_COOLDOWN_SECONDS", "120"))
+EVENT_DEDUPE_MODE = os.getenv("EVENT_DEDUPE_MODE", "merge")  # "merge", "reject" or "off"
+
+
+def _as_utc(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
+
+
+def _event_at(doc: dict) -> datetime:
+    event_at = doc.get("eventAt")
+    return _as_utc(event_at) if isinstance(event_at, datetime) else datetime.now(timezone.utc)
+
+
+class EventDeduplicator:
+    """Per-(uid, event key) cooldown shared by every API process.
+
+    Windows are keyed on when the event happened, not when it arrived: each
+    claim covers one ``cooldown_seconds`` slice of ``eventAt``, so a backlog
+    replayed by a detector's spool still yields one event per cooldown
+    instead of collapsing into whatever window is open at arrival time.
+
+    The window is claimed with a conditional upsert on ``event_dedupe``: the
+    update only matches an expired window, so while a window is live the
+    upsert collides on ``_id`` and the event is a duplicate. Claims record
+    their ``eventAt``, and an event within ``cooldown_seconds`` of a live
+    claim in a neighbouring slice is a duplicate of it too, so the cooldown
+    slides with event time instead of resetting at slice boundaries. (Two
+    events racing into neighbouring slices at the same moment can both be
+    stored; within a slice the upsert keeps it to one.) A TTL index removes
+    old windows. Claims seen by this process are also kept in memory so
+    repeat duplicates skip the Mongo round trip.
+    """
+
+    def __init__(self, db, cooldown_seconds: float = EVENT_COOLDOWN_SECONDS, mode: str = EVENT_DEDUPE_MODE):
+        self.db = db
+        self.col = db[DEDUPE_COLLECTION]
+        self.cooldown_seconds = cooldown_seconds
+        self.mode = mode
+        self.lock = threading.Lock()
+        self._recent: dict[str, tuple[float, ObjectId]] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode in ("merge", "reject") and self.cooldown_seconds > 0
+
+    def claim(self, doc: dict, event_key: str, stale: ObjectId | None = None) -> ObjectId | None:
+        """Claims the cooldown window for a new event document.
+
+        Returns None if the window was free; ``doc`` then gets its ``_id``
+        assigned and must be inserted (or ``release``d on failure). Otherwise
+        returns the id of the event that already holds the window. Pass the
+        holder as ``stale`` to take the window over from an event that turned
+        out not to exist.
+        """
+        key = self.window_key(doc, event_key)
+        cached = self._cached(key, stale)
+        if cached is not None:
+            return cached
+        now, event_id, query, update = self._claim_spec(doc, key, stale)
+        neighbour = self.col.find_one(self._neighbour_query(doc, event_key, now, stale))
+        if neighbour is not None:
+            return neighbour["eventId"]
+        try:
+            self.col.update_one(query, update, upsert=True)
+        except DuplicateKeyError:
+            return self._on_held(doc, key, self.col.find_one({"_id": key}), now, event_id)
+        return self._on_claimed(doc, key, event_id)
+
+    def release(self, doc: dict, event_key: str):
+        """Gives back a window whose event could not be inserted."""
+        key = self.window_key(doc, event_key)
+        self._forget(key, doc.get("_id"))
+        self.col.delete_one({"_id": key, "eventId": doc.get("_id")})
+
+    def merge(self, event_id: ObjectId, count: int = 1) -> dict | None:
+        """Counts ``count`` duplicates on the event holding the window.
+
+        Returns None if that event does not exist.
+        """
+        return self.db["events"].find_one_and_update(
+            {"_id": event_id},
+            self._merge_update(count),
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def exists(self, event_id: ObjectId) -> bool:
+        return self.db["events"].find_one({"_id": event_id}, {"_id": 1}) is not None
+
+    def window_key(self, doc: dict, event_key: str) -> str:
+        return f"{doc.get('uid', '')}:{event_key}:{self._slot(doc)}"
+
+    def within_cooldown(self, doc: dict, other: dict) -> bool:
+        """True if two events of the same uid and key are close enough to be one."""
+        return abs((_event_at(doc) - _event_at(other)).total_seconds()) < self.cooldown_seconds
+
+    def _slot(self, doc: dict) -> int:
+        return int(_event_at(doc).timestamp() // self.cooldown_seconds)
+
+    def _claim_spec(self, doc: dict, key: str, stale: ObjectId | None = None):
+        now = datetime.now(timezone.utc)
+        event_id = ObjectId()
+        query = {"_id": key, "expiresAt": {"$lte": now}}
+        if stale is not None:
+            query = {"_id": key, "$or": [{"expiresAt": {"$lte": now}}, {"eventId": stale}]}
+        update = {"$set": {
+            "eventId": event_id,
+            "eventAt": _event_at(doc),
+            "expiresAt": now + timedelta(seconds=self.cooldown_seconds),
+        }}
+        return now, event_id, query, update
+
+    def _neighbour_query(self, doc: dict, event_key: str, now: datetime, stale: ObjectId | None = None) -> dict:
+        """Live claims in the adjacent slices whose event is within the cooldown of ``doc``'s."""
+        slot, event_at = self._slot(doc), _event_at(doc)
+        cooldown = timedelta(seconds=self.cooldown_seconds)
+        prefix = f"{doc.get('uid', '')}:{event_key}:"
+        query = {
+            "_id": {"$in": [f"{prefix}{slot - 1}", f"{prefix}{slot + 1}"]},
+            "expiresAt": {"$gt": now},
+            "eventAt": {"$gt": event_at - cooldown, "$lt": event_at + cooldown},
+        }
+        if stale is not None:
+            query["eventId"] = {"$ne": stale}
+        return query
+
+    @staticmethod
+    def _merge_update(count: int) -> dict:
+        return {"$inc": {"occurrences": count}, "$set": {"lastSeenAt": datetime.now(timezone.utc)}}
+
+    def _on_claimed(self, doc: dict, key: str, event_id: ObjectId) -> None:
+        doc["_id"] = event_id
+        doc["occurrences"] = 1
+        self._remember(key, self.cooldown_seconds, event_id)
+        return None
+
+    def _on_held(self, doc: dict, key: str, holder: dict | None, now: datetime, event_id: ObjectId) -> ObjectId | None:
+        if not holder or not holder.get("eventId"):
+            # The window expired in between; let the caller insert
+            doc["_id"] = event_id
+            doc["occurrences"] = 1
+            return None
+        remaining = (_as_utc(holder["expiresAt"]) - now).total_seconds()
+        self._remember(key, remaining, holder["eventId"])
+        return holder["eventId"]
+
+    def _cached(self, key: str, stale: ObjectId | None = None) -> ObjectId | None:
+        if stale is not None:
+            self._forget(key, stale)
+            return None
+        with self.lock:
+            hit = self._recent.get(key)
+        if hit and hit[0] > time.monotonic():
+            return hit[1]
+        return None
+
+    def _forget(self, key: str, event_id):
+        with self.lock:
+            hit = self._recent.get(key)
+            if hit and hit[1] == event_id:
+                del self._recent[key]
+
+    def _remember(self, key: str, ttl: float, event_id: ObjectId):
+        if ttl <= 0:
+            return
+        now = time.monotonic()
+        with self.lock:
+            if len(self._recent) > 10000:
+                self._recent = {k: v for k, v in self._recent.items() if v[0] > now}
+            self._recent[key] = (now + ttl, event_id)
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta, timezone
+
+from pymongo import UpdateOne
+
+
+ROLLUPS_COLLECTION = "event_rollups"
+GRANULARITIES = ("hour", "day", "week")
+
+# All buckets are UTC; weeks start on Monday.
+
+
+def _as_utc(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+
+def bucket_start(dt: datetime, granularity: str) -> datetime:
+    dt = _as_utc(dt)
+    if granularity == "hour":
+        return dt.replace(minute=0, second=0, microsecond=0)
+    day = dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return day
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+def rollup_id(uid: str, granularity: str, start: datetime) -> str:
+    return f"{uid}|{granularity}|{start.strftime('%Y-%m-%dT%H')}"
+
+
+def _field_key(event_key: str) -> str:
+    # Keys become field names in the rollup documents
+    return (event_key or "unknown").replace(".", "_").replace("$", "_")
+
+
+def rollup_increments(uid: str, event_key: str, event_at: datetime, n: int = 1) -> dict[tuple[str, str, datetime], dict]:
+    """$inc documents for one event, keyed by (uid, granularity, bucket start)."""
+    event_at = _as_utc(event_at)
+    key = _field_key(event_key)
+    incs = {}
+    for granularity in GRANULARITIES:
+        inc = {"total": n, f"counts.{key}": n}
+        if granularity == "day":
+            inc[f"byHour.{key}.{event_at.hour}"] = n
+        elif granularity == "week":
+            inc[f"byWeekday.{key}.{event_at.weekday()}"] = n
+            inc[f"byHour.{key}.{event_at.hour}"] = n
+        incs[(uid, granularity, bucket_start(event_at, granularity))] = inc
+    return incs
+
+
+def rollup_operations(items) -> list[UpdateOne]:
+    """Upserts for ``(uid, event_key, event_at)`` items, merged per bucket."""
+    merged: dict[tuple[str, str, datetime], dict] = {}
+    for uid, event_key, event_at in items:
+        if not isinstance(event_at, datetime):
+            continue
+        for bucket, inc in rollup_increments(uid or "", event_key, event_at).items():
+            acc = merged.setdefault(bucket, {})
+            for field, n in inc.items():
+                acc[field] = acc.get(field, 0) + n
+    return [
+        UpdateOne(
+            {"_id": rollup_id(uid, granularity, start)},
+            {
+                "$inc": inc,
+                "$setOnInsert": {"uid": uid, "granularity": granularity, "bucketStart": start},
+            },
+            upsert=True,
+        )
+        for (uid, granularity, start), inc in merged.items()
+    ]
+
+
+def _series(values: dict | None, size: int) -> list[int]:
+    values = values or {}
+    return [int(values.get(str(i), 0)) for i in range(size)]
+
+
+def serialize_rollup(doc: dict) -> dict:
+    counts = {k: int(v) for k, v in (doc.get("counts") or {}).items()}
+    out = {
+        "uid": doc.get("uid", ""),
+        "granularity": doc.get("granularity", ""),
+        "bucketStart": _as_utc(doc["bucketStart"]).isoformat() if doc.get("bucketStart") else "",
+        "total": int(doc.get("total", 0)),
+        "counts": counts,
+    }
+    if doc.get("byHour"):
+        out["byHour"] = {k: _series(v, 24) for k, v in doc["byHour"].items()}
+    if doc.get("byWeekday"):
+        out["byWeekday"] = {k: _series(v, 7) for k, v in doc["byWeekday"].items()}
+    return out
+
+
+def weekly_summary(uid: str, week_start: datetime, current: dict | None, previous: dict | None) -> dict:
+    """Weekly report numbers from this week's and last week's rollup documents."""
+    current = serialize_rollup(current or {})
+    total = current["total"]
+    previous_total = int((previous or {}).get("total", 0))
+    hour_totals = [0] * 24
+    for series in (current.get("byHour") or {}).values():
+        hour_totals = [a + b for a, b in zip(hour_totals, series)]
+    busiest = max(current["counts"].items(), key=lambda kv: kv[1])[0] if current["counts"] else None
+    return {
+        "uid": uid,
+        "weekStartIso": week_start.isoformat(),
+        "weekEndIso": (week_start + timedelta(days=7)).isoformat(),
+        "total": total,
+        "counts": current["counts"],
+        "byWeekday": current.get("byWeekday", {}),
+        "byHour": current.get("byHour", {}),
+        "peakHour": hour_totals.index(max(hour_totals)) if total else None,
+        "mostFrequentEvent": busiest,
+        "previousWeekTotal": previous_total,
+        "changePct": round((total - previous_total) * 100.0 / previous_total, 1) if previous_total else None,
+    }
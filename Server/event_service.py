@@ -0,0 +1,579 @@
+"""Event validation, paging and ingest shared by api_server and asgi_server.
+
+The route modules (events.py for Flask, asgi_server.py for Starlette) only
+parse the request and write the response. Everything else lives here. Ingest
+is plain blocking code over an ``EventStore`` (pymongo); the Flask routes
+call it directly and asgi_server runs it in a worker thread, as Motor would.
+"""
+import json
+import time
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from event_rollups import GRANULARITIES, ROLLUPS_COLLECTION, rollup_operations
+from event_stream import REPLAY_LIMIT, format_sse, replay_query
+from notifications import OUTBOX_COLLECTION, build_outbox_jobs
+
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+MAX_BATCH_SIZE = 1000
+MAX_ROLLUP_BUCKETS = 1000
+CLAIM_ATTEMPTS = 3
+OUTBOX_ATTEMPTS = 3
+OUTBOX_RETRY_SECONDS = 0.2
+DUPLICATE_KEY = 11000
+# Only the fields serialize_event reads
+LIST_PROJECTION = {"title": 1, "eventAt": 1, "createdAt": 1, "isImportant": 1, "occurrences": 1}
+LIST_SORT = [("eventAt", -1), ("_id", -1)]
+
+
+def _format_date_time(dt: datetime) -> tuple[str, str]:
+    return dt.strftime("%m/%d/%Y"), dt.strftime("%H:%M")
+
+
+def serialize_event(doc: dict) -> dict:
+    event_at: datetime = doc.get("eventAt") or doc.get("createdAt") or datetime.now(timezone.utc)
+    if isinstance(event_at, str):
+        try:
+            event_at = datetime.fromisoformat(event_at)
+        except Exception:
+            event_at = datetime.now(timezone.utc)
+    try:
+        if event_at.tzinfo is None or event_at.tzinfo.utcoffset(event_at) is None:
+            event_at = event_at.replace(tzinfo=timezone.utc)
+    except Exception:
+        event_at = datetime.now(timezone.utc)
+    date_str, time_str = _format_date_time(event_at.astimezone())
+    return {
+        "id": str(doc.get("_id")),
+        "title": doc.get("title", ""),
+        "description": "",
+        "date": date_str,
+        "time": time_str,
+        "eventAt": event_at.isoformat(),
+        "isImportant": bool(doc.get("isImportant", False)),
+        "occurrences": int(doc.get("occurrences") or 1),
+    }
+
+
+def normalize_event_key(title: str) -> str:
+    t = (title or "").strip().lower()
+    mapping = {
+        "baby crying": "baby_crying",
+        "baby movement": "baby_movement",
+        "door knocking": "door_knocking",
+        "phone call": "phone_call",
+    }
+    if t in mapping:
+        return mapping[t]
+    return t.replace(" ", "_")
+
+
+def is_within_quiet_hours(quiet: dict | None) -> bool:
+    if not isinstance(quiet, dict):
+        return False
+    start = (quiet.get("start") or "").strip()
+    end = (quiet.get("end") or "").strip()
+    try:
+        now = datetime.now().time()
+        if not start or not end or len(start) != 5 or len(end) != 5:
+            return False
+        sh, sm = int(start[:2]), int(start[3:])
+        eh, em = int(end[:2]), int(end[3:])
+        start_t = now.replace(hour=sh, minute=sm, second=0, microsecond=0)
+        end_t = now.replace(hour=eh, minute=em, second=0, microsecond=0)
+        if start_t <= end_t:
+            return start_t <= now <= end_t
+        else:
+            return now >= start_t or now <= end_t
+    except Exception:
+        return False
+
+
+def parse_iso(value: str) -> datetime:
+    return datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+
+
+def encode_cursor(doc: dict) -> str:
+    """Position after ``doc`` in LIST_SORT order.
+
+    Documents with a string ``eventAt`` (rows stored before it was parsed)
+    sort after the dated ones and carry it in the cursor behind an ``s``;
+    documents with no ``eventAt`` sort last and are paged by ``_id`` alone,
+    with an empty time in the cursor.
+    """
+    event_at = doc.get("eventAt")
+    if isinstance(event_at, datetime):
+        return f"{event_at.isoformat()}_{doc.get('_id')}"
+    if isinstance(event_at, str):
+        return f"s{event_at}_{doc.get('_id')}"
+    return f"_{doc.get('_id')}"
+
+
+def decode_cursor(cursor: str) -> tuple[datetime | str | None, ObjectId]:
+    ts, _, oid = cursor.rpartition("_")
+    if ts.startswith("s"):
+        return ts[1:], ObjectId(oid)
+    return (parse_iso(ts) if ts.strip() else None), ObjectId(oid)
+
+
+def _after_cursor(before_at: datetime | str | None, before_id: ObjectId) -> dict:
+    if before_at is None:
+        return {"eventAt": None, "_id": {"$lt": before_id}}
+    if isinstance(before_at, str):
+        return {"$or": [
+            {"eventAt": {"$lt": before_at}},  # compares strings only
+            {"eventAt": before_at, "_id": {"$lt": before_id}},
+            {"eventAt": None},
+        ]}
+    return {"$or": [
+        {"eventAt": {"$lt": before_at}},
+        {"eventAt": before_at, "_id": {"$lt": before_id}},
+        {"eventAt": {"$type": "string"}},
+        {"eventAt": None},
+    ]}
+
+
+def _time_range(args) -> dict:
+    try:
+        range_q = {}
+        if args.get("from"):
+            range_q["$gte"] = parse_iso(args.get("from"))
+        if args.get("to"):
+            range_q["$lt"] = parse_iso(args.get("to"))
+    except ValueError:
+        raise ValueError("from/to must be ISO-8601 timestamps")
+    return range_q
+
+
+def build_list_query(args) -> tuple[dict, int]:
+    """Builds the GET /events/ filter and page size from query args.
+
+    Raises ValueError with a client-facing message on bad input.
+    """
+    uid = (args.get("uid") or "").strip()
+    q = {"uid": uid} if uid else {}
+
+    try:
+        limit = int(args.get("limit") or DEFAULT_PAGE_SIZE)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    range_q = _time_range(args)
+    if range_q:
+        q["eventAt"] = range_q
+
+    before = (args.get("before") or "").strip()
+    if before:
+        try:
+            before_at, before_id = decode_cursor(before)
+        except Exception:
+            raise ValueError("Invalid cursor")
+        q = {"$and": [q, _after_cursor(before_at, before_id)]}
+    return q, limit
+
+
+def find_page(coll, q: dict, limit: int):
+    """Cursor for one GET /events/ page; works for pymongo and Motor collections."""
+    # Fetch one extra document so we know whether another page exists
+    return coll.find(q, LIST_PROJECTION).sort(LIST_SORT).limit(limit + 1).batch_size(limit + 1)
+
+
+class EventPage:
+    """Renders a GET /events/ response body chunk by chunk as documents arrive."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.count = 0
+        self.last: dict | None = None
+        self.has_more = False
+
+    def open(self) -> str:
+        return '{"ok": true, "events": ['
+
+    def add(self, doc: dict) -> str | None:
+        """Chunk for ``doc``, or None once the page is full (``doc`` was the look-ahead)."""
+        if self.count == self.limit:
+            self.has_more = True
+            return None
+        chunk = ("," if self.count else "") + json.dumps(serialize_event(doc))
+        self.last = doc
+        self.count += 1
+        return chunk
+
+    def close(self) -> str:
+        next_cursor = encode_cursor(self.last) if self.has_more and self.last else None
+        return '], "nextCursor": ' + json.dumps(next_cursor) + "}"
+
+
+class StreamSession:
+    """Replay-then-live bookkeeping for one /events/stream connection."""
+
+    def __init__(self, uid: str, last_event_id: str):
+        self.replay_q = replay_query(uid, last_event_id) if last_event_id else None
+        self.last_id = None
+
+    def replay_cursor(self, coll):
+        """Events the client missed, oldest first, or None; pymongo or Motor."""
+        if self.replay_q is None:
+            return None
+        return coll.find(self.replay_q).sort("_id", 1).limit(REPLAY_LIMIT)
+
+    def replayed(self, doc: dict) -> str:
+        self.last_id = doc["_id"]
+        return format_sse(serialize_event(doc), str(doc["_id"]))
+
+    def live(self, doc: dict) -> str | None:
+        """Frame for a broadcast event, or None if the replay already sent it."""
+        if self.last_id is not None and doc.get("_id") <= self.last_id:
+            return None
+        return format_sse(serialize_event(doc), str(doc.get("_id")))
+
+
+def build_rollups_query(args) -> dict:
+    """Filter for GET /events/rollups; raises ValueError on bad input."""
+    granularity = (args.get("granularity") or "day").strip()
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    q = {"uid": (args.get("uid") or "").strip(), "granularity": granularity}
+    range_q = _time_range(args)
+    if range_q:
+        q["bucketStart"] = range_q
+    return q
+
+
+def build_event_doc(data: dict, settings_doc: dict) -> dict:
+    if not isinstance(data, dict):
+        raise ValueError("Event must be an object")
+    for field in ("title", "uid"):
+        if data.get(field) is not None and not isinstance(data.get(field), str):
+            raise ValueError(f"{field} must be a string")
+    title = (data.get("title") or "").strip()
+    uid = (data.get("uid") or "").strip()
+    is_important = bool(data.get("isImportant", False))
+    event_at_iso = data.get("eventAt")
+
+    if not title:
+        raise ValueError("Missing title")
+
+    try:
+        event_at = datetime.fromisoformat(event_at_iso) if event_at_iso else datetime.now(timezone.utc)
+    except Exception:
+        event_at = datetime.now(timezone.utc)
+
+    try:
+        if not data.get("isImportant"):
+            key = normalize_event_key(title)
+            priorities = settings_doc.get("priorities") or {}
+            if isinstance(priorities, dict):
+                is_important = bool(priorities.get(key, False))
+    except Exception:
+        pass
+
+    return {
+        "title": title,
+        "isImportant": is_important,
+        "eventAt": event_at,
+        "createdAt": datetime.now(timezone.utc),
+        **({"uid": uid} if uid else {}),
+    }
+
+
+def build_event_update(data: dict) -> dict:
+    """$set fields for PATCH /events/<id>; raises ValueError on bad input."""
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+    for field in ("title", "description"):
+        if data.get(field) is not None and not isinstance(data.get(field), str):
+            raise ValueError(f"{field} must be a string")
+    update = {}
+    if "isImportant" in data:
+        update["isImportant"] = bool(data.get("isImportant"))
+    if "title" in data:
+        update["title"] = (data.get("title") or "").strip()
+    if "description" in data:
+        update["description"] = (data.get("description") or "").strip()
+    return update
+
+
+def event_rollup_operations(docs: list[dict]):
+    """Rollup upserts for event documents; live ingest and the backfill both count with this.
+
+    Events are bucketed on ``eventAt``; documents without a datetime
+    ``eventAt`` are not counted.
+    """
+    return rollup_operations(
+        (doc.get("uid") or "", normalize_event_key(doc.get("title") or ""), doc.get("eventAt"))
+        for doc in docs
+    )
+
+
+def parse_batch(data) -> list:
+    """The event list of a POST /events/batch body; raises ValueError if unusable."""
+    items = data.get("events") if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        raise ValueError("Expected a non-empty list of events")
+    if len(items) > MAX_BATCH_SIZE:
+        raise ValueError(f"At most {MAX_BATCH_SIZE} events per batch")
+    return items
+
+
+def _write_errors(exc: BulkWriteError) -> dict[int, str]:
+    return {err["index"]: err.get("errmsg", "Write failed") for err in exc.details.get("writeErrors", [])}
+
+
+def _only_duplicates(exc: BulkWriteError) -> bool:
+    """True if every failed write was a document an earlier attempt already inserted."""
+    errors = exc.details.get("writeErrors", [])
+    return bool(errors) and all(err.get("code") == DUPLICATE_KEY for err in errors)
+
+
+class EventStore:
+    """Database side of event ingest: the events, dedupe, rollup and outbox writes."""
+
+    def __init__(self, db, deduper=None, notify_worker=None):
+        self.db = db
+        self.deduper = deduper if deduper is not None and deduper.enabled else None
+        self.notify_worker = notify_worker
+
+    def claim(self, doc: dict, event_key: str, stale: ObjectId | None = None) -> ObjectId | None:
+        return self.deduper.claim(doc, event_key, stale)
+
+    def release(self, doc: dict, event_key: str):
+        self.deduper.release(doc, event_key)
+
+    def merge(self, event_id: ObjectId, count: int) -> dict | None:
+        return self.deduper.merge(event_id, count)
+
+    def exists(self, event_id: ObjectId) -> bool:
+        return self.deduper.exists(event_id)
+
+    def insert_many(self, docs: list[dict]) -> dict[int, str]:
+        """Inserts unordered; returns {position: error message} for documents that failed."""
+        try:
+            self.db["events"].insert_many(docs, ordered=False)
+        except BulkWriteError as exc:
+            return _write_errors(exc)
+        return {}
+
+    def update_rollups(self, ops: list):
+        self.db[ROLLUPS_COLLECTION].bulk_write(ops, ordered=False)
+
+    def insert_outbox(self, jobs: list[dict]):
+        """Inserts outbox jobs; safe to repeat, as retries reuse the ``_id`` set on the first try."""
+        try:
+            self.db[OUTBOX_COLLECTION].insert_many(jobs, ordered=False)
+        except BulkWriteError as exc:
+            if not _only_duplicates(exc):
+                raise
+
+    def notify(self):
+        if self.notify_worker is not None:
+            self.notify_worker.notify()
+
+
+def _check_window(store: EventStore, doc: dict, count: int) -> dict | None:
+    """Runs the cooldown check for ``doc`` standing in for ``count`` copies.
+
+    Returns None if ``doc`` now holds the window and must be inserted, or
+    the result body for a duplicate (merged into, or rejected because of,
+    the event holding the window).
+    """
+    deduper = store.deduper
+    if deduper is None:
+        return None
+    event_key = normalize_event_key(doc["title"])
+    holder_id = store.claim(doc, event_key)
+    for _ in range(CLAIM_ATTEMPTS):
+        if holder_id is None:
+            return None
+        if deduper.mode == "reject":
+            if store.exists(holder_id):
+                return _rejected(holder_id)
+        else:
+            merged = store.merge(holder_id, count)
+            if merged is not None:
+                return {"ok": True, "duplicate": True, "event": serialize_event(merged)}
+        # The holder was never stored (its insert failed elsewhere); the window is free
+        holder_id = store.claim(doc, event_key, stale=holder_id)
+    return {"ok": False, "message": "Cooldown window is busy, retry"}
+
+
+def _rejected(holder_id: ObjectId) -> dict:
+    return {"ok": False, "duplicate": True, "message": "Duplicate event within cooldown", "eventId": str(holder_id)}
+
+
+def _release_claim(store: EventStore, doc: dict):
+    if store.deduper is not None and "_id" in doc:
+        try:
+            store.release(doc, normalize_event_key(doc["title"]))
+        except Exception as exc:
+            print(f"[DEDUPE] Could not release window of {doc['_id']}: {exc}")
+
+
+def _apply_rollups(store: EventStore, docs: list[dict]):
+    try:
+        ops = event_rollup_operations(docs)
+        if ops:
+            store.update_rollups(ops)
+    except Exception as exc:
+        print(f"[ROLLUPS] Could not update rollups: {exc}")
+
+
+def _enqueue_notifications(store: EventStore, docs: list[dict], settings_doc: dict):
+    """Queues the push jobs for newly stored events, retrying briefly.
+
+    The events are already stored, so a failure here does not fail the
+    request; it is logged with the event ids so the missed notifications
+    can be traced.
+    """
+    try:
+        jobs = build_outbox_jobs(docs, quiet=is_within_quiet_hours(settings_doc.get("quietHours")))
+    except Exception as exc:
+        _log_unqueued(docs, exc)
+        return
+    if not jobs:
+        return
+    for attempt in range(1, OUTBOX_ATTEMPTS + 1):
+        try:
+            store.insert_outbox(jobs)
+            store.notify()
+            return
+        except Exception as exc:
+            if attempt == OUTBOX_ATTEMPTS:
+                _log_unqueued(docs, exc)
+                return
+            time.sleep(OUTBOX_RETRY_SECONDS * attempt)
+
+
+def _log_unqueued(docs: list[dict], exc: Exception):
+    ids = ", ".join(str(doc.get("_id")) for doc in docs)
+    print(f"[NOTIFY] Could not queue notifications for events {ids}: {exc}")
+
+
+def _after_insert(store: EventStore, docs: list[dict], settings_doc: dict):
+    _apply_rollups(store, docs)
+    _enqueue_notifications(store, docs, settings_doc)
+
+
+def _group_copies(deduper, docs: list[dict]) -> list[list[int]]:
+    """Positions of ``docs`` grouped into copies of one event: same uid and
+    event key, within the cooldown of the group's first copy."""
+    if deduper is None:
+        return [[position] for position in range(len(docs))]
+    groups: list[list[int]] = []
+    by_stream: dict[tuple, list[list[int]]] = {}
+    for position, doc in enumerate(docs):
+        stream = by_stream.setdefault((doc.get("uid", ""), normalize_event_key(doc["title"])), [])
+        group = next((g for g in stream if deduper.within_cooldown(docs[g[0]], doc)), None)
+        if group is None:
+            group = []
+            stream.append(group)
+            groups.append(group)
+        group.append(position)
+    return groups
+
+
+def _store_events(store: EventStore, docs: list[dict], settings_doc: dict) -> list[dict]:
+    """Dedupes and inserts validated event documents; returns one result per document.
+
+    Copies of the same event within ``docs`` are grouped first: the first
+    copy takes the cooldown window and is stored with the group's count as
+    its ``occurrences``, the others are reported as its duplicates. If
+    anything fails before the insert has settled, every window claimed here
+    is released before the error propagates.
+    """
+    deduper = store.deduper
+    groups = _group_copies(deduper, docs)
+
+    results: list[dict] = [{}] * len(docs)
+    claimed: list[dict] = []
+    pending: list[list[int]] = []
+    try:
+        for members in groups:
+            lead = docs[members[0]]
+            outcome = _check_window(store, lead, len(members))
+            if outcome is not None:
+                for position in members:
+                    results[position] = outcome
+                continue
+            if deduper is not None:
+                claimed.append(lead)
+                if deduper.mode == "merge":
+                    lead["occurrences"] = len(members)
+            pending.append(members)
+        failed = store.insert_many([docs[m[0]] for m in pending]) if pending else {}
+    except Exception:
+        for doc in claimed:
+            _release_claim(store, doc)
+        raise
+
+    inserted = []
+    for group_index, members in enumerate(pending):
+        lead = docs[members[0]]
+        if group_index in failed:
+            _release_claim(store, lead)
+            for position in members:
+                results[position] = {"ok": False, "message": failed[group_index]}
+            continue
+        inserted.append(lead)
+        results[members[0]] = {"ok": True, "event": serialize_event(lead)}
+        for position in members[1:]:
+            if deduper.mode == "reject":
+                results[position] = _rejected(lead["_id"])
+            else:
+                results[position] = {"ok": True, "duplicate": True, "event": serialize_event(lead)}
+
+    if inserted:
+        _after_insert(store, inserted, settings_doc)
+    return results
+
+
+def _result_status(result: dict) -> int:
+    if result.get("ok"):
+        return 200 if result.get("duplicate") else 201
+    return 409 if result.get("duplicate") else 500
+
+
+def create_event(store: EventStore, data, settings_doc: dict) -> tuple[dict, int]:
+    """POST /events/: returns (response body, status)."""
+    try:
+        doc = build_event_doc(data, settings_doc)
+    except ValueError as exc:
+        return {"ok": False, "message": str(exc)}, 400
+    [result] = _store_events(store, [doc], settings_doc)
+    return result, _result_status(result)
+
+
+def create_events_batch(store: EventStore, data, settings_doc: dict) -> tuple[dict, int]:
+    """POST /events/batch: per-item results in request order, and a status.
+
+    The whole batch is validated before anything is claimed or written.
+    """
+    try:
+        items = parse_batch(data)
+    except ValueError as exc:
+        return {"ok": False, "message": str(exc)}, 400
+
+    results: list[dict] = [{}] * len(items)
+    docs = []
+    positions = []
+    for index, item in enumerate(items):
+        try:
+            docs.append(build_event_doc(item, settings_doc))
+            positions.append(index)
+        except ValueError as exc:
+            results[index] = {"index": index, "ok": False, "message": str(exc)}
+
+    stored = _store_events(store, docs, settings_doc) if docs else []
+    for index, result in zip(positions, stored):
+        results[index] = {"index": index, **result}
+
+    inserted = sum(1 for r in stored if r.get("ok") and not r.get("duplicate"))
+    any_ok = any(r.get("ok") for r in results)
+    status = 201 if inserted else 200 if any_ok else 400
+    return {"ok": any_ok, "inserted": inserted, "results": results}, status
@@ -0,0 +1,253 @@
+"""Durable client-side event spool shared by the detectors.
+
+``spool_event`` appends the event to a local SQLite journal (WAL mode) and
+returns at once; a background flusher drains the journal to POST
+/events/batch, SPOOL_BATCH_SIZE events at a time, backing off exponentially
+while the API is unreachable. Rows are deleted only after the API has
+accepted them (inserted, or merged/rejected as a duplicate), so events
+survive API and database outages as well as detector restarts, and always
+go through the API's priority, dedupe and notification logic.
+
+Several processes may share one journal: a flusher leases the rows it is
+sending, so two flushers never post the same row at the same time. Delivery
+is at least once; the API's per-event cooldown absorbs a batch resent after
+a lost response.
+
+A 500 for a whole batch usually means one row the API chokes on, so the
+flusher halves its batch size until that row goes alone. A row that still
+fails alone while other rows get through is counted as refused and set
+aside, so it cannot hold up the rest of the journal.
+"""
+import os
+import json
+import time
+import atexit
+import random
+import sqlite3
+import threading
+
+import http_client
+
+
+API_BASE = os.getenv("API_BASE", "http://127.0.0.1:5000")
+SPOOL_PATH = os.getenv("EVENT_SPOOL_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "spool", "events.db"))
+SPOOL_BATCH_SIZE = int(os.getenv("EVENT_SPOOL_BATCH_SIZE", "100"))
+SPOOL_FLUSH_SECONDS = float(os.getenv("EVENT_SPOOL_FLUSH_SECONDS", "5"))  # idle poll for other writers' rows
+SPOOL_MIN_BACKOFF = float(os.getenv("EVENT_SPOOL_MIN_BACKOFF", "1"))
+SPOOL_MAX_BACKOFF = float(os.getenv("EVENT_SPOOL_MAX_BACKOFF", "300"))
+SPOOL_MAX_ATTEMPTS = int(os.getenv("EVENT_SPOOL_MAX_ATTEMPTS", "20"))  # per event, for rows the API refuses
+LEASE_SECONDS = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    payload TEXT NOT NULL,
+    created REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_until REAL NOT NULL DEFAULT 0
+)
+"""
+
+
+class EventSpool:
+    def __init__(self, path: str = SPOOL_PATH, api_base: str = API_BASE, batch_size: int = SPOOL_BATCH_SIZE):
+        self.path = path
+        self.api_base = api_base
+        self.batch_size = max(1, batch_size)
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=10.0, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(_SCHEMA)
+        self.lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._backoff = 0.0
+        self._retry_at = 0.0
+        self.send_size = self.batch_size
+        self._api_ok = False  # the last batch got per-row results
+        self.sent = 0
+        self.dropped = 0
+
+    def submit(self, payload: dict) -> int:
+        """Appends an event to the journal; returns its row id. Never touches the network."""
+        with self.lock:
+            cur = self.conn.execute(
+                "INSERT INTO events (payload, created) VALUES (?, ?)", (json.dumps(payload), time.time())
+            )
+        self._wake.set()
+        return cur.lastrowid
+
+    def pending(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def _claim(self) -> list[tuple[int, str, int]]:
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.conn.execute(
+                    "SELECT id, payload, attempts FROM events WHERE lease_until < ? ORDER BY id LIMIT ?",
+                    (now, self.send_size),
+                ).fetchall()
+                if rows:
+                    self.conn.executemany(
+                        "UPDATE events SET lease_until = ? WHERE id = ?", [(now + LEASE_SECONDS, r[0]) for r in rows]
+                    )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return rows
+
+    def _settle(self, done: list[int], refused: list[tuple[int, int]], released: list[int]):
+        """Deletes ``done`` rows, sets refused (id, attempts) rows aside for a while, frees ``released``."""
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.executemany("DELETE FROM events WHERE id = ?", [(i,) for i in done])
+                self.conn.executemany(
+                    "UPDATE events SET attempts = ?, lease_until = ? WHERE id = ?",
+                    [(a, now + _retry_delay(a), i) for i, a in refused],
+                )
+                self.conn.executemany("UPDATE events SET lease_until = 0 WHERE id = ?", [(i,) for i in released])
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def flush_once(self) -> int | None:
+        """Sends one batch; returns the number of events handled, or None if the API is unavailable."""
+        rows = self._claim()
+        if not rows:
+            return 0
+        ids = [r[0] for r in rows]
+        status = None
+        try:
+            resp = http_client.post(
+                f"{self.api_base}/events/batch",
+                json={"events": [json.loads(r[1]) for r in rows]},
+                timeout=(3, 10),
+            )
+            status = resp.status_code
+            results = resp.json().get("results") if status < 500 else None
+        except Exception:
+            results = None
+        if not isinstance(results, list) or len(results) != len(rows):
+            if status == 500:
+                return self._server_error(rows)
+            self._api_ok = False
+            self._settle([], [], ids)
+            return None
+
+        self._api_ok = True
+        self.send_size = min(self.batch_size, self.send_size * 2)
+        done, refused = [], []
+        for (row_id, payload, attempts), result in zip(rows, results):
+            if result.get("ok") or result.get("duplicate"):
+                done.append(row_id)
+            else:
+                self._refuse(row_id, payload, attempts, result.get("message"), done, refused)
+        self._settle(done, refused, [])
+        self.sent += len(done)
+        return len(rows)
+
+    def _refuse(self, row_id: int, payload: str, attempts: int, reason, done: list, refused: list):
+        if attempts + 1 >= SPOOL_MAX_ATTEMPTS:
+            print(f"[SPOOL] Dropping event after {attempts + 1} refusals: {payload} ({reason})")
+            done.append(row_id)
+            self.dropped += 1
+        else:
+            refused.append((row_id, attempts + 1))
+
+    def _server_error(self, rows: list[tuple[int, str, int]]) -> int | None:
+        """Handles a 500 for a whole batch: split it, or set a lone failing row aside."""
+        if len(rows) > 1:
+            self.send_size = max(1, len(rows) // 2)
+            self._settle([], [], [r[0] for r in rows])
+            self._wake.set()  # retry the halves right away
+            return 0
+        row_id, payload, attempts = rows[0]
+        if not self._api_ok:
+            # Nothing has gone through lately either: treat it as an outage,
+            # but let the next row go first so this one cannot block the journal
+            self._settle([], [(row_id, attempts)], [])
+            return None
+        done, refused = [], []
+        self._refuse(row_id, payload, attempts, "HTTP 500", done, refused)
+        self._settle(done, refused, [])
+        self._api_ok = False  # count it again only after another row gets through
+        self._wake.set()
+        return 0
+
+    def _run(self):
+        while not self._stop.is_set():
+            delay = self._retry_at - time.monotonic()
+            if delay > 0:
+                self._stop.wait(delay)
+                continue
+            try:
+                handled = self.flush_once()
+            except sqlite3.Error as exc:
+                print(f"[SPOOL] Journal error: {exc}")
+                handled = None
+            if handled is None:
+                if not self._backoff:
+                    print(f"[SPOOL] API unavailable, keeping {self.pending()} events in {self.path}")
+                self._backoff = min(max(self._backoff * 2, SPOOL_MIN_BACKOFF), SPOOL_MAX_BACKOFF)
+                self._retry_at = time.monotonic() + self._backoff * random.uniform(0.5, 1.0)
+                continue
+            if self._backoff:
+                print("[SPOOL] API reachable again, draining spooled events")
+                self._backoff = 0.0
+            if handled >= self.batch_size:
+                continue  # more rows are waiting
+            self._wake.wait(SPOOL_FLUSH_SECONDS)
+            self._wake.clear()
+
+    def start(self) -> "EventSpool":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="event-spool", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self, timeout: float = 2.0):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        with self.lock:
+            self.conn.close()
+
+
+def _retry_delay(attempts: int) -> float:
+    return min(SPOOL_MAX_BACKOFF, SPOOL_MIN_BACKOFF * 2 ** attempts)
+
+
+_spool: EventSpool | None = None
+_spool_lock = threading.Lock()
+
+
+def get_spool() -> EventSpool:
+    """Returns the process-wide spool, starting its flusher on first use."""
+    global _spool
+    if _spool is not None:
+        return _spool
+    with _spool_lock:
+        if _spool is None:
+            _spool = EventSpool().start()
+            atexit.register(_spool.close)
+        return _spool
+
+
+def spool_event(title: str, event_at: str, uid: str = "", is_important: bool = False) -> int:
+    """Queues an event for POST /events/batch; ``event_at`` is an ISO-8601 string."""
+    payload = {"title": title, "isImportant": is_important, "eventAt": event_at}
+    if uid:
+        payload["uid"] = uid
+    return get_spool().submit(payload)
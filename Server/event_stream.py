@@ -0,0 +1,132 @@
+import os
+import json
+import threading
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from pymongo.errors import OperationFailure, PyMongoError
+
+
+HEARTBEAT_SECONDS = float(os.getenv("EVENT_STREAM_HEARTBEAT", "15"))
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("EVENT_STREAM_QUEUE_SIZE", "100"))
+# Each Flask stream pins a worker thread for as long as the client stays
+# connected; past this many per process /events/stream answers 503. The
+# ASGI app (asgi_server) holds streams on its event loop and has no cap.
+FLASK_MAX_SUBSCRIBERS = int(os.getenv("EVENT_STREAM_MAX_SUBSCRIBERS", "2"))
+REPLAY_LIMIT = 500
+
+HEARTBEAT_FRAME = ": ping\n\n"
+RETRY_FRAME = "retry: 3000\n\n"
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+class EventBroadcaster:
+    """Fans new events out to /events/stream subscribers.
+
+    One change-stream cursor on ``events`` is shared by every connected
+    client of this process and resumes from its last token after errors.
+    Deployments without change streams fall back to polling on createdAt,
+    like bracelet_bridge.watch_events.
+    """
+
+    def __init__(self, db):
+        self.col = db["events"]
+        self.lock = threading.Lock()
+        self.resume_token = None
+        self._subscribers: dict[int, tuple[str, object]] = {}
+        self._next_id = 0
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def subscribe(self, uid: str, callback, limit: int | None = None) -> int | None:
+        """Registers ``callback(doc)`` for new events of ``uid`` (all events if empty).
+
+        Callbacks run on the broadcaster thread and must not block. Returns
+        None without subscribing if ``limit`` subscribers are already connected.
+        """
+        with self.lock:
+            if limit is not None and len(self._subscribers) >= limit:
+                return None
+            self._next_id += 1
+            sub_id = self._next_id
+            self._subscribers[sub_id] = (uid, callback)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="event-broadcaster", daemon=True)
+                self._thread.start()
+        return sub_id
+
+    def unsubscribe(self, sub_id: int):
+        with self.lock:
+            self._subscribers.pop(sub_id, None)
+
+    @property
+    def subscriber_count(self) -> int:
+        with self.lock:
+            return len(self._subscribers)
+
+    def stop(self):
+        self._stop.set()
+
+    def publish(self, doc: dict):
+        uid = doc.get("uid") or ""
+        with self.lock:
+            targets = [cb for sub_uid, cb in self._subscribers.values() if not sub_uid or sub_uid == uid]
+        for callback in targets:
+            try:
+                callback(doc)
+            except Exception:
+                pass
+
+    def _run(self):
+        watched = False
+        while not self._stop.is_set():
+            try:
+                with self.col.watch(
+                    [{"$match": {"operationType": "insert"}}],
+                    resume_after=self.resume_token,
+                ) as stream:
+                    watched = True
+                    while not self._stop.is_set():
+                        change = stream.try_next()
+                        if change is None:
+                            continue
+                        self.resume_token = stream.resume_token
+                        self.publish(change.get("fullDocument") or {})
+            except Exception as exc:
+                if not watched or not isinstance(exc, PyMongoError):
+                    print(f"[STREAM] Change stream unavailable, polling events: {exc}")
+                    self._poll()
+                    return
+                print(f"[STREAM] Change stream interrupted, resuming: {exc}")
+                if isinstance(exc, OperationFailure):
+                    # e.g. the resume point fell off the oplog; start from now
+                    self.resume_token = None
+                self._stop.wait(1.0)
+
+    def _poll(self):
+        last_ts = datetime.now(timezone.utc)
+        while not self._stop.is_set():
+            try:
+                for doc in self.col.find({"createdAt": {"$gt": last_ts}}).sort("createdAt", 1):
+                    last_ts = doc.get("createdAt", last_ts)
+                    self.publish(doc)
+            except Exception:
+                pass
+            self._stop.wait(1.0)
+
+
+def replay_query(uid: str, last_event_id: str) -> dict | None:
+    """Query for events a reconnecting client missed, or None if the id is unusable."""
+    try:
+        oid = ObjectId(last_event_id)
+    except Exception:
+        return None
+    q = {"_id": {"$gt": oid}}
+    if uid:
+        q["uid"] = uid
+    return q
+
+
+def format_sse(event: dict, event_id: str) -> str:
+    return f"id: {event_id}\nevent: event\ndata: {json.dumps(event)}\n\n"
+
@@ -1,188 +1,143 @@
-from datetime import datetime, timezone
-
-from flask import Blueprint, current_app, jsonify, request
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
 from bson import ObjectId
-import os
-import requests
-import json
+import queue
+
+from event_rollups import ROLLUPS_COLLECTION, serialize_rollup
+from event_service import (
+    MAX_ROLLUP_BUCKETS,
+    EventPage,
+    EventStore,
+    StreamSession,
+    build_event_update,
+    build_list_query,
+    build_rollups_query,
+    create_event as ingest_event,
+    create_events_batch as ingest_batch,
+    find_page,
+    serialize_event,
+)
+from event_stream import (
+    FLASK_MAX_SUBSCRIBERS,
+    HEARTBEAT_FRAME,
+    HEARTBEAT_SECONDS,
+    RETRY_FRAME,
+    SSE_HEADERS,
+    SUBSCRIBER_QUEUE_SIZE,
+)
+from settings import get_cached_settings
 
 
 events_bp = Blueprint("events_bp", __name__)
 
 
-def _format_date_time(dt: datetime) -> tuple[str, str]:
-    return dt.strftime("%m/%d/%Y"), dt.strftime("%H:%M")
-
+def _stream_events(cursor, page: EventPage):
+    yield page.open()
+    for doc in cursor:
+        chunk = page.add(doc)
+        if chunk is None:
+            break
+        yield chunk
+    yield page.close()
 
-def _serialize_event(doc: dict) -> dict:
-    event_at: datetime = doc.get("eventAt") or doc.get("createdAt") or datetime.now(timezone.utc)
-    if isinstance(event_at, str):
-        try:
-            event_at = datetime.fromisoformat(event_at)
-        except Exception:
-            event_at = datetime.now(timezone.utc)
-    try:
-        if event_at.tzinfo is None or event_at.tzinfo.utcoffset(event_at) is None:
-            event_at = event_at.replace(tzinfo=timezone.utc)
-    except Exception:
-        event_at = datetime.now(timezone.utc)
-    date_str, time_str = _format_date_time(event_at.astimezone())
-    return {
-        "id": str(doc.get("_id")),
-        "title": doc.get("title", ""),
-        "description": "",
-        "date": date_str,
-        "time": time_str,
-        "eventAt": event_at.isoformat(),
-        "isImportant": bool(doc.get("isImportant", False)),
-    }
-
-
-def _normalize_event_key(title: str) -> str:
-    t = (title or "").strip().lower()
-    mapping = {
-        "baby crying": "baby_crying",
-        "baby movement": "baby_movement",
-        "door knocking": "door_knocking",
-        "phone call": "phone_call",
-    }
-    if t in mapping:
-        return mapping[t]
-    return t.replace(" ", "_")
-
-
-def _is_within_quiet_hours(quiet: dict | None) -> bool:
-    if not isinstance(quiet, dict):
-        return False
-    start = (quiet.get("start") or "").strip()
-    end = (quiet.get("end") or "").strip()
-    try:
-        now = datetime.now().time()
-        if not start or not end or len(start) != 5 or len(end) != 5:
-            return False
-        sh, sm = int(start[:2]), int(start[3:])
-        eh, em = int(end[:2]), int(end[3:])
-        start_t = now.replace(hour=sh, minute=sm, second=0, microsecond=0)
-        end_t = now.replace(hour=eh, minute=em, second=0, microsecond=0)
-        if start_t <= end_t:
-            return start_t <= now <= end_t
-        else:
-            return now >= start_t or now <= end_t
-    except Exception:
-        return False
 
 @events_bp.route("/", methods=["GET"])  
 def list_events():
     db = current_app.config.get("DB")
-    coll = db["events"]
-    uid = (request.args.get("uid") or "").strip()
-    q = {"uid": uid} if uid else {}
-    items = list(coll.find(q).sort("eventAt", -1))
-    return jsonify({"ok": True, "events": [_serialize_event(x) for x in items]})
+    try:
+        q, limit = build_list_query(request.args)
+    except ValueError as exc:
+        return jsonify({"ok": False, "message": str(exc)}), 400
+    cursor = find_page(db["events"], q, limit)
+    return Response(stream_with_context(_stream_events(cursor, EventPage(limit))), mimetype="application/json")
 
 
-@events_bp.route("/", methods=["POST"])  
-def create_event():
+@events_bp.route("/rollups", methods=["GET"])
+def list_rollups():
     db = current_app.config.get("DB")
-    coll = db["events"]
-    data = request.get_json(force=True, silent=True) or {}
-    title = (data.get("title") or "").strip()
-    uid = (data.get("uid") or "").strip() 
-    description = ""
-    is_important = bool(data.get("isImportant", False))
-    event_at_iso = data.get("eventAt")
+    try:
+        q = build_rollups_query(request.args)
+    except ValueError as exc:
+        return jsonify({"ok": False, "message": str(exc)}), 400
+    docs = db[ROLLUPS_COLLECTION].find(q).sort("bucketStart", 1).limit(MAX_ROLLUP_BUCKETS)
+    return jsonify({"ok": True, "rollups": [serialize_rollup(d) for d in docs]})
 
-    if not title:
-        return jsonify({"ok": False, "message": "Missing title"}), 400
 
+@events_bp.route("/stream", methods=["GET"])
+def stream_events():
+    db = current_app.config.get("DB")
+    broadcaster = current_app.config["EVENT_BROADCASTER"]
+    uid = (request.args.get("uid") or "").strip()
+    last_event_id = (request.headers.get("Last-Event-ID") or request.args.get("lastEventId") or "").strip()
+    session = StreamSession(uid, last_event_id)
+
+    pending = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def deliver(doc: dict):
+        # A slow client loses its oldest events rather than stalling the broadcaster
+        while True:
+            try:
+                pending.put_nowait(doc)
+                return
+            except queue.Full:
+                try:
+                    pending.get_nowait()
+                except queue.Empty:
+                    pass
+
+    # Subscribe before replaying so nothing inserted in between is missed
+    sub_id = broadcaster.subscribe(uid, deliver, limit=FLASK_MAX_SUBSCRIBERS)
+    if sub_id is None:
+        resp = jsonify({"ok": False, "message": "Too many event streams on this server; use the ASGI app for /events/stream"})
+        resp.headers["Retry-After"] = str(int(HEARTBEAT_SECONDS))
+        return resp, 503
+
+    def generate():
+        try:
+            yield RETRY_FRAME
+            for doc in session.replay_cursor(db["events"]) or ():
+                yield session.replayed(doc)
+            while True:
+                try:
+                    doc = pending.get(timeout=HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield HEARTBEAT_FRAME
+                    continue
+                frame = session.live(doc)
+                if frame is not None:
+                    yield frame
+        finally:
+            broadcaster.unsubscribe(sub_id)
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream", headers=SSE_HEADERS)
+
+
+def _load_settings() -> dict:
     try:
-        event_at = datetime.fromisoformat(event_at_iso) if event_at_iso else datetime.now(timezone.utc)
+        return get_cached_settings()
     except Exception:
-        event_at = datetime.now(timezone.utc)
+        return {}
 
-    try:
-        settings_coll = db["settings"]
-        settings_doc = settings_coll.find_one({"_id": "global"}) or {}
-        if not data.get("isImportant"):
-            key = _normalize_event_key(title)
-            priorities = settings_doc.get("priorities") or {}
-            if isinstance(priorities, dict):
-                is_important = bool(priorities.get(key, False))
-    except Exception:
-        pass
-
-    doc = {
-        "title": title,
-        "isImportant": is_important,
-        "eventAt": event_at,
-        "createdAt": datetime.now(timezone.utc),
-        **({"uid": uid} if uid else {}),
-    }
-    inserted = coll.insert_one(doc)
-    created = coll.find_one({"_id": inserted.inserted_id})
 
-    try:
-        server_key = os.getenv("FCM_SERVER_KEY")
-        if server_key:
-            db = current_app.config.get("DB")
-            users_coll = db["users"]
-            settings_doc = (db["settings"].find_one({"_id": "global"}) or {})
-            if _is_within_quiet_hours(settings_doc.get("quietHours")):
-                raise Exception("Within quiet hours; skipping FCM")
-            tokens = set()
-            if uid:
-                for query in ([{"_id": uid}], [{"_id": ObjectId(uid)}] if len(uid) == 24 else []):
-                    try:
-                        user_doc = users_coll.find_one(*query)
-                        if user_doc:
-                            for t in user_doc.get("fcmTokens", []) or []:
-                                if isinstance(t, str) and len(t) > 20:
-                                    tokens.add(t)
-                            break
-                    except Exception:
-                        pass
-            if not tokens:
-                for user in users_coll.find({}, {"fcmTokens": 1}):
-                    for t in user.get("fcmTokens", []) or []:
-                        if isinstance(t, str) and len(t) > 20:
-                            tokens.add(t)
-
-            if tokens:
-                headers = {
-                    "Authorization": f"key={server_key}",
-                    "Content-Type": "application/json",
-                }
-                payload = {
-                    "registration_ids": list(tokens),
-                    "notification": {
-                        "title": doc.get("title", "Event"),
-                        "body": doc.get("description", "New event"),
-                    },
-                    "data": {
-                        "eventId": str(inserted.inserted_id),
-                        "source": doc.get("source", "ml"),
-                        "eventAt": doc.get("eventAt").isoformat() if doc.get("eventAt") else "",
-                        "uid": uid,
-                    },
-                    "android": {"priority": "high"},
-                    "apns": {"headers": {"apns-priority": "10"}},
-                }
-                requests.post("https://fcm.googleapis.com/fcm/send", json=payload, headers=headers, timeout=5)
-    except Exception:
-        pass
+def _event_store() -> EventStore:
+    return EventStore(
+        current_app.config.get("DB"),
+        current_app.config.get("EVENT_DEDUPER"),
+        current_app.config.get("NOTIFY_WORKER"),
+    )
 
-    try:
-        rtdb_url = os.getenv("FIREBASE_RTDB_URL") 
-        if rtdb_url:
-            message_value = doc.get("title", "Event")
-            requests.patch(
-                f"{rtdb_url}/Notifications.json",
-                data=json.dumps({"message": message_value}),
-                timeout=5,
-            )
-    except Exception:
-        pass
-    return jsonify({"ok": True, "event": _serialize_event(created)}), 201
+
+@events_bp.route("/", methods=["POST"])  
+def create_event():
+    data = request.get_json(force=True, silent=True) or {}
+    body, status = ingest_event(_event_store(), data, _load_settings())
+    return jsonify(body), status
+
+
+@events_bp.route("/batch", methods=["POST"])
+def create_events_batch():
+    data = request.get_json(force=True, silent=True)
+    body, status = ingest_batch(_event_store(), data, _load_settings())
+    return jsonify(body), status
 
 
 @events_bp.route("/<event_id>", methods=["PATCH"]) 
@@ -195,14 +150,10 @@ def update_event(event_id: str):
         return jsonify({"ok": False, "message": "Invalid id"}), 400
 
     data = request.get_json(force=True, silent=True) or {}
-    update = {}
-    if "isImportant" in data:
-        update["isImportant"] = bool(data.get("isImportant"))
-    if "title" in data:
-        update["title"] = (data.get("title") or "").strip()
-    if "description" in data:
-        update["description"] = (data.get("description") or "").strip()
-
+    try:
+        update = build_event_update(data)
+    except ValueError as exc:
+        return jsonify({"ok": False, "message": str(exc)}), 400
     if not update:
         return jsonify({"ok": False, "message": "Nothing to update"}), 400
 
@@ -210,6 +161,6 @@ def update_event(event_id: str):
     after = coll.find_one({"_id": oid})
     if not after:
         return jsonify({"ok": False, "message": "Not found"}), 404
-    return jsonify({"ok": True, "event": _serialize_event(after)})
+    return jsonify({"ok": True, "event": serialize_event(after)})
 
 
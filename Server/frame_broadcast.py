@@ -0,0 +1,335 @@
+import os
+import time
+import threading
+
+import cv2
+
+from frame_bus import frame_intact, open_source
+
+
+RECONNECT_SECONDS = 2.0
+VIEWER_WAIT_SECONDS = 5.0
+DEFAULT_QUALITY = int(os.getenv("CAMERA_JPEG_QUALITY", "80"))
+DEFAULT_PROFILE = os.getenv("CAMERA_DEFAULT_PROFILE", "high")
+MAX_WIDTH = 1920
+LOG_INTERVAL_SECONDS = float(os.getenv("CAMERA_LOG_INTERVAL", "10"))
+STATS_WINDOW_SECONDS = 2.0
+# name -> (width, JPEG quality, max fps); width/fps 0 = native
+PROFILES = {
+    "low": (320, 50, 10.0),
+    "medium": (640, 70, 15.0),
+    "high": (0, DEFAULT_QUALITY, 0.0),
+}
+
+
+class RateLimitedLog:
+    """``[CAMERA] event key=value ...`` lines, at most one per event per interval.
+
+    Lines dropped in between are counted and reported with the next one, so
+    a failure repeating at frame rate costs one line every few seconds.
+    """
+
+    def __init__(self, interval: float = LOG_INTERVAL_SECONDS):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self._last: dict[str, float] = {}
+        self._suppressed: dict[str, int] = {}
+
+    def __call__(self, event: str, **fields):
+        now = time.monotonic()
+        with self.lock:
+            if now - self._last.get(event, -self.interval) < self.interval:
+                self._suppressed[event] = self._suppressed.get(event, 0) + 1
+                return
+            self._last[event] = now
+            suppressed = self._suppressed.pop(event, 0)
+        if suppressed:
+            fields["suppressed"] = suppressed
+        print(f"[CAMERA] {event} " + " ".join(f"{k}={v}" for k, v in fields.items()))
+
+
+log = RateLimitedLog()
+
+
+class BroadcastStats:
+    """Counters behind GET /stats; rates cover the last STATS_WINDOW_SECONDS."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.captured = 0
+        self.encoded = 0
+        self.bytes_sent = 0
+        self.frames_sent = 0
+        self.capture_fps = 0.0
+        self.encode_ms = 0.0
+        self._window_start = self.started
+        self._window_captured = 0
+        self._window_encoded = 0
+        self._window_encode_seconds = 0.0
+
+    def frame_captured(self):
+        with self.lock:
+            self.captured += 1
+            self._window_captured += 1
+            now = time.monotonic()
+            elapsed = now - self._window_start
+            if elapsed >= STATS_WINDOW_SECONDS:
+                self.capture_fps = self._window_captured / elapsed
+                if self._window_encoded:
+                    self.encode_ms = 1000.0 * self._window_encode_seconds / self._window_encoded
+                self._window_start = now
+                self._window_captured = self._window_encoded = 0
+                self._window_encode_seconds = 0.0
+
+    def frame_encoded(self, seconds: float):
+        with self.lock:
+            self.encoded += 1
+            self._window_encoded += 1
+            self._window_encode_seconds += seconds
+
+    def frame_sent(self, size: int):
+        with self.lock:
+            self.frames_sent += 1
+            self.bytes_sent += size
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "uptimeSeconds": round(time.monotonic() - self.started, 1),
+                "captureFps": round(self.capture_fps, 2),
+                "encodeMs": round(self.encode_ms, 3),
+                "framesCaptured": self.captured,
+                "framesEncoded": self.encoded,
+                "framesSent": self.frames_sent,
+                "bytesSent": self.bytes_sent,
+            }
+
+
+def open_capture(source: str):
+    return open_source(source)
+
+
+def zoom_crop(frame, zoom_level: float):
+    """Centre crop for ``zoom_level`` as a view into ``frame`` (no copy)."""
+    if zoom_level <= 1.01:
+        return frame
+    height, width = frame.shape[:2]
+    center_x, center_y = width // 2, height // 2
+    new_w, new_h = int(width / zoom_level), int(height / zoom_level)
+    x1 = max(center_x - new_w // 2, 0)
+    y1 = max(center_y - new_h // 2, 0)
+    x2 = min(center_x + new_w // 2, width)
+    y2 = min(center_y + new_h // 2, height)
+    return frame[y1:y2, x1:x2]
+
+
+class StreamProfile:
+    """Output width (0 = native), JPEG quality and frame-rate cap for a viewer."""
+
+    __slots__ = ("width", "quality", "max_fps")
+
+    def __init__(self, width: int = 0, quality: int = DEFAULT_QUALITY, max_fps: float = 0.0):
+        self.width = width
+        self.quality = quality
+        self.max_fps = max_fps
+
+    @property
+    def key(self) -> tuple:
+        return (self.width, self.quality, self.max_fps)
+
+
+def parse_profile(args) -> StreamProfile:
+    """Builds a profile from /video_feed query args; raises ValueError on bad input.
+
+    ``profile`` picks a preset (low, medium, high); ``width``, ``quality`` and
+    ``fps`` override single fields.
+    """
+    name = (args.get("profile") or DEFAULT_PROFILE).strip().lower()
+    if name not in PROFILES:
+        raise ValueError(f"profile must be one of {', '.join(PROFILES)}")
+    width, quality, max_fps = PROFILES[name]
+    try:
+        if args.get("width"):
+            width = int(args.get("width"))
+        if args.get("quality"):
+            quality = int(args.get("quality"))
+        if args.get("fps"):
+            max_fps = float(args.get("fps"))
+    except ValueError:
+        raise ValueError("width, quality and fps must be numbers")
+    if width < 0 or not 1 <= quality <= 100 or max_fps < 0:
+        raise ValueError("width and fps must be >= 0 and quality between 1 and 100")
+    # Snap to a few sizes so similar requests share one encode
+    width = min(MAX_WIDTH, -(-width // 16) * 16) if width else 0
+    return StreamProfile(width, quality, max_fps)
+
+
+def render_profile(frame, zoom_level: float, profile: StreamProfile):
+    """Crops for zoom and scales straight to the profile's output size.
+
+    The crop is never scaled back up to the sensor size first: a zoomed view
+    is sent at the crop's own resolution, or smaller if the profile asks.
+    """
+    view = zoom_crop(frame, zoom_level)
+    height, width = view.shape[:2]
+    if not profile.width or profile.width >= width:
+        return view
+    out_h = max(1, round(height * profile.width / width))
+    return cv2.resize(view, (profile.width, out_h), interpolation=cv2.INTER_AREA)
+
+
+class _ProfileFeed:
+    __slots__ = ("profile", "params", "seq", "jpeg", "viewers", "next_due")
+
+    def __init__(self, profile: StreamProfile):
+        self.profile = profile
+        self.params = [cv2.IMWRITE_JPEG_QUALITY, profile.quality]
+        self.seq = 0
+        self.jpeg: bytes | None = None
+        self.viewers = 0
+        self.next_due = 0.0
+
+
+def mjpeg_part(jpeg: bytes) -> bytes:
+    return b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n'
+
+
+class FrameBroadcaster:
+    """Captures the camera once and JPEG-encodes it once per distinct profile.
+
+    A single thread owns the VideoCapture. For every profile that currently
+    has viewers it renders and encodes the frame (at most at the profile's
+    max fps) and publishes it under that profile's sequence number; viewers
+    wait on a Condition for a newer sequence than the one they last sent. A
+    slow viewer simply finds several frames have passed and sends the newest,
+    so it never holds up the others, and ten viewers on one profile cost one
+    encode. Nothing is encoded while nobody is watching.
+    """
+
+    def __init__(self, source: str = "0", realtime: bool | None = None):
+        self.source = source
+        # Files are paced to their own frame rate like a live camera
+        self.realtime = os.path.isfile(source) if realtime is None else realtime
+        self.stats = BroadcastStats()
+        self.zoom_level = 1.0
+        self.cond = threading.Condition()
+        self.feeds: dict[tuple, _ProfileFeed] = {}
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    @property
+    def viewers(self) -> int:
+        with self.cond:
+            return sum(feed.viewers for feed in self.feeds.values())
+
+    def start(self) -> "FrameBroadcaster":
+        with self.cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="frame-broadcaster", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        with self.cond:
+            self.cond.notify_all()
+
+    def _run(self):
+        while not self._stop.is_set():
+            camera = open_capture(self.source)
+            if not camera.isOpened():
+                log("camera_open_failed", source=self.source, retry_seconds=RECONNECT_SECONDS)
+                camera.release()
+                self._stop.wait(RECONNECT_SECONDS)
+                continue
+            log("camera_opened", source=self.source, zoom=self.zoom_level)
+            try:
+                self._capture_loop(camera)
+            finally:
+                camera.release()
+            self._stop.wait(RECONNECT_SECONDS)
+
+    def _capture_loop(self, camera):
+        fps = camera.get(cv2.CAP_PROP_FPS) if self.realtime else 0.0
+        period = 1.0 / fps if fps and fps > 0 else 0.0
+        next_frame = time.monotonic()
+        while not self._stop.is_set():
+            if period:
+                next_frame += period
+                delay = next_frame - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_frame = time.monotonic()
+            success, frame = camera.read()
+            if not success:
+                log("camera_read_failed", source=self.source)
+                return
+            self.stats.frame_captured()
+            now = time.monotonic()
+            with self.cond:
+                due = [f for f in self.feeds.values() if f.viewers and now >= f.next_due]
+            if not due:
+                continue  # keep the capture buffer fresh, skip the encode
+
+            zoom_level = self.zoom_level
+            for feed in due:
+                if feed.profile.max_fps:
+                    # Schedule from the previous slot so the cap holds on average
+                    feed.next_due = max(feed.next_due + 1.0 / feed.profile.max_fps, now - 0.5 / feed.profile.max_fps)
+                started = time.perf_counter()
+                ret, buffer = cv2.imencode('.jpg', render_profile(frame, zoom_level, feed.profile), feed.params)
+                self.stats.frame_encoded(time.perf_counter() - started)
+                if not frame_intact(camera):
+                    # Frame bus slot reused mid-encode; the JPEG may be torn
+                    log("frame_overwritten", source=self.source)
+                    break
+                if not ret:
+                    log("encode_failed", profile=feed.profile.key)
+                    continue
+                self.publish(feed, buffer.tobytes())
+
+    def snapshot(self) -> dict:
+        stats = self.stats.snapshot()
+        with self.cond:
+            feeds = list(self.feeds.values())
+            stats["viewers"] = sum(f.viewers for f in feeds)
+            stats["profiles"] = [
+                {"width": f.profile.width, "quality": f.profile.quality, "maxFps": f.profile.max_fps, "viewers": f.viewers}
+                for f in feeds
+            ]
+        stats["zoom"] = self.zoom_level
+        return stats
+
+    def publish(self, feed: _ProfileFeed, jpeg: bytes):
+        with self.cond:
+            feed.seq += 1
+            feed.jpeg = jpeg
+            self.cond.notify_all()
+
+    def frames(self, profile: StreamProfile | None = None):
+        """Yields multipart MJPEG parts for one viewer until the client disconnects."""
+        profile = profile or StreamProfile()
+        self.start()
+        with self.cond:
+            feed = self.feeds.get(profile.key)
+            if feed is None:
+                feed = self.feeds[profile.key] = _ProfileFeed(profile)
+            feed.viewers += 1
+            last_seq = feed.seq
+        try:
+            while not self._stop.is_set():
+                with self.cond:
+                    if not self.cond.wait_for(lambda: feed.seq != last_seq or self._stop.is_set(), VIEWER_WAIT_SECONDS):
+                        continue
+                    last_seq, jpeg = feed.seq, feed.jpeg
+                if jpeg is not None:
+                    part = mjpeg_part(jpeg)
+                    yield part
+                    self.stats.frame_sent(len(part))
+        finally:
+            with self.cond:
+                feed.viewers -= 1
+                if not feed.viewers:
+                    del self.feeds[profile.key]
@@ -0,0 +1,327 @@
+"""Shared-memory frame bus: decode a camera once, read it from many processes.
+
+One publisher process owns the camera and writes every decoded BGR frame
+into a ring of FRAME_BUS_SLOTS slots in a ``multiprocessing.shared_memory``
+block, stamping each slot with a sequence number. camera_server, the
+movement service and any other reader attach to the block by name and get
+the newest frame as a NumPy view straight into shared memory, so a frame is
+decoded exactly once and never copied between processes.
+
+    python frame_bus.py --source 0 --name nursery       # publisher
+    CAMERA_SOURCE=bus:nursery python camera_server.py   # reader
+    cameras.json: {"id": "nursery", "source": "bus:nursery"}
+
+Block layout: an int64 header (magic, height, width, channels, slots,
+latest sequence), float64 fps and writer heartbeat, per-slot sequence and
+timestamp tables, then the frame slots. The writer clears a slot's sequence
+before overwriting it and sets it afterwards. A reader checks the sequence
+when it takes a view and again (``frame_intact``) once it has copied or
+encoded the frame, dropping the result if the writer lapped the ring in
+between, so a torn frame is never passed on. A view stays valid for
+FRAME_BUS_SLOTS - 1 frames.
+"""
+import os
+import time
+import signal
+import argparse
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+
+FRAME_BUS_SLOTS = int(os.getenv("FRAME_BUS_SLOTS", "8"))
+STALE_SECONDS = float(os.getenv("FRAME_BUS_STALE_SECONDS", "5"))  # no heartbeat: publisher is gone
+BUS_PREFIX = "bus:"
+MAGIC = 0x48594642  # "HYFB"
+
+_HEADER_INTS = 8  # magic, height, width, channels, slots, latest seq, reserved x2
+_H_MAGIC, _H_HEIGHT, _H_WIDTH, _H_CHANNELS, _H_SLOTS, _H_LATEST = range(6)
+_T_FPS, _T_HEARTBEAT = range(2)
+_published: set[str] = set()  # blocks this process created, tracked for unlink on exit
+
+
+def shm_name(name: str) -> str:
+    return f"hearyou-frames-{name}"
+
+
+def _layout(slots: int, shape: tuple[int, int, int]) -> tuple[int, int]:
+    """Returns (frames offset, total size) for a block."""
+    tables = 8 * _HEADER_INTS + 8 * 2 + 16 * slots
+    offset = -(-tables // 64) * 64  # frames start cache-line aligned
+    return offset, offset + slots * int(np.prod(shape))
+
+
+class _BusBlock:
+    def __init__(self, shm: shared_memory.SharedMemory, slots: int, shape: tuple[int, int, int]):
+        self.shm = shm
+        buf = shm.buf
+        self.header = np.ndarray((_HEADER_INTS,), np.int64, buf, 0)
+        self.times = np.ndarray((2,), np.float64, buf, 8 * _HEADER_INTS)
+        base = 8 * _HEADER_INTS + 16
+        self.slot_seq = np.ndarray((slots,), np.int64, buf, base)
+        self.slot_ts = np.ndarray((slots,), np.float64, buf, base + 8 * slots)
+        offset, _ = _layout(slots, shape)
+        self.frames = np.ndarray((slots, *shape), np.uint8, buf, offset)
+        self.slots = slots
+        self.shape = shape
+
+    def release(self):
+        # Views must go before the mapping can close
+        self.header = self.times = self.slot_seq = self.slot_ts = self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # a caller still holds a frame view; the mapping goes with it
+
+
+class FrameBusWriter:
+    """Publisher side; created lazily from the first frame's shape."""
+
+    def __init__(self, name: str, shape: tuple[int, int, int], fps: float = 0.0, slots: int = FRAME_BUS_SLOTS):
+        self.name = name
+        size = _layout(slots, shape)[1]
+        try:
+            shm = shared_memory.SharedMemory(shm_name(name), create=True, size=size)
+        except FileExistsError:
+            shm = self._replace_stale(name, size)
+        _published.add(name)
+        self.block = _BusBlock(shm, slots, shape)
+        self.block.header[:] = 0
+        self.block.slot_seq[:] = 0
+        self.block.header[_H_HEIGHT:_H_SLOTS + 1] = (*shape, slots)
+        self.block.times[:] = (fps or 0.0, time.time())
+        self.block.header[_H_MAGIC] = MAGIC  # readers wait for this
+        self.seq = 0
+
+    @staticmethod
+    def _replace_stale(name: str, size: int) -> shared_memory.SharedMemory:
+        old = shared_memory.SharedMemory(shm_name(name))
+        try:
+            heartbeat = float(np.ndarray((2,), np.float64, old.buf, 8 * _HEADER_INTS)[_T_HEARTBEAT])
+        finally:
+            old.close()
+        if time.time() - heartbeat < STALE_SECONDS:
+            raise RuntimeError(f"Frame bus '{name}' already has a live publisher")
+        # Left behind by a publisher that died; readers still mapping it reattach
+        old.unlink()
+        return shared_memory.SharedMemory(shm_name(name), create=True, size=size)
+
+    def publish(self, frame: np.ndarray, timestamp: float | None = None) -> int:
+        block = self.block
+        if frame.shape != block.shape:
+            import cv2
+
+            frame = cv2.resize(frame, (block.shape[1], block.shape[0]))
+        seq = self.seq + 1
+        slot = seq % block.slots
+        block.slot_seq[slot] = 0
+        block.frames[slot] = frame
+        block.slot_ts[slot] = time.time() if timestamp is None else timestamp
+        block.slot_seq[slot] = seq
+        block.header[_H_LATEST] = seq
+        block.times[_T_HEARTBEAT] = time.time()
+        self.seq = seq
+        return seq
+
+    def heartbeat(self):
+        self.block.times[_T_HEARTBEAT] = time.time()
+
+    def close(self):
+        shm = self.block.shm
+        self.block.release()
+        _published.discard(self.name)
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class FrameBusReader:
+    """Attaches to a published bus; raises FileNotFoundError if there is none yet."""
+
+    def __init__(self, name: str):
+        self.name = name
+        shm = shared_memory.SharedMemory(shm_name(name))
+        # Readers must not unlink the block when they exit (Python < 3.13 tracks
+        # attaches too), but a block published by this process stays tracked
+        if name not in _published:
+            try:
+                resource_tracker.unregister(shm._name, "shared_memory")
+            except Exception:
+                pass
+        header = np.ndarray((_HEADER_INTS,), np.int64, shm.buf, 0)
+        if header[_H_MAGIC] != MAGIC:
+            del header
+            shm.close()
+            raise FileNotFoundError(f"Frame bus '{name}' is not initialized yet")
+        shape = (int(header[_H_HEIGHT]), int(header[_H_WIDTH]), int(header[_H_CHANNELS]))
+        slots = int(header[_H_SLOTS])
+        del header
+        self.block = _BusBlock(shm, slots, shape)
+        self.last_seq = 0
+
+    @property
+    def fps(self) -> float:
+        return float(self.block.times[_T_FPS])
+
+    @property
+    def latest_seq(self) -> int:
+        return int(self.block.header[_H_LATEST])
+
+    def alive(self) -> bool:
+        return time.time() - float(self.block.times[_T_HEARTBEAT]) < STALE_SECONDS
+
+    def valid(self, seq: int) -> bool:
+        """True while the slot holding ``seq`` has not been overwritten."""
+        return int(self.block.slot_seq[seq % self.block.slots]) == seq
+
+    def latest(self) -> tuple[int, float, np.ndarray] | None:
+        """Newest frame as (seq, timestamp, read-only view), or None if nothing is published."""
+        block = self.block
+        for _ in range(3):
+            seq = int(block.header[_H_LATEST])
+            if not seq:
+                return None
+            slot = seq % block.slots
+            view = block.frames[slot]
+            timestamp = float(block.slot_ts[slot])
+            if int(block.slot_seq[slot]) == seq:
+                view = view.view()
+                view.flags.writeable = False
+                return seq, timestamp, view
+        return None
+
+    def wait_next(self, timeout: float = STALE_SECONDS) -> tuple[int, float, np.ndarray] | None:
+        """Waits for a frame newer than the last one returned; skips frames this reader missed."""
+        deadline = time.monotonic() + timeout
+        poll = min(0.005, 0.25 / self.fps) if self.fps > 0 else 0.005
+        while True:
+            if self.latest_seq > self.last_seq:
+                frame = self.latest()
+                if frame is not None:
+                    self.last_seq = frame[0]
+                    return frame
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(poll)
+
+    def close(self):
+        self.block.release()
+
+
+class BusCapture:
+    """cv2.VideoCapture look-alike over a frame bus, for ``bus:<name>`` sources.
+
+    ``read`` returns a zero-copy view that stays valid for FRAME_BUS_SLOTS - 1
+    frames; copy it if it is kept longer, and check ``valid`` after copying or
+    encoding it.
+    """
+
+    def __init__(self, name: str):
+        try:
+            self.reader: FrameBusReader | None = FrameBusReader(name)
+        except FileNotFoundError:
+            self.reader = None
+        self.seq = 0
+
+    def isOpened(self) -> bool:  # noqa: N802 - cv2 API
+        return self.reader is not None
+
+    def read(self):
+        if self.reader is None:
+            return False, None
+        frame = self.reader.wait_next()
+        if frame is None or not self.reader.alive():
+            return False, None  # publisher gone; caller reopens
+        self.seq, _, view = frame
+        return True, view
+
+    def valid(self) -> bool:
+        """True while the frame last returned by ``read`` has not been overwritten."""
+        return self.reader is not None and self.reader.valid(self.seq)
+
+    def get(self, prop: int) -> float:
+        import cv2
+
+        if self.reader is not None and prop == cv2.CAP_PROP_FPS:
+            return self.reader.fps
+        return 0.0
+
+    def release(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+
+def frame_intact(capture) -> bool:
+    """True unless ``capture`` is a BusCapture whose last frame was overwritten."""
+    return not isinstance(capture, BusCapture) or capture.valid()
+
+
+def open_source(source: str):
+    """VideoCapture for a device index, file or URL, or a BusCapture for ``bus:<name>``."""
+    if source.startswith(BUS_PREFIX):
+        return BusCapture(source[len(BUS_PREFIX):])
+    import cv2
+
+    return cv2.VideoCapture(int(source) if source.isdigit() else source)
+
+
+def publish_loop(source: str, name: str, slots: int = FRAME_BUS_SLOTS, stop_event=None):
+    """Decodes ``source`` and publishes every frame until stopped; reopens it on failure."""
+    import cv2
+
+    writer = None
+    realtime = os.path.isfile(source)
+    try:
+        while stop_event is None or not stop_event.is_set():
+            cap = open_source(source)
+            if not cap.isOpened():
+                print(f"[BUS] Could not open {source}, retrying")
+                cap.release()
+                time.sleep(2.0)
+                continue
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            period = 1.0 / fps if realtime and fps and fps > 0 else 0.0
+            next_frame = time.monotonic()
+            while stop_event is None or not stop_event.is_set():
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                if writer is None:
+                    writer = FrameBusWriter(name, frame.shape, fps, slots)
+                    print(f"[BUS] Publishing {source} as bus:{name} ({frame.shape[1]}x{frame.shape[0]}, {slots} slots)")
+                writer.publish(frame)
+                if period:
+                    # Files are paced like a live camera
+                    next_frame += period
+                    delay = next_frame - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    else:
+                        next_frame = time.monotonic()
+            cap.release()
+            if writer is not None:
+                writer.heartbeat()
+            time.sleep(0.5 if realtime else 2.0)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish a camera to a shared-memory frame bus")
+    parser.add_argument("--source", default="0", help="device index, video file or stream URL")
+    parser.add_argument("--name", required=True, help="bus name; readers use the source bus:<name>")
+    parser.add_argument("--slots", type=int, default=FRAME_BUS_SLOTS)
+    args = parser.parse_args()
+    # Unlink the block on `kill` / docker stop too, not only on Ctrl+C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        publish_loop(args.source, args.name, args.slots)
+    except KeyboardInterrupt:
+        print("\n🛑 Stopped by user.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ASCENDING, DESCENDING, IndexModel, MongoClient
+from pymongo.errors import OperationFailure
+from bson import ObjectId
+
+from event_rollups import ROLLUPS_COLLECTION
+from event_service import MAX_ROLLUP_BUCKETS, StreamSession, build_list_query, build_rollups_query, encode_cursor, find_page
+from notifications import OUTBOX_COLLECTION, claim_query
+from weekly_reports import build_reports_query
+
+
+# Compound indexes for every access path the API and the bracelet bridge use.
+INDEXES = {
+    "events": [
+        # GET /events/?uid=... keyset pagination on (eventAt, _id)
+        IndexModel([("uid", ASCENDING), ("eventAt", DESCENDING), ("_id", DESCENDING)], name="uid_eventAt_id"),
+        # GET /events/ without a uid
+        IndexModel([("eventAt", DESCENDING), ("_id", DESCENDING)], name="eventAt_id"),
+        # bracelet_bridge.watch_events polling fallback
+        IndexModel([("createdAt", ASCENDING)], name="createdAt"),
+    ],
+    "weekly_reports": [
+        # Each $or branch of list_weekly_reports needs its own index so the
+        # planner can merge-sort them on createdAt instead of scanning.
+        IndexModel([("userId", ASCENDING), ("createdAt", DESCENDING)], name="userId_createdAt"),
+        IndexModel([("uid", ASCENDING), ("createdAt", DESCENDING)], name="uid_createdAt"),
+        IndexModel([("user_id", ASCENDING), ("createdAt", DESCENDING)], name="user_id_createdAt"),
+        IndexModel([("email", ASCENDING), ("createdAt", DESCENDING)], name="email_createdAt"),
+        IndexModel([("createdAt", DESCENDING)], name="createdAt"),
+    ],
+    "event_rollups": [
+        # GET /events/rollups range scans; weekly summaries read by _id
+        IndexModel([("uid", ASCENDING), ("granularity", ASCENDING), ("bucketStart", ASCENDING)], name="uid_granularity_bucketStart"),
+    ],
+    "event_dedupe": [
+        # Cooldown windows (dedupe.EventDeduplicator) expire on their own
+        IndexModel([("expiresAt", ASCENDING)], name="expiresAt_ttl", expireAfterSeconds=0),
+    ],
+    "notification_outbox": [
+        # NotificationWorker.claim: due pending jobs and expired leases
+        IndexModel([("status", ASCENDING), ("nextAttemptAt", ASCENDING)], name="status_nextAttemptAt"),
+        IndexModel([("status", ASCENDING), ("lockedUntil", ASCENDING)], name="status_lockedUntil"),
+        # Delivered and failed jobs are kept for a week for inspection
+        IndexModel([("completedAt", ASCENDING)], name="completedAt_ttl", expireAfterSeconds=7 * 24 * 3600),
+    ],
+}
+
+INDEX_CONFLICT_CODES = (85, 86)  # IndexOptionsConflict, IndexKeySpecsConflict
+
+
+def ensure_indexes(db) -> list[str]:
+    """Creates every index in INDEXES; returns the ones that clash with an existing index.
+
+    Indexes are created one at a time, so a clash (same keys with other
+    options, or the same name on other keys) skips only that index. Drop
+    the old index to have it rebuilt.
+    """
+    conflicts = []
+    for coll_name, models in INDEXES.items():
+        for model in models:
+            try:
+                db[coll_name].create_indexes([model])
+            except OperationFailure as exc:
+                if exc.code not in INDEX_CONFLICT_CODES:
+                    raise
+                name = f"{coll_name}.{model.document['name']}"
+                print(f"[INDEXES] {name} conflicts with an existing index, skipped: {exc}")
+                conflicts.append(name)
+    return conflicts
+
+
+def _route_queries(db) -> dict:
+    """The query each route runs, built by the same code the route uses."""
+    uid = "000000000000000000000000"
+    now = datetime.now(timezone.utc)
+    last = {"eventAt": now, "_id": ObjectId(uid)}
+    day = {"uid": uid, "granularity": "day", "from": (now - timedelta(days=30)).isoformat(), "to": now.isoformat()}
+
+    def page(args: dict):
+        return find_page(db["events"], *build_list_query(args))
+
+    return {
+        "GET /events/": page({}),
+        "GET /events/?uid": page({"uid": uid}),
+        "GET /events/?uid&before": page({"uid": uid, "before": encode_cursor(last)}),
+        "GET /events/?uid&before (string eventAt)": page({"uid": uid, "before": encode_cursor({**last, "eventAt": now.isoformat()})}),
+        "GET /events/?uid&before (undated tail)": page({"uid": uid, "before": encode_cursor({"_id": last["_id"]})}),
+        "GET /events/?uid&from&to": page({"uid": uid, "from": day["from"], "to": day["to"]}),
+        "GET /events/rollups": db[ROLLUPS_COLLECTION].find(build_rollups_query(day)).sort("bucketStart", 1).limit(MAX_ROLLUP_BUCKETS),
+        "GET /events/stream (replay)": StreamSession("", uid).replay_cursor(db["events"]),
+        "GET /events/stream?uid (replay)": StreamSession(uid, uid).replay_cursor(db["events"]),
+        "bracelet watch_events (poll)": db["events"].find({"createdAt": {"$gt": now}}).sort("createdAt", 1),
+        "GET /weekly_reports/?userId": db["weekly_reports"].find(build_reports_query(uid, "someone@example.com")).sort("createdAt", -1),
+        "GET /weekly_reports/ (fallback)": db["weekly_reports"].find({}).sort("createdAt", -1).limit(20),
+        "NotificationWorker.claim": db[OUTBOX_COLLECTION].find(claim_query(now)).sort("nextAttemptAt", 1).limit(1),
+    }
+
+
+def _stages(plan) -> list[str]:
+    found = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            found.append(plan["stage"])
+        for value in plan.values():
+            found.extend(_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            found.extend(_stages(item))
+    return found
+
+
+def audit_query_plans(db) -> dict[str, list[str]]:
+    """Returns the winning-plan stages of each route query."""
+    results = {}
+    for name, cursor in _route_queries(db).items():
+        explain = cursor.explain()
+        results[name] = _stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+    return results
+
+
+def main() -> int:
+    uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
+    db_name = os.getenv("DB_NAME", "hearyou")
+    db = MongoClient(uri)[db_name]
+
+    failed = False
+    if "--no-create" not in sys.argv:
+        failed = bool(ensure_indexes(db))
+
+    for name, stages in audit_query_plans(db).items():
+        collscan = "COLLSCAN" in stages
+        failed = failed or collscan
+        print(f"[{'FAIL' if collscan else ' OK '}] {name}: {' <- '.join(stages)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
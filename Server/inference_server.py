@@ -0,0 +1,258 @@
+"""Shared YAMNet inference for every microphone on the host.
+
+    python inference_server.py
+    python audio.py --server 127.0.0.1:8765
+
+One process keeps the model resident; each audio.py client holds a TCP
+connection and sends windows as they are captured. Windows from all
+connections are micro-batched: a batch closes when it reaches
+INFERENCE_MAX_BATCH windows or INFERENCE_MAX_WAIT_MS after its first window
+arrived, whichever comes first, and as soon as every connected stream has
+a window in it.
+
+Wire format (little endian), one request per window:
+    request:  uint32 request_id, uint32 n_samples, n_samples * float32
+    response: uint32 request_id, float32 confidence, uint16 label_len, uint8 n_events,
+              label (utf-8), n_events * float32 event scores (audio_events.EVENT_KEYS order)
+"""
+import argparse
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+import numpy as np
+
+from audio_backends import BACKEND, load_backend
+from audio_events import EVENT_KEYS
+
+
+INFERENCE_ADDR = os.getenv("AUDIO_INFERENCE_ADDR", "127.0.0.1:8765")
+MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "32"))
+MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "20"))
+MAX_SAMPLES = 16000 * 10
+
+REQUEST_HEADER = struct.Struct("<II")
+RESPONSE_HEADER = struct.Struct("<IfHB")
+
+
+def parse_addr(addr: str) -> tuple[str, int]:
+    host, _, port = addr.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes | None:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            return None
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+class _Request:
+    __slots__ = ("request_id", "samples", "conn", "arrived")
+
+    def __init__(self, request_id: int, samples: np.ndarray, conn: "_Connection"):
+        self.request_id = request_id
+        self.samples = samples
+        self.conn = conn
+        self.arrived = time.monotonic()
+
+
+class _Connection:
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.lock = threading.Lock()
+
+    def reply(self, request_id: int, label: str, confidence: float, events: np.ndarray):
+        data = label.encode("utf-8")
+        events = np.ascontiguousarray(events, dtype="<f4")
+        try:
+            with self.lock:
+                self.sock.sendall(
+                    RESPONSE_HEADER.pack(request_id, confidence, len(data), len(events)) + data + events.tobytes()
+                )
+        except OSError:
+            pass  # client went away; its reader thread cleans up
+
+
+class MicroBatcher:
+    """Collects windows from all streams and runs them through the model in batches."""
+
+    def __init__(self, model, max_batch: int = MAX_BATCH, max_wait_ms: float = MAX_WAIT_MS):
+        self.model = model
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000.0
+        self.queue: queue.Queue[_Request] = queue.Queue()
+        self._stop = threading.Event()
+        self.lock = threading.Lock()
+        self.streams = 0  # connected clients
+        self.batches = 0
+        self.windows = 0
+
+    def submit(self, request: _Request):
+        self.queue.put(request)
+
+    def start(self):
+        threading.Thread(target=self._run, name="micro-batcher", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _collect(self) -> list[_Request]:
+        first = self.queue.get(timeout=0.5)
+        batch = [first]
+        deadline = first.arrived + self.max_wait
+        # Each stream has at most one window in flight, so once every
+        # connected stream is in the batch there is nothing to wait for
+        target = min(self.max_batch, max(1, self.streams))
+        while len(batch) < target:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                batch = self._collect()
+            except queue.Empty:
+                continue
+            try:
+                results = self.model.classify_batch([r.samples for r in batch])
+            except Exception as exc:
+                print(f"[INFER] Batch of {len(batch)} failed: {exc}")
+                results = [("", 0.0, np.zeros(len(EVENT_KEYS), dtype=np.float32))] * len(batch)
+            self.batches += 1
+            self.windows += len(batch)
+            for request, (label, confidence, events) in zip(batch, results):
+                request.conn.reply(request.request_id, label, confidence, events)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        sock = self.request
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = _Connection(sock)
+        batcher = self.server.batcher
+        peer = "%s:%s" % self.client_address[:2]
+        print(f"[INFER] Stream connected: {peer}")
+        with batcher.lock:
+            batcher.streams += 1
+        try:
+            while True:
+                header = _recv_exact(sock, REQUEST_HEADER.size)
+                if header is None:
+                    break
+                request_id, n_samples = REQUEST_HEADER.unpack(header)
+                if n_samples == 0 or n_samples > MAX_SAMPLES:
+                    print(f"[INFER] Dropping {peer}: bad window size {n_samples}")
+                    break
+                payload = _recv_exact(sock, n_samples * 4)
+                if payload is None:
+                    break
+                samples = np.frombuffer(payload, dtype="<f4")
+                batcher.submit(_Request(request_id, samples, conn))
+        except OSError:
+            pass
+        finally:
+            with batcher.lock:
+                batcher.streams -= 1
+        print(f"[INFER] Stream disconnected: {peer}")
+
+
+class InferenceServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, model, addr: str = INFERENCE_ADDR, max_batch: int = MAX_BATCH, max_wait_ms: float = MAX_WAIT_MS):
+        super().__init__(parse_addr(addr), _Handler)
+        self.batcher = MicroBatcher(model, max_batch, max_wait_ms)
+        self.batcher.start()
+
+    def server_close(self):
+        self.batcher.stop()
+        super().server_close()
+
+
+class InferenceClient:
+    """One audio stream's connection to the inference server."""
+
+    def __init__(self, addr: str = INFERENCE_ADDR, timeout: float = 5.0):
+        self.addr = parse_addr(addr)
+        self.timeout = timeout
+        self.sock: socket.socket | None = None
+        self._next_id = 0
+
+    def _connect(self):
+        self.sock = socket.create_connection(self.addr, timeout=self.timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+    def _roundtrip(self, samples: np.ndarray) -> tuple[str, float, np.ndarray]:
+        if self.sock is None:
+            self._connect()
+        self._next_id = (self._next_id + 1) & 0xFFFFFFFF
+        data = np.ascontiguousarray(samples, dtype="<f4")
+        self.sock.sendall(REQUEST_HEADER.pack(self._next_id, len(data)) + data.tobytes())
+        while True:
+            header = _recv_exact(self.sock, RESPONSE_HEADER.size)
+            if header is None:
+                raise ConnectionError("inference server closed the connection")
+            request_id, confidence, label_len, n_events = RESPONSE_HEADER.unpack(header)
+            body = _recv_exact(self.sock, label_len + 4 * n_events)
+            if body is None:
+                raise ConnectionError("inference server closed the connection")
+            if request_id == self._next_id:
+                events = np.frombuffer(body[label_len:], dtype="<f4").astype(np.float32)
+                return body[:label_len].decode("utf-8"), confidence, events
+            # Reply to a request that timed out earlier; skip it
+
+    def predict(self, samples: np.ndarray) -> tuple[str, float]:
+        label, confidence, _ = self.classify(samples)
+        return label, confidence
+
+    def classify(self, samples: np.ndarray) -> tuple[str, float, np.ndarray]:
+        try:
+            return self._roundtrip(samples)
+        except OSError:
+            # One reconnect for a restarted server, then let the caller see it
+            self.close()
+            return self._roundtrip(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched YAMNet inference server")
+    parser.add_argument("--addr", default=INFERENCE_ADDR)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    parser.add_argument("--backend", choices=["tf", "tflite"], default=BACKEND)
+    parser.add_argument("--model", help="SavedModel directory (tf) or .tflite file (tflite)")
+    args = parser.parse_args()
+
+    server = InferenceServer(load_backend(args.backend, args.model), args.addr, args.max_batch, args.max_wait_ms)
+    print(f"[INFER] Listening on {args.addr} (batch ≤ {args.max_batch}, wait ≤ {args.max_wait_ms:.0f} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n🛑 Stopped by user.")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
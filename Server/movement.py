@@ -0,0 +1,141 @@
+"""Array-backed landmark motion scoring for the movement detector.
+
+Pose landmarks are written into a preallocated (history, 33, 2) float32
+ring in pixel coordinates; per-landmark distance and all ANGLE_JOINTS
+angles are then computed in one vectorized pass per frame.
+"""
+import numpy as np
+
+
+NUM_LANDMARKS = 33
+MOVEMENT_THRESHOLD = 10        # pixels per landmark (distance)
+ANGLE_THRESHOLD = 15           # degrees change to count as movement
+ALARM_DURATION = 5             # seconds
+GRACE_PERIOD = 0.5             # seconds to ignore brief pauses
+COOLDOWN_WINDOW_SECONDS = 300.0 # 5 minutes window to dedupe events
+
+# joints to track their angles
+ANGLE_JOINTS = {
+    "left_elbow": (11, 13, 15),   # shoulder, elbow, wrist
+    "right_elbow": (12, 14, 16),
+    "left_knee": (23, 25, 27),    # hip, knee, ankle
+    "right_knee": (24, 26, 28),
+    "left_shoulder": (13, 11, 23), # elbow, shoulder, hip
+    "right_shoulder": (14, 12, 24)
+}
+_JOINTS = np.array(list(ANGLE_JOINTS.values()), dtype=np.intp)  # (6, 3): a, b, c
+
+
+def joint_angles(points: np.ndarray) -> np.ndarray:
+    """Angles at b (degrees) for every (a, b, c) in ANGLE_JOINTS, shape (6,).
+
+    Points are viewed as complex numbers so each angle is arg(ba * conj(bc)):
+    one gather and a handful of ufunc calls for all six joints.
+    """
+    z = points.view(np.complex64)[:, 0][_JOINTS]
+    return np.abs(np.angle((z[:, 0] - z[:, 1]) * np.conj(z[:, 2] - z[:, 1]), deg=True))
+
+
+class LandmarkRing:
+    """Last ``history`` frames of pose landmarks, reused across frames."""
+
+    def __init__(self, history: int = 2):
+        self.points = np.zeros((max(2, history), NUM_LANDMARKS, 2), dtype=np.float32)
+        self.angles = np.zeros((len(self.points), len(ANGLE_JOINTS)), dtype=np.float32)
+        self.count = 0
+
+    def push_landmarks(self, landmarks, width: int, height: int) -> np.ndarray:
+        """Stores a MediaPipe landmark list (normalized x/y) as pixels; returns the new slot."""
+        flat = np.fromiter(
+            (v for lm in landmarks for v in (lm.x, lm.y)), dtype=np.float32, count=2 * NUM_LANDMARKS
+        )
+        slot = self.points[self.count % len(self.points)]
+        np.multiply(flat.reshape(NUM_LANDMARKS, 2), (width, height), out=slot)
+        return self._commit()
+
+    def push_points(self, points: np.ndarray) -> np.ndarray:
+        """Stores a (33, 2) pixel array; returns the new slot."""
+        self.points[self.count % len(self.points)] = points
+        return self._commit()
+
+    def _commit(self) -> np.ndarray:
+        i = self.count % len(self.points)
+        self.angles[i] = joint_angles(self.points[i])
+        self.count += 1
+        return self.points[i]
+
+    def current(self) -> tuple[np.ndarray, np.ndarray]:
+        i = (self.count - 1) % len(self.points)
+        return self.points[i], self.angles[i]
+
+    def previous(self) -> tuple[np.ndarray, np.ndarray] | None:
+        if self.count < 2:
+            return None
+        i = (self.count - 2) % len(self.points)
+        return self.points[i], self.angles[i]
+
+    def reset(self):
+        self.count = 0
+
+
+def frame_moved(ring: LandmarkRing, distance_threshold: float = MOVEMENT_THRESHOLD, angle_threshold: float = ANGLE_THRESHOLD) -> bool:
+    """Any landmark moved more than ``distance_threshold`` px or any joint angle
+    changed more than ``angle_threshold`` degrees since the previous frame."""
+    prev = ring.previous()
+    if prev is None:
+        return False
+    curr_points, curr_angles = ring.current()
+    prev_points, prev_angles = prev
+    delta = curr_points - prev_points
+    if np.einsum("ij,ij->i", delta, delta).max() > distance_threshold * distance_threshold:
+        return True
+    return bool(np.abs(curr_angles - prev_angles).max() > angle_threshold)
+
+
+def bounding_box(points: np.ndarray) -> tuple[int, int, int, int]:
+    x_min, y_min = points.min(axis=0)
+    x_max, y_max = points.max(axis=0)
+    return int(x_min), int(y_min), int(x_max), int(y_max)
+
+
+class MovementTracker:
+    """Continuous-movement alarm state for one camera.
+
+    Movement that lasts ALARM_DURATION (pauses up to GRACE_PERIOD don't
+    count as stopping) raises the alarm; an event is due at most once per
+    COOLDOWN_WINDOW_SECONDS.
+    """
+
+    def __init__(
+        self,
+        alarm_duration: float = ALARM_DURATION,
+        grace_period: float = GRACE_PERIOD,
+        cooldown: float = COOLDOWN_WINDOW_SECONDS,
+    ):
+        self.alarm_duration = alarm_duration
+        self.grace_period = grace_period
+        self.cooldown = cooldown
+        self.movement_start_time: float | None = None
+        self.last_movement_time: float | None = None
+        self.last_published_ts: float | None = None
+
+    def update(self, moved: bool, now: float) -> bool:
+        """Feeds one decision; returns True when a movement event should be published."""
+        if moved:
+            if self.movement_start_time is None:
+                self.movement_start_time = now
+                print("baby movement detected")
+            self.last_movement_time = now
+        elif self.last_movement_time and now - self.last_movement_time > self.grace_period:
+            self.movement_start_time = None
+
+        if self.alarm_active(now) and (self.last_published_ts is None or now - self.last_published_ts >= self.cooldown):
+            self.last_published_ts = now
+            return True
+        return False
+
+    def alarm_active(self, now: float) -> bool:
+        return self.movement_start_time is not None and now - self.movement_start_time >= self.alarm_duration
+
+    def moving(self, now: float) -> bool:
+        return self.last_movement_time is not None and now - self.last_movement_time <= self.grace_period
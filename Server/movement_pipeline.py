@@ -0,0 +1,222 @@
+"""Per-stream frame pipeline for the movement detector.
+
+Every frame passes three cheap checks before pose inference runs:
+
+1. adaptive stride - only every Nth frame is considered; N grows when the
+   measured inference time would take more than MOVEMENT_CPU_BUDGET of a
+   core at the source frame rate, and shrinks again when it would not;
+2. frame difference - a small grayscale thumbnail is compared with the last
+   inferred frame, and a static scene is reported as "no movement" without
+   running the model (at least every MOVEMENT_STATIC_REFRESH seconds the
+   model runs anyway to keep tracking alive);
+3. downscaling - inference runs on a copy at most MOVEMENT_INFER_WIDTH wide.
+   Landmarks are normalized, so they map straight back to the full frame.
+
+"pose" mode runs MediaPipe Pose alone; "holistic" keeps the old Holistic
+model, whose face and hand outputs are never read.
+"""
+import os
+import math
+import time
+
+import cv2
+import numpy as np
+
+from movement import ANGLE_THRESHOLD, MOVEMENT_THRESHOLD, LandmarkRing, bounding_box, frame_moved
+
+
+MODEL_MODE = os.getenv("MOVEMENT_MODEL", "pose")
+MODEL_COMPLEXITY = int(os.getenv("MOVEMENT_MODEL_COMPLEXITY", "1"))
+INFER_WIDTH = int(os.getenv("MOVEMENT_INFER_WIDTH", "320"))
+CPU_BUDGET = float(os.getenv("MOVEMENT_CPU_BUDGET", "0.5"))  # fraction of one core per stream
+MAX_STRIDE = int(os.getenv("MOVEMENT_MAX_STRIDE", "6"))
+DIFF_THRESHOLD = float(os.getenv("MOVEMENT_DIFF_THRESHOLD", "1.5"))  # mean abs gray level change
+STATIC_REFRESH_SECONDS = float(os.getenv("MOVEMENT_STATIC_REFRESH", "2.0"))
+REPORT_SECONDS = float(os.getenv("MOVEMENT_REPORT_SECONDS", "30"))
+
+THUMB_SIZE = (64, 36)
+
+
+def create_pose_model(mode: str = MODEL_MODE, complexity: int = MODEL_COMPLEXITY):
+    import mediapipe as mp
+
+    kwargs = dict(
+        static_image_mode=False,
+        model_complexity=complexity,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5,
+    )
+    if mode == "holistic":
+        return mp.solutions.holistic.Holistic(**kwargs)
+    if mode == "pose":
+        return mp.solutions.pose.Pose(**kwargs)
+    raise ValueError(f"Unknown movement model: {mode}")
+
+
+def pose_connections(mode: str = MODEL_MODE):
+    import mediapipe as mp
+
+    return mp.solutions.holistic.POSE_CONNECTIONS if mode == "holistic" else mp.solutions.pose.POSE_CONNECTIONS
+
+
+def annotate_frame(frame: np.ndarray, points, landmarks, moving: bool, alarm: bool, connections=None):
+    """Draws the pose box (red while moving), skeleton and alarm banner in place."""
+    if alarm:
+        cv2.putText(frame, "ALARM: Baby moving too long!", (50, 50),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+    if points is None:
+        return frame
+    x_min, y_min, x_max, y_max = bounding_box(points)
+    box_color = (0, 0, 255) if moving else (0, 255, 0)
+    cv2.rectangle(frame, (x_min - 10, y_min - 10), (x_max + 10, y_max + 10), box_color, 2)
+    if landmarks is not None and connections is not None:
+        import mediapipe as mp
+
+        mp.solutions.drawing_utils.draw_landmarks(frame, landmarks, connections)
+    return frame
+
+
+def thumbnail(frame: np.ndarray) -> np.ndarray:
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return cv2.resize(gray, THUMB_SIZE, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+
+class AdaptiveStride:
+    def __init__(self, source_fps: float, cpu_budget: float = CPU_BUDGET, max_stride: int = MAX_STRIDE):
+        self.source_fps = source_fps if source_fps and source_fps > 0 else 30.0
+        self.cpu_budget = cpu_budget
+        self.max_stride = max(1, max_stride)
+        self.avg_seconds: float | None = None
+        self.stride = 1
+
+    def record(self, seconds: float):
+        self.avg_seconds = seconds if self.avg_seconds is None else 0.9 * self.avg_seconds + 0.1 * seconds
+        # Frames per second we can afford to infer within the budget
+        affordable = self.cpu_budget / max(self.avg_seconds, 1e-6)
+        self.stride = min(self.max_stride, max(1, math.ceil(self.source_fps / affordable)))
+
+
+class StreamStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.frames = 0
+        self.inferred = 0
+        self.stride_skipped = 0
+        self.static_skipped = 0
+        self._window_start = time.monotonic()
+        self._cpu_start = time.process_time()
+        self._frames_start = 0
+        self._inferred_start = 0
+
+    def snapshot(self) -> dict:
+        wall = max(time.monotonic() - self._window_start, 1e-6)
+        return {
+            "stream": self.name,
+            "fps": (self.frames - self._frames_start) / wall,
+            "inferenceFps": (self.inferred - self._inferred_start) / wall,
+            # Process CPU: exact when each stream runs in its own process
+            "cpuPct": 100.0 * (time.process_time() - self._cpu_start) / wall,
+            "strideSkipped": self.stride_skipped,
+            "staticSkipped": self.static_skipped,
+            "frames": self.frames,
+        }
+
+    def maybe_report(self, stride: int, every: float = REPORT_SECONDS) -> dict | None:
+        if time.monotonic() - self._window_start < every:
+            return None
+        s = self.snapshot()
+        static_pct = 100.0 * s["staticSkipped"] / s["frames"] if s["frames"] else 0.0
+        print(
+            f"[MOVE] {self.name}: {s['fps']:.1f} fps, inference {s['inferenceFps']:.1f}/s "
+            f"(stride {stride}, {static_pct:.0f}% static), CPU {s['cpuPct']:.0f}%"
+        )
+        self._window_start = time.monotonic()
+        self._cpu_start = time.process_time()
+        self._frames_start = self.frames
+        self._inferred_start = self.inferred
+        return s
+
+
+class FrameResult:
+    __slots__ = ("inferred", "moved", "points", "landmarks")
+
+    def __init__(self, inferred: bool, moved: bool | None, points=None, landmarks=None):
+        self.inferred = inferred
+        self.moved = moved  # None: skipped by stride or no pose found, keep the previous decision
+        self.points = points
+        self.landmarks = landmarks  # MediaPipe landmark list, for drawing
+
+
+class MovementPipeline:
+    def __init__(
+        self,
+        name: str = "camera",
+        source_fps: float = 30.0,
+        mode: str = MODEL_MODE,
+        complexity: int = MODEL_COMPLEXITY,
+        infer_width: int = INFER_WIDTH,
+        diff_threshold: float = DIFF_THRESHOLD,
+        model=None,
+    ):
+        self.mode = mode
+        self.model = model or create_pose_model(mode, complexity)
+        self.infer_width = infer_width
+        self.diff_threshold = diff_threshold
+        self.stride = AdaptiveStride(source_fps)
+        self.stats = StreamStats(name)
+        self.ring = LandmarkRing()
+        self._last_thumb: np.ndarray | None = None
+        self._last_inference = 0.0
+        self._frame_index = 0
+
+    def close(self):
+        try:
+            self.model.close()
+        except Exception:
+            pass
+
+    def _static(self, thumb: np.ndarray | None, now: float) -> bool:
+        if thumb is None or self._last_thumb is None:
+            return False
+        if now - self._last_inference >= STATIC_REFRESH_SECONDS:
+            return False
+        return float(np.abs(thumb - self._last_thumb).mean()) < self.diff_threshold
+
+    def _infer(self, frame: np.ndarray):
+        h, w = frame.shape[:2]
+        small = frame
+        if self.infer_width and w > self.infer_width:
+            small = cv2.resize(frame, (self.infer_width, round(h * self.infer_width / w)), interpolation=cv2.INTER_AREA)
+        rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+        rgb.flags.writeable = False
+        return self.model.process(rgb)
+
+    def process(self, frame: np.ndarray, now: float | None = None) -> FrameResult:
+        now = time.monotonic() if now is None else now
+        self.stats.frames += 1
+        self._frame_index += 1
+        self.stats.maybe_report(self.stride.stride)
+
+        if self._frame_index % self.stride.stride:
+            self.stats.stride_skipped += 1
+            return FrameResult(False, None)
+        thumb = thumbnail(frame) if self.diff_threshold > 0 else None
+        if self._static(thumb, now):
+            self.stats.static_skipped += 1
+            return FrameResult(False, False)
+
+        started = time.perf_counter()
+        results = self._infer(frame)
+        self.stride.record(time.perf_counter() - started)
+        self.stats.inferred += 1
+        self._last_inference = now
+        self._last_thumb = thumb
+
+        if not results.pose_landmarks:
+            return FrameResult(True, None)
+        h, w = frame.shape[:2]
+        points = self.ring.push_landmarks(results.pose_landmarks.landmark, w, h)
+        # Thresholds are per source frame; scale them to the frames between inferences
+        scale = self.stride.stride
+        moved = frame_moved(self.ring, MOVEMENT_THRESHOLD * scale, ANGLE_THRESHOLD * scale)
+        return FrameResult(True, moved, points, results.pose_landmarks)
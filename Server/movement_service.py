@@ -0,0 +1,541 @@
+"""Headless movement detection for any number of cameras.
+
+    python movement_service.py --config cameras.json
+    python movement_service.py                      # cameras from GET {API_BASE}/cameras/
+
+cameras.json holds the same fields as the /cameras API:
+
+    {"cameras": [
+        {"id": "nursery", "source": "rtsp://10.0.0.7/stream1", "uid": "<user id>"},
+        {"id": "crib", "source": "0", "annotate": "crib/"}
+    ]}
+
+Each enabled camera runs in its own worker process with its own pipeline
+and tracker state. The supervisor restarts workers that die and re-reads the
+configuration every MOVEMENT_CONFIG_REFRESH seconds, starting, stopping or
+restarting workers whose settings changed. "annotate" writes annotated
+frames under CAMERA_OUTPUT_DIR: a directory gets <id>.jpg refreshed every
+second, a .mp4/.avi path gets a video. File sources are read from
+CAMERA_MEDIA_DIR (see camera_paths).
+"""
+import os
+import json
+import time
+import queue
+import argparse
+import threading
+import multiprocessing
+from datetime import datetime, timezone
+
+import http_client
+from camera_paths import check_source, resolve_annotate
+from event_spool import spool_event
+
+
+API_BASE = os.getenv("API_BASE", "http://127.0.0.1:5000")
+CONFIG_REFRESH_SECONDS = float(os.getenv("MOVEMENT_CONFIG_REFRESH", "30"))
+MAX_PROCESSES = int(os.getenv("MOVEMENT_MAX_PROCESSES", "0")) or (os.cpu_count() or 1)
+RECONNECT_SECONDS = 5.0
+SNAPSHOT_SECONDS = 1.0
+METRICS_REPORT_SECONDS = float(os.getenv("MOVEMENT_REPORT_SECONDS", "30"))
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv")
+EVENT_TITLE = "baby movement"
+
+
+class CameraSpec:
+    """One camera's settings.
+
+    Sources and annotate targets from cameras.json or the API are limited by
+    camera_paths; ``trusted`` specs (built from the command line) use their
+    paths as given.
+    """
+
+    def __init__(self, data: dict, trusted: bool = False):
+        self.id = str(data.get("id") or data.get("_id") or "").strip()
+        self.source = str(data.get("source", "")).strip()
+        self.uid = str(data.get("uid") or "").strip()
+        self.enabled = bool(data.get("enabled", True))
+        self.flip = bool(data.get("flip", True))
+        self.model = data.get("model") or "pose"
+        self.infer_width = int(data.get("inferWidth", 320))
+        self.diff_threshold = float(data.get("diffThreshold", 1.5))
+        self.annotate = str(data.get("annotate") or "").strip()
+        if not self.id or not self.source:
+            raise ValueError(f"Camera needs an id and a source: {data}")
+        if trusted:
+            self.source_path, self.annotate_path = self.source, self.annotate
+            return
+        try:
+            self.source_path = check_source(self.source)
+            self.annotate_path = resolve_annotate(self.annotate) if self.annotate else ""
+        except ValueError as exc:
+            raise ValueError(f"Camera {self.id}: {exc}")
+
+    @property
+    def is_file(self) -> bool:
+        return os.path.isfile(self.source_path)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "source": self.source,
+            "uid": self.uid,
+            "enabled": self.enabled,
+            "flip": self.flip,
+            "model": self.model,
+            "inferWidth": self.infer_width,
+            "diffThreshold": self.diff_threshold,
+            "annotate": self.annotate,
+        }
+
+
+def _parse_cameras(items) -> list[CameraSpec]:
+    specs = []
+    for item in items or []:
+        try:
+            specs.append(CameraSpec(item))
+        except (TypeError, ValueError) as exc:
+            print(f"[MOVE] Ignoring camera: {exc}")
+    return specs
+
+
+def load_cameras_file(path: str) -> list[CameraSpec]:
+    with open(path, "r") as f:
+        data = json.load(f)
+    return _parse_cameras(data.get("cameras") if isinstance(data, dict) else data)
+
+
+def fetch_cameras(api_base: str = API_BASE) -> list[CameraSpec]:
+    resp = http_client.get_session().get(f"{api_base}/cameras/", timeout=5)
+    resp.raise_for_status()
+    return _parse_cameras(resp.json().get("cameras"))
+
+
+def publish_movement_event(uid: str = "", event_at: str | None = None) -> bool:
+    """Queues a movement event in the local spool; the API receives it when reachable."""
+    try:
+        spool_event(EVENT_TITLE, event_at or datetime.now(timezone.utc).isoformat(), uid=uid)
+        return True
+    except Exception as exc:
+        print(f"[MOVE] Could not spool movement event: {exc}")
+        return False
+
+
+class AnnotatedOutput:
+    def __init__(self, target: str, camera_id: str, fps: float):
+        self.camera_id = camera_id
+        self.fps = fps if fps and fps > 0 else 15.0
+        self.video = target.lower().endswith(VIDEO_EXTENSIONS)
+        self.path = target if self.video else os.path.join(target, f"{camera_id}.jpg")
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.writer = None
+        self._last_snapshot = 0.0
+
+    def write(self, frame):
+        import cv2
+
+        if self.video:
+            if self.writer is None:
+                h, w = frame.shape[:2]
+                self.writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*"mp4v"), self.fps, (w, h))
+            self.writer.write(frame)
+            return
+        now = time.monotonic()
+        if now - self._last_snapshot < SNAPSHOT_SECONDS:
+            return
+        self._last_snapshot = now
+        tmp = self.path + ".tmp.jpg"
+        if cv2.imwrite(tmp, frame):
+            os.replace(tmp, self.path)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.release()
+
+
+class LatestFrameSlot:
+    """Single-item hand-off between two stages.
+
+    ``put`` replaces an unread item (drop-oldest) so the reader always gets
+    the newest frame; with ``lossless`` it waits for the reader instead.
+    """
+
+    def __init__(self, lossless: bool = False):
+        self.cond = threading.Condition()
+        self.item = None
+        self.closed = False
+        self.lossless = lossless
+        self.dropped = 0
+
+    def put(self, item) -> bool:
+        with self.cond:
+            while self.lossless and self.item is not None and not self.closed:
+                self.cond.wait()
+            if self.closed:
+                return False
+            if self.item is not None:
+                self.dropped += 1
+            self.item = item
+            self.cond.notify_all()
+            return True
+
+    def get(self, timeout: float | None = None):
+        """Returns the newest item, or None on timeout or once closed and drained."""
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.item is not None or self.closed, timeout):
+                return None
+            item, self.item = self.item, None
+            self.cond.notify_all()
+            return item
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+class StageMetrics:
+    """Per-stage latency (average and max, ms) for one camera over a report window.
+
+    capture: decode + flip; wait: frame age when inference picks it up;
+    inference: pipeline + tracker; render: drawing/output/display;
+    total: capture to rendered; publish: event due to event spooled.
+    """
+
+    STAGES = ("capture", "wait", "inference", "render", "total", "publish")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.sums = dict.fromkeys(self.STAGES, 0.0)
+        self.maxes = dict.fromkeys(self.STAGES, 0.0)
+        self.counts = dict.fromkeys(self.STAGES, 0)
+        self._window_start = time.monotonic()
+
+    def record(self, stage: str, seconds: float):
+        with self.lock:
+            self.sums[stage] += seconds
+            self.counts[stage] += 1
+            if seconds > self.maxes[stage]:
+                self.maxes[stage] = seconds
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                stage: {
+                    "avgMs": 1000.0 * self.sums[stage] / self.counts[stage] if self.counts[stage] else 0.0,
+                    "maxMs": 1000.0 * self.maxes[stage],
+                    "count": self.counts[stage],
+                }
+                for stage in self.STAGES
+            }
+
+    def maybe_report(self, dropped: int, every: float = METRICS_REPORT_SECONDS) -> dict | None:
+        if time.monotonic() - self._window_start < every:
+            return None
+        s = self.snapshot()
+        stages = ", ".join(
+            f"{stage} {v['avgMs']:.1f}/{v['maxMs']:.1f}" for stage, v in s.items() if v["count"]
+        )
+        print(f"[MOVE] {self.name}: latency ms avg/max {stages}; {dropped} frames dropped")
+        with self.lock:
+            self._reset()
+        return s
+
+
+class FramePacket:
+    __slots__ = ("frame", "now", "captured", "result", "pose")
+
+    def __init__(self, frame, now: float, captured: float):
+        self.frame = frame
+        self.now = now  # tracker clock: wall time, or media time for files
+        self.captured = captured  # perf_counter() when the frame was ready
+        self.result = None
+        self.pose = None  # (points, landmarks) to draw
+
+
+class CameraWorker:
+    """Reads one camera, tracks movement and publishes events until stopped.
+
+    Capture, inference, rendering and event publishing are separate stages.
+    Capture keeps only the newest frame in a LatestFrameSlot, so a slow model
+    never lets frames queue up: inference always starts on the newest frame
+    and live sources drop what it could not keep up with (files are replayed
+    losslessly). Rendering runs on the calling thread, where OpenCV windows
+    must live; capture, inference and publishing run in daemon threads.
+    """
+
+    def __init__(self, spec: CameraSpec, display: bool = False):
+        from movement import MovementTracker
+
+        self.spec = spec
+        self.display = display
+        self.tracker = MovementTracker()
+        self.pipeline = None
+        self.output = None
+        self.last_pose = None  # (points, landmarks) of the latest detection
+        self.fps = 0.0
+        self.metrics = StageMetrics(spec.id)
+        self.frames = LatestFrameSlot(lossless=spec.is_file)
+        self.rendered = LatestFrameSlot(lossless=spec.is_file)
+        self.events: queue.Queue = queue.Queue()
+        self.stopping = threading.Event()
+
+    def _open(self):
+        from frame_bus import open_source
+
+        return open_source(self.spec.source_path)
+
+    def run(self, stop_event=None):
+        threads = [
+            threading.Thread(target=target, name=f"{self.spec.id}-{stage}", daemon=True)
+            for stage, target in (("capture", self._capture), ("inference", self._infer), ("publish", self._publish))
+        ]
+        for t in threads:
+            t.start()
+        try:
+            self._render_loop(stop_event)
+        finally:
+            self.stopping.set()
+            self.frames.close()
+            self.rendered.close()
+            self.events.put(None)
+            for t in threads:
+                t.join(5.0)
+            self.close()
+
+    def _capture(self):
+        try:
+            while not self.stopping.is_set():
+                cap = self._open()
+                if not cap.isOpened():
+                    cap.release()
+                    if self.spec.is_file:
+                        print(f"[MOVE] {self.spec.id}: cannot open {self.spec.source}")
+                        return
+                    print(f"[MOVE] {self.spec.id}: cannot open {self.spec.source}, retrying in {RECONNECT_SECONDS:.0f}s")
+                    self.stopping.wait(RECONNECT_SECONDS)
+                    continue
+                self.fps = cap.get(5)  # cv2.CAP_PROP_FPS
+                try:
+                    finished = self._read_loop(cap)
+                finally:
+                    cap.release()
+                if finished:
+                    return
+                print(f"[MOVE] {self.spec.id}: stream ended, reconnecting")
+                self.stopping.wait(1.0)
+        finally:
+            self.frames.close()
+
+    def _read_loop(self, cap) -> bool:
+        """Returns True when capture is done, False to reconnect."""
+        import cv2
+        from frame_bus import frame_intact
+
+        while not self.stopping.is_set():
+            started = time.perf_counter()
+            ret, frame = cap.read()
+            if not ret:
+                return self.spec.is_file
+            # Files are replayed faster than real time; use their own clock
+            now = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0 if self.spec.is_file else time.time()
+            if self.spec.flip:
+                frame = cv2.flip(frame, 1)
+            elif not frame.flags.writeable:
+                frame = frame.copy()  # frame bus view: drawn on later, and the slot gets reused
+            if not frame_intact(cap):
+                continue  # the publisher overwrote the slot while we copied it
+            captured = time.perf_counter()
+            self.metrics.record("capture", captured - started)
+            if not self.frames.put(FramePacket(frame, now, captured)):
+                return True
+        return True
+
+    def _infer(self):
+        from movement_pipeline import MovementPipeline
+
+        try:
+            while True:
+                packet = self.frames.get(0.5)
+                if packet is None:
+                    if self.frames.closed:
+                        return
+                    continue
+                if self.pipeline is None:
+                    self.pipeline = MovementPipeline(
+                        name=self.spec.id,
+                        source_fps=self.fps,
+                        mode=self.spec.model,
+                        infer_width=self.spec.infer_width,
+                        diff_threshold=self.spec.diff_threshold,
+                    )
+                started = time.perf_counter()
+                self.metrics.record("wait", started - packet.captured)
+                result = self.pipeline.process(packet.frame, packet.now)
+                if result.points is not None:
+                    self.last_pose = (result.points.copy(), result.landmarks)
+                elif result.inferred:
+                    self.last_pose = None  # nobody in frame
+                if result.moved is not None and self.tracker.update(result.moved, packet.now):
+                    self.events.put((time.perf_counter(), datetime.now(timezone.utc).isoformat()))
+                packet.result, packet.pose = result, self.last_pose
+                self.metrics.record("inference", time.perf_counter() - started)
+                if not self.rendered.put(packet):
+                    return
+        finally:
+            self.rendered.close()
+
+    def _publish(self):
+        while True:
+            item = self.events.get()
+            if item is None:
+                return
+            queued, event_at = item
+            publish_movement_event(self.spec.uid, event_at)
+            self.metrics.record("publish", time.perf_counter() - queued)
+
+    def _render_loop(self, stop_event):
+        while stop_event is None or not stop_event.is_set():
+            packet = self.rendered.get(0.5)
+            if packet is None:
+                if self.rendered.closed:
+                    return
+                continue
+            started = time.perf_counter()
+            if self.render(packet):
+                return  # ESC in the preview window
+            done = time.perf_counter()
+            self.metrics.record("render", done - started)
+            self.metrics.record("total", done - packet.captured)
+            self.metrics.maybe_report(self.frames.dropped + self.rendered.dropped)
+
+    def render(self, packet: FramePacket) -> bool:
+        """Draws and writes/shows one frame; returns True if the user asked to quit."""
+        if not self.spec.annotate and not self.display:
+            return False
+        import cv2
+        from movement_pipeline import annotate_frame, pose_connections
+
+        frame = packet.frame
+        points, landmarks = packet.pose or (None, None)
+        annotate_frame(
+            frame, points, landmarks,
+            moving=self.tracker.moving(packet.now),
+            alarm=self.tracker.alarm_active(packet.now),
+            connections=pose_connections(self.spec.model),
+        )
+        if self.spec.annotate:
+            if self.output is None:
+                self.output = AnnotatedOutput(self.spec.annotate_path, self.spec.id, self.fps)
+            self.output.write(frame)
+        if self.display:
+            cv2.imshow(f"Full Body Tracker ({self.spec.id})", frame)
+            return cv2.waitKey(1) & 0xFF == 27  # ESC to quit
+        return False
+
+    def close(self):
+        if self.pipeline is not None:
+            self.pipeline.close()
+        if self.output is not None:
+            self.output.close()
+        if self.display:
+            import cv2
+
+            cv2.destroyAllWindows()
+
+
+def run_camera(spec_data: dict, stop_event):
+    """Worker process entry point."""
+    spec = CameraSpec(spec_data)
+    print(f"[MOVE] {spec.id}: worker started (pid {os.getpid()}) for {spec.source}")
+    try:
+        CameraWorker(spec).run(stop_event)
+    except KeyboardInterrupt:
+        pass
+
+
+class MovementService:
+    def __init__(self, load_specs, max_processes: int = MAX_PROCESSES):
+        self.load_specs = load_specs
+        self.max_processes = max(1, max_processes)
+        self.ctx = multiprocessing.get_context("spawn")
+        self.workers: dict[str, tuple[dict, object, object]] = {}  # id -> (spec dict, process, stop event)
+        self.finished: dict[str, dict] = {}  # file sources that played to the end
+
+    def _start(self, spec: CameraSpec):
+        stop_event = self.ctx.Event()
+        proc = self.ctx.Process(target=run_camera, args=(spec.to_dict(), stop_event), name=f"camera-{spec.id}", daemon=True)
+        proc.start()
+        self.workers[spec.id] = (spec.to_dict(), proc, stop_event)
+
+    def _stop(self, camera_id: str, timeout: float = 5.0):
+        _, proc, stop_event = self.workers.pop(camera_id)
+        stop_event.set()
+        proc.join(timeout)
+        if proc.is_alive():
+            proc.terminate()
+            proc.join(1.0)
+
+    def reconcile(self, specs: list[CameraSpec]):
+        wanted = {s.id: s for s in specs if s.enabled}
+        for camera_id in list(self.workers):
+            spec = wanted.get(camera_id)
+            if spec is None or spec.to_dict() != self.workers[camera_id][0]:
+                print(f"[MOVE] {camera_id}: configuration changed, stopping worker")
+                self._stop(camera_id)
+        for camera_id, (data, proc, _) in list(self.workers.items()):
+            if not proc.is_alive():
+                self.workers.pop(camera_id)
+                if proc.exitcode == 0 and CameraSpec(data).is_file:
+                    self.finished[camera_id] = data
+                else:
+                    print(f"[MOVE] {camera_id}: worker exited with {proc.exitcode}, restarting")
+        for camera_id, spec in wanted.items():
+            if camera_id in self.workers or self.finished.get(camera_id) == spec.to_dict():
+                continue
+            if len(self.workers) >= self.max_processes:
+                print(f"[MOVE] {camera_id}: not started, MOVEMENT_MAX_PROCESSES={self.max_processes} reached")
+                continue
+            self._start(spec)
+
+    def run(self, refresh: float = CONFIG_REFRESH_SECONDS):
+        next_load = 0.0
+        specs: list[CameraSpec] = []
+        try:
+            while True:
+                if time.monotonic() >= next_load:
+                    try:
+                        specs = self.load_specs()
+                    except Exception as exc:
+                        print(f"[MOVE] Could not load camera configuration, keeping the current one: {exc}")
+                    next_load = time.monotonic() + refresh
+                self.reconcile(specs)
+                if not self.workers and specs and all(s.is_file or not s.enabled for s in specs):
+                    break  # every file has been processed
+                time.sleep(1.0)
+        except KeyboardInterrupt:
+            print("\n🛑 Stopped by user.")
+        finally:
+            for camera_id in list(self.workers):
+                self._stop(camera_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless multi-camera movement detection")
+    parser.add_argument("--config", help="cameras JSON file (default: GET {API_BASE}/cameras/)")
+    parser.add_argument("--max-processes", type=int, default=MAX_PROCESSES)
+    args = parser.parse_args()
+
+    if args.config:
+        loader = lambda: load_cameras_file(args.config)  # noqa: E731
+    else:
+        loader = fetch_cameras
+    MovementService(loader, args.max_processes).run()
+
+
+if __name__ == "__main__":
+    main()
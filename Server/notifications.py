@@ -0,0 +1,278 @@
+import os
+import json
+import time
+import threading
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+from pymongo import MongoClient, ReturnDocument
+
+import http_client
+
+
+OUTBOX_COLLECTION = "notification_outbox"
+
+FCM_URL = os.getenv("FCM_URL", "https://fcm.googleapis.com/fcm/send")
+FCM_BATCH_SIZE = 1000  # FCM accepts at most 1000 registration_ids per request
+HTTP_TIMEOUT = float(os.getenv("NOTIFY_HTTP_TIMEOUT", "5"))
+MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", "8"))
+BACKOFF_BASE_SECONDS = float(os.getenv("NOTIFY_BACKOFF_BASE", "2"))
+BACKOFF_MAX_SECONDS = float(os.getenv("NOTIFY_BACKOFF_MAX", "300"))
+LEASE_SECONDS = 60
+NOTIFY_WORKERS = int(os.getenv("NOTIFY_WORKERS", "2"))
+
+
+class PermanentError(Exception):
+    """A delivery failure that retrying will not fix."""
+
+
+def _fcm_job(uid: str, events: list[dict]) -> dict:
+    latest = events[-1]
+    event_at = latest.get("eventAt")
+    if len(events) == 1:
+        title = latest.get("title", "Event")
+        body = latest.get("description", "New event")
+    else:
+        title = f"{len(events)} new events"
+        body = ", ".join(dict.fromkeys(e.get("title", "Event") for e in events))
+    return {
+        "kind": "fcm",
+        "uid": uid,
+        "notification": {"title": title, "body": body},
+        "data": {
+            "eventId": str(latest.get("_id")),
+            "source": latest.get("source", "ml"),
+            "eventAt": event_at.isoformat() if event_at else "",
+            "uid": uid,
+            "count": str(len(events)),
+        },
+    }
+
+
+def build_outbox_jobs(events: list[dict], quiet: bool = False) -> list[dict]:
+    """Outbox documents for newly inserted events.
+
+    Events are coalesced to one push per uid, so a batch of N events for the
+    same household costs one notification.
+    """
+    if not events:
+        return []
+    now = datetime.now(timezone.utc)
+    events = sorted(events, key=lambda e: _sort_key(e.get("eventAt")))
+    jobs = []
+    if os.getenv("FCM_SERVER_KEY") and not quiet:
+        by_uid: dict[str, list[dict]] = {}
+        for event in events:
+            by_uid.setdefault(event.get("uid") or "", []).append(event)
+        jobs.extend(_fcm_job(uid, group) for uid, group in by_uid.items())
+    if os.getenv("FIREBASE_RTDB_URL"):
+        jobs.append({"kind": "rtdb", "message": events[-1].get("title", "Event")})
+    return [
+        {**job, "status": "pending", "attempts": 0, "nextAttemptAt": now, "createdAt": now}
+        for job in jobs
+    ]
+
+
+def _sort_key(value) -> float:
+    if not isinstance(value, datetime):
+        return 0.0
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def resolve_fcm_tokens(db, uid: str) -> list[str]:
+    users_coll = db["users"]
+    tokens = set()
+    if uid:
+        for query in ([{"_id": uid}], [{"_id": ObjectId(uid)}] if len(uid) == 24 else []):
+            try:
+                user_doc = users_coll.find_one(*query)
+                if user_doc:
+                    for t in user_doc.get("fcmTokens", []) or []:
+                        if isinstance(t, str) and len(t) > 20:
+                            tokens.add(t)
+                    break
+            except Exception:
+                pass
+    if not tokens:
+        for user in users_coll.find({}, {"fcmTokens": 1}):
+            for t in user.get("fcmTokens", []) or []:
+                if isinstance(t, str) and len(t) > 20:
+                    tokens.add(t)
+    return sorted(tokens)
+
+
+def claim_query(now: datetime) -> dict:
+    """Outbox jobs a worker may take: due pending jobs and ones whose lease ran out."""
+    return {"$or": [
+        {"status": "pending", "nextAttemptAt": {"$lte": now}},
+        {"status": "processing", "lockedUntil": {"$lt": now}},
+    ]}
+
+
+def backoff_seconds(attempts: int) -> float:
+    return min(BACKOFF_BASE_SECONDS * (2 ** max(attempts - 1, 0)), BACKOFF_MAX_SECONDS)
+
+
+def _check_response(resp):
+    if resp.status_code == 429 or resp.status_code >= 500:
+        raise RuntimeError(f"HTTP {resp.status_code}")
+    if resp.status_code >= 400:
+        raise PermanentError(f"HTTP {resp.status_code}: {resp.text[:200]}")
+
+
+class NotificationWorker:
+    """Drains the notification outbox with a small pool of threads.
+
+    Jobs are claimed with a lease, so several API processes (or a standalone
+    ``python notifications.py``) can share one outbox safely.
+    """
+
+    def __init__(
+        self,
+        db,
+        threads: int = NOTIFY_WORKERS,
+        poll_interval: float = 1.0,
+        fcm_url: str = FCM_URL,
+        rtdb_url: str | None = None,
+    ):
+        self.db = db
+        self.outbox = db[OUTBOX_COLLECTION]
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.fcm_url = fcm_url
+        self.rtdb_url = rtdb_url if rtdb_url is not None else os.getenv("FIREBASE_RTDB_URL")
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._workers: list[threading.Thread] = []
+
+    def start(self):
+        for i in range(self.threads):
+            t = threading.Thread(target=self._run, name=f"notify-{i}", daemon=True)
+            t.start()
+            self._workers.append(t)
+
+    def stop(self, timeout: float | None = None):
+        self._stop.set()
+        self._wake.set()
+        for t in self._workers:
+            t.join(timeout)
+
+    def notify(self):
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.run_once():
+                    continue
+            except Exception as exc:
+                print(f"[NOTIFY] Worker error: {exc}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def claim(self) -> dict | None:
+        now = datetime.now(timezone.utc)
+        return self.outbox.find_one_and_update(
+            claim_query(now),
+            {
+                "$set": {"status": "processing", "lockedUntil": now + timedelta(seconds=LEASE_SECONDS)},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("nextAttemptAt", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def run_once(self) -> bool:
+        """Claims and delivers one job; returns False when nothing was due."""
+        job = self.claim()
+        if job is None:
+            return False
+        try:
+            self.deliver(job)
+        except Exception as exc:
+            attempts = int(job.get("attempts") or 1)
+            if isinstance(exc, PermanentError) or attempts >= MAX_ATTEMPTS:
+                self.outbox.update_one(
+                    {"_id": job["_id"]},
+                    {"$set": {"status": "failed", "lastError": str(exc), "completedAt": datetime.now(timezone.utc)}},
+                )
+            else:
+                retry_at = datetime.now(timezone.utc) + timedelta(seconds=backoff_seconds(attempts))
+                self.outbox.update_one(
+                    {"_id": job["_id"]},
+                    {"$set": {"status": "pending", "nextAttemptAt": retry_at, "lastError": str(exc)}},
+                )
+            return True
+        self.outbox.update_one(
+            {"_id": job["_id"]},
+            {"$set": {"status": "sent", "completedAt": datetime.now(timezone.utc)}},
+        )
+        return True
+
+    def deliver(self, job: dict):
+        kind = job.get("kind")
+        if kind == "fcm":
+            self._send_fcm(job)
+        elif kind == "rtdb":
+            self._send_rtdb(job)
+        else:
+            raise PermanentError(f"Unknown job kind: {kind}")
+
+    def _send_fcm(self, job: dict):
+        server_key = os.getenv("FCM_SERVER_KEY")
+        if not server_key:
+            raise PermanentError("FCM_SERVER_KEY is not set")
+        tokens = job.get("tokens")
+        if tokens is None:
+            # Resolve once so retries resume against the same recipient list
+            tokens = resolve_fcm_tokens(self.db, job.get("uid") or "")
+            self.outbox.update_one({"_id": job["_id"]}, {"$set": {"tokens": tokens}})
+        headers = {
+            "Authorization": f"key={server_key}",
+            "Content-Type": "application/json",
+        }
+        sent_chunks = int(job.get("sentChunks") or 0)
+        chunks = [tokens[i:i + FCM_BATCH_SIZE] for i in range(0, len(tokens), FCM_BATCH_SIZE)]
+        for index in range(sent_chunks, len(chunks)):
+            payload = {
+                "registration_ids": chunks[index],
+                "notification": job.get("notification") or {},
+                "data": job.get("data") or {},
+                "android": {"priority": "high"},
+                "apns": {"headers": {"apns-priority": "10"}},
+            }
+            resp = http_client.post(self.fcm_url, json=payload, headers=headers, timeout=HTTP_TIMEOUT)
+            _check_response(resp)
+            self.outbox.update_one({"_id": job["_id"]}, {"$set": {"sentChunks": index + 1}})
+
+    def _send_rtdb(self, job: dict):
+        if not self.rtdb_url:
+            raise PermanentError("FIREBASE_RTDB_URL is not set")
+        resp = http_client.patch(
+            f"{self.rtdb_url}/Notifications.json",
+            data=json.dumps({"message": job.get("message", "Event")}),
+            timeout=HTTP_TIMEOUT,
+        )
+        _check_response(resp)
+
+
+def main():
+    uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
+    db_name = os.getenv("DB_NAME", "hearyou")
+    db = MongoClient(uri)[db_name]
+    worker = NotificationWorker(db, threads=max(NOTIFY_WORKERS, 1))
+    worker.start()
+    print("Notification worker running. Press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.stop()
+
+
+if __name__ == "__main__":
+    main()
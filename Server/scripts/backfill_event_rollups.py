@@ -0,0 +1,84 @@
+"""Rebuild event_rollups from the raw events collection.
+
+    MONGODB_URI=mongodb://localhost:27017 DB_NAME=hearyou python scripts/backfill_event_rollups.py
+
+Stop the API first: the rollups are rebuilt into a scratch collection that
+replaces event_rollups at the end, so counts the API adds in the meantime
+would be lost. The rebuild checks that no event was written while it ran
+and leaves event_rollups untouched if one was.
+"""
+import argparse
+import os
+import sys
+
+from pymongo import MongoClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from event_rollups import ROLLUPS_COLLECTION  # noqa: E402
+from event_service import event_rollup_operations  # noqa: E402
+from indexes import INDEXES  # noqa: E402
+
+REBUILD_COLLECTION = ROLLUPS_COLLECTION + "_rebuild"
+
+
+class EventsChanged(RuntimeError):
+    pass
+
+
+def _events_state(db) -> tuple:
+    newest = db["events"].find_one({}, {"_id": 1}, sort=[("_id", -1)])
+    return (newest["_id"] if newest else None, db["events"].estimated_document_count())
+
+
+def backfill(db, batch_size: int = 5000) -> int:
+    """Rebuilds the rollups; returns the number of events scanned.
+
+    Raises EventsChanged, discarding the rebuild, if events were written
+    while it ran.
+    """
+    target = db[REBUILD_COLLECTION]
+    target.drop()
+    before = _events_state(db)
+
+    scanned = 0
+    batch = []
+    for doc in db["events"].find({}, {"title": 1, "uid": 1, "eventAt": 1}, batch_size=batch_size):
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            scanned += _flush(target, batch)
+            batch = []
+    scanned += _flush(target, batch)
+
+    if _events_state(db) != before:
+        target.drop()
+        raise EventsChanged("Events were written during the rebuild; stop the API and run it again")
+    target.create_indexes(INDEXES[ROLLUPS_COLLECTION])  # also creates it if nothing was counted
+    target.rename(ROLLUPS_COLLECTION, dropTarget=True)
+    return scanned
+
+
+def _flush(target, batch) -> int:
+    ops = event_rollup_operations(batch)
+    if ops:
+        target.bulk_write(ops, ordered=False)
+    return len(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
+    db_name = os.getenv("DB_NAME", "hearyou")
+    db = MongoClient(uri)[db_name]
+    try:
+        count = backfill(db, args.batch_size)
+    except EventsChanged as exc:
+        sys.exit(str(exc))
+    print(f"Rolled up {count} events into {db[ROLLUPS_COLLECTION].count_documents({})} buckets.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Compare audio inference backends on a folder of WAV clips.
+
+Every backend runs in its own interpreter so peak RSS reflects only what
+that backend loads. The first backend is the reference for agreement:
+"label" compares top classes window by window (only meaningful between
+models with the same class list), "event" compares which events audio.py
+would fire: event-matrix scores, smoothed per clip, against the per-event
+thresholds.
+
+    python scripts/bench_audio_backends.py --corpus clips/ \\
+        --backend tf --backend tflite:models/yamnet.tflite \\
+        --backend tflite:../HearYou/assets/models/baby_cry_model.tflite
+"""
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio import HISTORY_LEN, HOP_SECONDS, SAMPLE_RATE, WINDOW_SECONDS  # noqa: E402
+from audio_events import EVENT_THRESHOLDS, EventSmoother, triggered  # noqa: E402
+from audio_stream import load_wav  # noqa: E402
+
+
+def _windows(paths: list[str]):
+    window = int(WINDOW_SECONDS * SAMPLE_RATE)
+    hop = int(HOP_SECONDS * SAMPLE_RATE)
+    for clip, path in enumerate(paths):
+        samples = load_wav(path, SAMPLE_RATE)
+        if len(samples) < window:
+            samples = np.pad(samples, (0, window - len(samples)))
+        for end in range(window, len(samples) + 1, hop):
+            yield clip, samples[end - window:end]
+
+
+def run_child(spec: str, paths: list[str]):
+    from audio_backends import load_backend
+
+    name, _, model_path = spec.partition(":")
+    backend = load_backend(name, model_path or None)
+    labels, events, clips, latencies = [], [], [], []
+    for clip, samples in _windows(paths):
+        start = time.perf_counter()
+        label, confidence, scores = backend.classify(samples)
+        latencies.append(time.perf_counter() - start)
+        labels.append([label, confidence])
+        events.append(scores.tolist())
+        clips.append(clip)
+    # ru_maxrss is KiB on Linux
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    result = {"labels": labels, "events": events, "clips": clips, "latencies": latencies, "rss_mb": rss_mb}
+    print("RESULT " + json.dumps(result))
+
+
+def _fired(res: dict) -> list[frozenset[str]]:
+    """Events each window would fire, smoothing like audio.py within each clip."""
+    fired, smoother, current = [], EventSmoother(HISTORY_LEN), None
+    for clip, scores in zip(res["clips"], res["events"]):
+        if clip != current:
+            smoother.reset()
+            current = clip
+        fired.append(frozenset(triggered(smoother.update(np.asarray(scores, dtype=np.float32)), EVENT_THRESHOLDS)))
+    return fired
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", required=True, help="directory of .wav files")
+    parser.add_argument("--backend", action="append", dest="backends", help="tf[:dir] or tflite:file.tflite")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.corpus, "**", "*.wav"), recursive=True))
+    if not paths:
+        sys.exit(f"No .wav files under {args.corpus}")
+    if args.child:
+        run_child(args.child, paths)
+        return
+
+    backends = args.backends or ["tf"]
+    results = {}
+    for spec in backends:
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--corpus", args.corpus, "--child", spec],
+            capture_output=True, text=True,
+        )
+        line = next((ln for ln in proc.stdout.splitlines() if ln.startswith("RESULT ")), None)
+        if proc.returncode != 0 or line is None:
+            print(f"{spec}: failed\n{proc.stderr[-2000:]}")
+            continue
+        results[spec] = json.loads(line[len("RESULT "):])
+
+    if not results:
+        sys.exit(1)
+    reference = results.get(backends[0])
+    print(f"{len(paths)} clips, {len(next(iter(results.values()))['labels'])} windows")
+    print(f"{'backend':<48} {'p50 ms':>7} {'p95 ms':>7} {'RSS MB':>7} {'label %':>8} {'event %':>8}")
+    for spec, res in results.items():
+        lat = np.array(res["latencies"]) * 1000.0
+        label_pct = event_pct = "-"
+        if reference is not None:
+            pairs = list(zip(reference["labels"], res["labels"]))
+            label_pct = f"{100.0 * np.mean([a[0] == b[0] for a, b in pairs]):.1f}"
+            event_pct = f"{100.0 * np.mean([a == b for a, b in zip(_fired(reference), _fired(res))]):.1f}"
+        print(
+            f"{spec:<48} {np.percentile(lat, 50):>7.1f} {np.percentile(lat, 95):>7.1f} "
+            f"{res['rss_mb']:>7.0f} {label_pct:>8} {event_pct:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
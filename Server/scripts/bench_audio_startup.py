@@ -0,0 +1,56 @@
+"""Cold-start time of the audio detector's model, in fresh interpreters.
+
+Each run imports TensorFlow, loads YAMNet from the local store, reads the
+class list and runs the warmup inference, then reports the breakdown.
+
+    python scripts/bench_audio_startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, time
+t0 = time.perf_counter()
+import tensorflow
+t1 = time.perf_counter()
+from yamnet import YamnetModel
+m = YamnetModel()
+out = dict(m.startup_timings, imports=t1 - t0)
+print("STARTUP " + json.dumps(out))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    results = []
+    for i in range(args.runs):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-c", CHILD], cwd=SERVER_DIR, capture_output=True, text=True
+        )
+        wall = time.perf_counter() - start
+        line = next((ln for ln in proc.stdout.splitlines() if ln.startswith("STARTUP ")), None)
+        if proc.returncode != 0 or line is None:
+            sys.exit(f"Run {i + 1} failed:\n{proc.stderr[-2000:]}")
+        timings = json.loads(line[len("STARTUP "):])
+        timings["wall"] = wall
+        results.append(timings)
+        print(f"run {i + 1}: " + ", ".join(f"{k} {v:.2f}s" for k, v in timings.items()))
+
+    keys = ["imports", "load", "classes", "warmup", "total", "wall"]
+    print("median:  " + ", ".join(f"{k} {np.median([r[k] for r in results]):.2f}s" for k in keys))
+
+
+if __name__ == "__main__":
+    main()
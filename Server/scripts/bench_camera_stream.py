@@ -0,0 +1,112 @@
+"""Frames/s delivered by camera_server to N simulated /video_feed clients.
+
+Starts camera_server in-process on waitress, as camera_server.py serves it,
+with a video file as the camera (or targets a running server with --url)
+and keeps N clients reading the MJPEG stream for --seconds at each client
+count.
+
+    python scripts/bench_camera_stream.py --clients 1 4 16
+    python scripts/bench_camera_stream.py --query "profile=low" --clients 8
+    python scripts/bench_camera_stream.py --max-rate     # decode the file as fast as possible
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import requests
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+DEFAULT_SOURCE = os.path.join(SERVER_DIR, "istockphoto-981037294-640_adpp_is.mp4")
+BOUNDARY = b"--frame\r\n"
+
+
+def _start_server(source: str, realtime: bool, threads: int) -> str:
+    import camera_server
+    from frame_broadcast import FrameBroadcaster
+    from waitress import create_server
+
+    camera_server.broadcaster = FrameBroadcaster(source, realtime=realtime).start()
+    server = create_server(
+        camera_server.app, host="127.0.0.1", port=0,
+        threads=threads, outbuf_high_watermark=camera_server.OUTBUF_BYTES,
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    return f"http://127.0.0.1:{server.effective_port}"
+
+
+def _client(url: str, stop: threading.Event, out: list):
+    frames = 0
+    size = 0
+    tail = b""
+    try:
+        with requests.get(url, stream=True, timeout=10) as resp:
+            for chunk in resp.iter_content(chunk_size=65536):
+                size += len(chunk)
+                data = tail + chunk
+                frames += data.count(BOUNDARY)
+                tail = data[-(len(BOUNDARY) - 1):]
+                if stop.is_set():
+                    break
+    except requests.RequestException as exc:
+        print(f"client error: {exc}")
+    out.append((frames, size))
+
+
+def run(base: str, query: str, clients: int, seconds: float) -> dict:
+    url = f"{base}/video_feed" + (f"?{query}" if query else "")
+    stop = threading.Event()
+    results: list[tuple[int, int]] = []
+    threads = [threading.Thread(target=_client, args=(url, stop, results), daemon=True) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stats = requests.get(f"{base}/stats", timeout=5).json()
+    stop.set()
+    for t in threads:
+        t.join(10)
+    per_client = [frames / seconds for frames, _ in results]
+    return {
+        "clients": clients,
+        "avgFps": sum(per_client) / len(per_client) if per_client else 0.0,
+        "minFps": min(per_client, default=0.0),
+        "totalFps": sum(per_client),
+        "mbps": sum(size for _, size in results) * 8 / seconds / 1e6,
+        "captureFps": stats.get("captureFps", 0.0),
+        "encodeMs": stats.get("encodeMs", 0.0),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="running camera_server (default: start one in-process)")
+    parser.add_argument("--source", default=DEFAULT_SOURCE, help="video file used as the camera")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--query", default="", help='stream profile, e.g. "profile=low" or "width=640&quality=70"')
+    parser.add_argument("--max-rate", action="store_true", help="don't pace the file to its frame rate")
+    args = parser.parse_args()
+
+    if args.url:
+        base = args.url.rstrip("/")
+    else:
+        import camera_server
+
+        # One thread per client, or the extra clients wait in the queue
+        threads = max(camera_server.SERVER_THREADS, max(args.clients) + 2)
+        base = _start_server(args.source, realtime=not args.max_rate, threads=threads)
+    time.sleep(1.0)  # let the capture thread open the source
+    print(f"{'clients':>7} {'fps/client':>10} {'min':>6} {'total fps':>9} {'Mbit/s':>8} {'capture':>8} {'encode ms':>9}")
+    for n in args.clients:
+        r = run(base, args.query, n, args.seconds)
+        print(
+            f"{r['clients']:>7} {r['avgFps']:>10.1f} {r['minFps']:>6.1f} {r['totalFps']:>9.1f} "
+            f"{r['mbps']:>8.1f} {r['captureFps']:>8.1f} {r['encodeMs']:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
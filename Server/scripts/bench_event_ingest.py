@@ -0,0 +1,78 @@
+"""Compare single-event and batch ingest throughput against a local mongod.
+
+Runs the real app in-process with the Flask test client, so the numbers
+cover request handling, priority resolution, the Mongo write and outbox
+enqueueing but not the network hop.
+
+    MONGODB_URI=mongodb://localhost:27017 python scripts/bench_event_ingest.py --events 5000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("DB_NAME", "hearyou_bench")
+os.environ.setdefault("NOTIFY_WORKERS", "0")
+os.environ.setdefault("EVENT_DEDUPE_MODE", "off")
+
+from api_server import create_app  # noqa: E402
+
+
+def _event(i: int) -> dict:
+    return {
+        "title": "baby crying" if i % 2 else "door knocking",
+        "uid": f"bench-{i % 4}",
+        "eventAt": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def bench_single(client, n: int) -> float:
+    start = time.perf_counter()
+    for i in range(n):
+        resp = client.post("/events/", json=_event(i))
+        assert resp.status_code == 201, resp.data
+    return n / (time.perf_counter() - start)
+
+
+def bench_batch(client, n: int, batch_size: int) -> float:
+    start = time.perf_counter()
+    for offset in range(0, n, batch_size):
+        batch = [_event(i) for i in range(offset, min(offset + batch_size, n))]
+        resp = client.post("/events/batch", json={"events": batch})
+        assert resp.status_code == 201, resp.data
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[10, 100, 500])
+    args = parser.parse_args()
+
+    app = create_app()
+    db = app.config["DB"]
+    if not db.name.endswith("_bench"):
+        sys.exit("Refusing to drop a non-benchmark database; set DB_NAME=<name>_bench")
+    client = app.test_client()
+
+    def reset():
+        db["events"].delete_many({})
+        db["notification_outbox"].delete_many({})
+
+    try:
+        reset()
+        rate = bench_single(client, args.events)
+        print(f"single        {rate:10.1f} events/s")
+        for size in args.batch_sizes:
+            reset()
+            rate = bench_batch(client, args.events, size)
+            print(f"batch {size:<7} {rate:10.1f} events/s")
+    finally:
+        db.client.drop_database(db.name)
+
+
+if __name__ == "__main__":
+    main()
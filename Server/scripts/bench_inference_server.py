@@ -0,0 +1,105 @@
+"""Throughput and latency of the shared inference server versus stream count.
+
+Starts an in-process InferenceServer (or targets a running one with --addr)
+and drives it with N closed-loop clients, each sending 0.96 s windows as
+fast as replies come back.
+
+    python scripts/bench_inference_server.py --streams 1 2 4 8 16
+    python scripts/bench_inference_server.py --max-batch 1     # unbatched baseline
+    python scripts/bench_inference_server.py --null-model      # transport/batching overhead only
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_events import EVENT_KEYS  # noqa: E402
+from inference_server import InferenceClient, InferenceServer  # noqa: E402
+
+WINDOW_SAMPLES = 15360
+
+
+class _NullModel:
+    def classify_batch(self, windows):
+        return [("Silence", 1.0, np.zeros(len(EVENT_KEYS), dtype=np.float32))] * len(windows)
+
+
+def _stream(addr: str, seconds: float, latencies: list, barrier: threading.Barrier):
+    client = InferenceClient(addr)
+    rng = np.random.default_rng()
+    window = (rng.standard_normal(WINDOW_SAMPLES) * 0.1).astype(np.float32)
+    client.predict(window)  # connect outside the timed section
+    barrier.wait()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        client.predict(window)
+        latencies.append(time.perf_counter() - start)
+    client.close()
+
+
+def run(addr: str, streams: int, seconds: float) -> tuple[float, float, float]:
+    per_stream = [[] for _ in range(streams)]
+    barrier = threading.Barrier(streams + 1)
+    threads = [
+        threading.Thread(target=_stream, args=(addr, seconds, per_stream[i], barrier), daemon=True)
+        for i in range(streams)
+    ]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies = np.array([x for lat in per_stream for x in lat]) * 1000.0
+    return len(latencies) / elapsed, float(np.percentile(latencies, 50)), float(np.percentile(latencies, 95))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--streams", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--addr", help="benchmark an already running server instead of starting one")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=20.0)
+    parser.add_argument("--null-model", action="store_true", help="skip YAMNet to measure server overhead")
+    args = parser.parse_args()
+
+    server = None
+    addr = args.addr
+    if addr is None:
+        if args.null_model:
+            model = _NullModel()
+        else:
+            from yamnet import YamnetModel
+
+            model = YamnetModel()
+        server = InferenceServer(model, "127.0.0.1:0", args.max_batch, args.max_wait_ms)
+        addr = "127.0.0.1:%d" % server.server_address[1]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # Real-time budget: each stream produces one window per 0.48 s hop
+    print(f"{'streams':>7} {'windows/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'avg batch':>9} {'x realtime':>10}")
+    for streams in args.streams:
+        batches_before = server.batcher.batches if server else 0
+        windows_before = server.batcher.windows if server else 0
+        rate, p50, p95 = run(addr, streams, args.seconds)
+        if server and server.batcher.batches > batches_before:
+            avg_batch = f"{(server.batcher.windows - windows_before) / (server.batcher.batches - batches_before):9.1f}"
+        else:
+            avg_batch = f"{'-':>9}"
+        print(f"{streams:>7} {rate:>10.1f} {p50:>8.1f} {p95:>8.1f} {avg_batch} {rate * 0.48 / streams:>10.1f}")
+
+    if server:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
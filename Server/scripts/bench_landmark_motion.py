@@ -0,0 +1,96 @@
+"""Per-frame cost of landmark motion scoring: the old list/tuple loop versus
+the LandmarkRing pass, on synthetic MediaPipe-shaped landmarks.
+
+    python scripts/bench_landmark_motion.py --frames 20000
+"""
+import argparse
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from movement import ANGLE_JOINTS, ANGLE_THRESHOLD, MOVEMENT_THRESHOLD, LandmarkRing, bounding_box, frame_moved  # noqa: E402
+
+WIDTH, HEIGHT = 640, 360
+
+
+def _calculate_angle(a, b, c):
+    # main.py's original helper
+    a = np.array(a)
+    b = np.array(b)
+    c = np.array(c)
+    ba = a - b
+    bc = c - b
+    cosine_angle = np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc) + 1e-6)
+    return np.degrees(np.arccos(np.clip(cosine_angle, -1.0, 1.0)))
+
+
+def legacy(frames):
+    prev_landmarks = prev_angles = None
+    decisions = []
+    for landmarks in frames:
+        curr_landmarks = [(int(lm.x * WIDTH), int(lm.y * HEIGHT)) for lm in landmarks]
+        xs, ys = zip(*curr_landmarks)
+        box = (min(xs), min(ys), max(xs), max(ys))
+        moved = False
+        if prev_landmarks:
+            moved = any(
+                np.sqrt((cx - px)**2 + (cy - py)**2) > MOVEMENT_THRESHOLD
+                for (cx, cy), (px, py) in zip(curr_landmarks, prev_landmarks)
+            )
+        curr_angles = {}
+        for name, (a, b, c_idx) in ANGLE_JOINTS.items():
+            curr_angles[name] = _calculate_angle(curr_landmarks[a], curr_landmarks[b], curr_landmarks[c_idx])
+        if prev_angles:
+            moved = moved or any(abs(curr_angles[n] - prev_angles[n]) > ANGLE_THRESHOLD for n in ANGLE_JOINTS)
+        prev_landmarks, prev_angles = curr_landmarks, curr_angles
+        decisions.append((moved, box))
+    return decisions
+
+
+def vectorized(frames):
+    ring = LandmarkRing()
+    decisions = []
+    for landmarks in frames:
+        points = ring.push_landmarks(landmarks, WIDTH, HEIGHT)
+        decisions.append((frame_moved(ring), bounding_box(points)))
+    return decisions
+
+
+def _synthetic(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    pose = rng.uniform(0.2, 0.8, size=(33, 2))
+    frames = []
+    for i in range(n):
+        # mostly still with bursts of movement, like a sleeping baby
+        jitter = 0.03 if (i // 50) % 4 == 0 else 0.002
+        pose = np.clip(pose + rng.normal(0, jitter, size=pose.shape), 0.0, 1.0)
+        frames.append([SimpleNamespace(x=float(x), y=float(y)) for x, y in pose])
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=10000)
+    args = parser.parse_args()
+
+    frames = _synthetic(args.frames)
+    results = {}
+    for name, fn in (("legacy", legacy), ("vectorized", vectorized)):
+        fn(frames[:100])  # warm caches
+        start = time.perf_counter()
+        results[name] = fn(frames)
+        us = (time.perf_counter() - start) / len(frames) * 1e6
+        print(f"{name:<11} {us:8.1f} us/frame")
+
+    agree = np.mean([a[0] == b[0] for a, b in zip(results["legacy"], results["vectorized"])])
+    # legacy truncates to whole pixels, so borderline frames can differ
+    print(f"movement decisions agree on {agree * 100:.2f}% of frames")
+
+
+if __name__ == "__main__":
+    main()
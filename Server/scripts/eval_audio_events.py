@@ -0,0 +1,110 @@
+"""Clip-level precision/recall of the audio event rules on labelled recordings.
+
+Clips are laid out one folder per event key, with negatives under "none":
+
+    clips/baby crying/*.wav   clips/doorbell/*.wav   clips/none/*.wav
+
+A clip counts as detecting an event if any window would have fired it.
+Two rules are compared on the same model outputs:
+
+    argmax  top class over CONF_THRESHOLD, mapped by label substring
+    matrix  event-matrix scores, smoothed over AUDIO_HISTORY_LEN windows
+            (peak hold for AUDIO_PEAK_EVENTS, mean for the rest),
+            against per-event thresholds (what audio.py does)
+
+    python scripts/eval_audio_events.py --corpus clips/ --thresholds "baby crying=0.35"
+    python scripts/eval_audio_events.py --corpus clips/ --peak-events ""   # mean for every event
+"""
+import argparse
+import glob
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio import CONF_THRESHOLD, HISTORY_LEN, HOP_SECONDS, SAMPLE_RATE, WINDOW_SECONDS, classify_title  # noqa: E402
+from audio_backends import BACKEND, load_backend  # noqa: E402
+from audio_events import EVENT_KEYS, PEAK_EVENTS, EventSmoother, parse_thresholds, triggered  # noqa: E402
+from audio_stream import load_wav  # noqa: E402
+
+
+def _clips(corpus: str) -> list[tuple[str, set[str]]]:
+    clips = []
+    for path in sorted(glob.glob(os.path.join(corpus, "*", "*.wav"))):
+        folder = os.path.basename(os.path.dirname(path))
+        clips.append((path, {folder} if folder in EVENT_KEYS else set()))
+    return clips
+
+
+def _window_outputs(backend, path: str) -> list[tuple[str, float, np.ndarray]]:
+    window = int(WINDOW_SECONDS * SAMPLE_RATE)
+    hop = int(HOP_SECONDS * SAMPLE_RATE)
+    samples = load_wav(path, SAMPLE_RATE)
+    if len(samples) < window:
+        samples = np.pad(samples, (0, window - len(samples)))
+    return [backend.classify(samples[end - window:end]) for end in range(window, len(samples) + 1, hop)]
+
+
+def _argmax_events(outputs) -> set[str]:
+    found = set()
+    for label, confidence, _ in outputs:
+        title = classify_title(label.lower()) if confidence >= CONF_THRESHOLD else None
+        if title:
+            found.add(title)
+    return found
+
+
+def _matrix_events(outputs, thresholds: dict[str, float], history_len: int, peak_events: list[str]) -> set[str]:
+    smoother = EventSmoother(history_len, peak_events=peak_events)
+    found = set()
+    for _, _, events in outputs:
+        found.update(triggered(smoother.update(events), thresholds))
+    return found
+
+
+def _report(name: str, truth: list[set[str]], predicted: list[set[str]]):
+    print(f"\n{name}")
+    print(f"  {'event':<14} {'precision':>9} {'recall':>7} {'f1':>6} {'tp':>4} {'fp':>4} {'fn':>4}")
+    for key in EVENT_KEYS:
+        tp = sum(key in t and key in p for t, p in zip(truth, predicted))
+        fp = sum(key not in t and key in p for t, p in zip(truth, predicted))
+        fn = sum(key in t and key not in p for t, p in zip(truth, predicted))
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / (tp + fn) if tp + fn else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        print(f"  {key:<14} {precision:>9.2f} {recall:>7.2f} {f1:>6.2f} {tp:>4} {fp:>4} {fn:>4}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", required=True)
+    parser.add_argument("--backend", choices=["tf", "tflite"], default=BACKEND)
+    parser.add_argument("--model")
+    parser.add_argument("--thresholds", default=os.getenv("AUDIO_EVENT_THRESHOLDS", ""))
+    parser.add_argument("--history-len", type=int, default=HISTORY_LEN)
+    parser.add_argument("--peak-events", default=",".join(PEAK_EVENTS), help="comma-separated events smoothed by peak hold")
+    args = parser.parse_args()
+
+    clips = _clips(args.corpus)
+    if not clips:
+        sys.exit(f"No labelled .wav clips under {args.corpus}")
+    backend = load_backend(args.backend, args.model)
+    thresholds = parse_thresholds(args.thresholds)
+    peak_events = [key.strip() for key in args.peak_events.split(",") if key.strip()]
+
+    truth, argmax_pred, matrix_pred = [], [], []
+    for path, events in clips:
+        outputs = _window_outputs(backend, path)
+        truth.append(events)
+        argmax_pred.append(_argmax_events(outputs))
+        matrix_pred.append(_matrix_events(outputs, thresholds, args.history_len, peak_events))
+
+    print(f"{len(clips)} clips; thresholds {thresholds}; history {args.history_len}; peak hold {peak_events}")
+    _report("argmax", truth, argmax_pred)
+    _report("matrix", truth, matrix_pred)
+
+
+if __name__ == "__main__":
+    main()
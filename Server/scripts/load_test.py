@@ -0,0 +1,87 @@
+"""Concurrent load test for the events API.
+
+Drives a mix of POST /events/ and GET /events/ from many concurrent
+connections and reports throughput and latency percentiles, so the
+gunicorn (api_server) and uvicorn (asgi_server) deployments can be
+compared on the same database:
+
+    gunicorn "api_server:create_app()" -b 127.0.0.1:5000 -w 2 --threads 4
+    uvicorn --factory asgi_server:create_app --port 5001
+    python scripts/load_test.py --target gunicorn=http://127.0.0.1:5000 \\
+        --target uvicorn=http://127.0.0.1:5001 --concurrency 500 --duration 30
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+
+TITLES = ["baby crying", "door knocking", "baby movement", "phone call"]
+
+
+async def _worker(client: httpx.AsyncClient, base: str, deadline: float, read_ratio: float, latencies: list, errors: list):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            if random.random() < read_ratio:
+                resp = await client.get(f"{base}/events/", params={"uid": f"load-{random.randrange(50)}", "limit": 20})
+            else:
+                resp = await client.post(f"{base}/events/", json={
+                    "title": random.choice(TITLES),
+                    # Spread writes over many uids so the cooldown does not merge them all
+                    "uid": f"load-{random.randrange(100000)}",
+                    "eventAt": datetime.now(timezone.utc).isoformat(),
+                })
+            if resp.status_code >= 400:
+                errors.append(resp.status_code)
+        except Exception as exc:
+            errors.append(type(exc).__name__)
+        latencies.append(time.perf_counter() - start)
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run_target(name: str, base: str, concurrency: int, duration: float, read_ratio: float):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        latencies: list[float] = []
+        errors: list = []
+        deadline = time.perf_counter() + duration
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            _worker(client, base.rstrip("/"), deadline, read_ratio, latencies, errors)
+            for _ in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+    print(
+        f"{name:<10} {len(latencies) / elapsed:9.1f} req/s  "
+        f"p50={_percentile(latencies, 50) * 1000:7.1f}ms  "
+        f"p95={_percentile(latencies, 95) * 1000:7.1f}ms  "
+        f"p99={_percentile(latencies, 99) * 1000:7.1f}ms  "
+        f"errors={len(errors)}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", action="append", required=True, help="name=base_url, repeatable")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--read-ratio", type=float, default=0.5, help="share of requests that are GET /events/")
+    args = parser.parse_args()
+
+    for target in args.target:
+        name, _, base = target.partition("=")
+        asyncio.run(run_target(name, base or name, args.concurrency, args.duration, args.read_ratio))
+
+
+if __name__ == "__main__":
+    main()
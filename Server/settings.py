@@ -1,9 +1,155 @@
+import asyncio
+import os
+import threading
+import time
+
 from flask import Blueprint, current_app, jsonify, request
 
 
 settings_bp = Blueprint("settings_bp", __name__)
 
 
+SETTINGS_CACHE_TTL = float(os.getenv("SETTINGS_CACHE_TTL", "5"))
+
+
+class SettingsCache:
+    """Process-wide copy of the settings "global" document.
+
+    A change stream keeps it fresh; if the deployment does not support
+    change streams the document is re-read at most every ``ttl`` seconds.
+    """
+
+    def __init__(self, db, ttl: float = SETTINGS_CACHE_TTL):
+        self.col = db["settings"]
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self._doc: dict | None = None
+        self._loaded_at = 0.0
+        self._generation = 0
+        self._watching = False
+        self._stop = threading.Event()
+
+    def get(self) -> dict:
+        with self.lock:
+            doc = self._doc
+            fresh = doc is not None and (self._watching or time.monotonic() - self._loaded_at < self.ttl)
+        if fresh:
+            return dict(doc)
+        return dict(self.reload())
+
+    def reload(self) -> dict:
+        with self.lock:
+            generation = self._generation
+        doc = self.col.find_one({"_id": "global"}) or {}
+        with self.lock:
+            # Don't cache a read that raced with an invalidation
+            if generation == self._generation:
+                self._doc = doc
+                self._loaded_at = time.monotonic()
+        return doc
+
+    def invalidate(self):
+        with self.lock:
+            self._doc = None
+            self._generation += 1
+
+    def start(self):
+        threading.Thread(target=self._watch, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch(self):
+        while not self._stop.is_set():
+            try:
+                with self.col.watch([{"$match": {"documentKey._id": "global"}}]) as stream:
+                    with self.lock:
+                        self._watching = True
+                    # Anything written before the stream opened is not replayed
+                    self.invalidate()
+                    while not self._stop.is_set():
+                        if stream.try_next() is not None:
+                            self.invalidate()
+            except Exception as exc:
+                print(f"[SETTINGS] Change stream unavailable, polling every {self.ttl}s: {exc}")
+            with self.lock:
+                self._watching = False
+            self._stop.wait(60)
+
+
+class AsyncSettingsCache:
+    """SettingsCache for a Motor database (used by asgi_server).
+
+    Everything runs on the event loop, so no locking is needed.
+    """
+
+    def __init__(self, db, ttl: float = SETTINGS_CACHE_TTL):
+        self.col = db["settings"]
+        self.ttl = ttl
+        self._doc: dict | None = None
+        self._loaded_at = 0.0
+        self._generation = 0
+        self._watching = False
+        self._task: asyncio.Task | None = None
+
+    async def get(self) -> dict:
+        doc = self._doc
+        if doc is not None and (self._watching or time.monotonic() - self._loaded_at < self.ttl):
+            return dict(doc)
+        return dict(await self.reload())
+
+    async def reload(self) -> dict:
+        generation = self._generation
+        doc = await self.col.find_one({"_id": "global"}) or {}
+        if generation == self._generation:
+            self._doc = doc
+            self._loaded_at = time.monotonic()
+        return doc
+
+    def invalidate(self):
+        self._doc = None
+        self._generation += 1
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._watch())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _watch(self):
+        while True:
+            try:
+                async with self.col.watch([{"$match": {"documentKey._id": "global"}}]) as stream:
+                    self._watching = True
+                    self.invalidate()
+                    async for _ in stream:
+                        self.invalidate()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print(f"[SETTINGS] Change stream unavailable, polling every {self.ttl}s: {exc}")
+            self._watching = False
+            await asyncio.sleep(60)
+
+
+def get_cached_settings() -> dict:
+    cache = current_app.config.get("SETTINGS_CACHE")
+    if cache is None:
+        return current_app.config["DB"]["settings"].find_one({"_id": "global"}) or {}
+    return cache.get()
+
+
+def invalidate_cached_settings():
+    cache = current_app.config.get("SETTINGS_CACHE")
+    if cache is not None:
+        cache.invalidate()
+
+
 DEFAULT_COLORS = {
     "baby_crying": "blue",
     "door_knocking": "green",
@@ -12,44 +158,52 @@ DEFAULT_COLORS = {
 }
 
 
-@settings_bp.route("/", methods=["GET"])  
-def get_settings():
-    db = current_app.config.get("DB")
-    doc = db["settings"].find_one({"_id": "global"}) or {}
-    return jsonify({
-        "ok": True,
-        "settings": {
-            "colors": doc.get("colors", DEFAULT_COLORS),
-            "vibration": bool(doc.get("vibration", False)),
-            "quietHours": doc.get("quietHours", {}),
-            "priorities": doc.get("priorities", {}),
-        },
-    })
+def serialize_settings(doc: dict) -> dict:
+    return {
+        "colors": doc.get("colors", DEFAULT_COLORS),
+        "vibration": bool(doc.get("vibration", False)),
+        "quietHours": doc.get("quietHours", {}),
+        "priorities": doc.get("priorities", {}),
+    }
 
 
-@settings_bp.route("/", methods=["POST"])  
-def save_settings():
-    db = current_app.config.get("DB")
-    data = request.get_json(force=True, silent=True) or {}
+def build_settings_update(data: dict) -> dict:
+    """Returns the $set fields for POST /settings/; raises ValueError on bad input."""
     colors = data.get("colors") or {}
     vibration = bool(data.get("vibration", False))
     quiet_hours = data.get("quietHours") or None
     priorities = data.get("priorities") or None
 
     if not isinstance(colors, dict):
-        return jsonify({"ok": False, "message": "colors must be an object"}), 400
+        raise ValueError("colors must be an object")
 
     update_fields = {"colors": colors, "vibration": vibration}
     if isinstance(quiet_hours, dict):
         update_fields["quietHours"] = quiet_hours
     if isinstance(priorities, dict):
         update_fields["priorities"] = priorities
+    return update_fields
+
+
+@settings_bp.route("/", methods=["GET"])  
+def get_settings():
+    doc = get_cached_settings()
+    return jsonify({"ok": True, "settings": serialize_settings(doc)})
+
+
+@settings_bp.route("/", methods=["POST"])  
+def save_settings():
+    db = current_app.config.get("DB")
+    data = request.get_json(force=True, silent=True) or {}
+    try:
+        update_fields = build_settings_update(data)
+    except ValueError as exc:
+        return jsonify({"ok": False, "message": str(exc)}), 400
 
     db["settings"].update_one(
         {"_id": "global"},
         {"$set": update_fields},
         upsert=True,
     )
+    invalidate_cached_settings()
     return jsonify({"ok": True})
-
-
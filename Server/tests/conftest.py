@@ -0,0 +1,72 @@
+import os
+import sys
+
+import mongomock
+import pytest
+from flask import Flask
+from mongomock_motor import AsyncMongoMockClient
+from starlette.applications import Starlette
+from starlette.testclient import TestClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import asgi_server  # noqa: E402
+from cameras import cameras_bp  # noqa: E402
+from dedupe import EventDeduplicator  # noqa: E402
+from event_service import EventStore  # noqa: E402
+from events import events_bp  # noqa: E402
+from settings import AsyncSettingsCache  # noqa: E402
+
+
+class Api:
+    """Same calls against the Flask app or the ASGI app."""
+
+    def __init__(self, client, db):
+        self.client = client
+        self.db = db
+
+    def get(self, path: str) -> tuple[int, dict]:
+        return self._result(self.client.get(path))
+
+    def post(self, path: str, body) -> tuple[int, dict]:
+        return self._result(self.client.post(path, json=body))
+
+    def put(self, path: str, body) -> tuple[int, dict]:
+        return self._result(self.client.put(path, json=body))
+
+    @staticmethod
+    def _result(resp) -> tuple[int, dict | None]:
+        if resp.headers.get("content-type", "").startswith("application/json"):
+            return resp.status_code, resp.json() if callable(resp.json) else resp.json
+        return resp.status_code, None  # e.g. the framework's plain-text 500 page
+
+
+def _flask_api(mongo, mode: str) -> Api:
+    db = mongo["hearyou"]
+    app = Flask(__name__)
+    app.config["DB"] = db
+    app.config["EVENT_DEDUPER"] = EventDeduplicator(db, mode=mode)
+    app.register_blueprint(events_bp, url_prefix="/events")
+    app.register_blueprint(cameras_bp, url_prefix="/cameras")
+    return Api(app.test_client(), db)
+
+
+def _asgi_api(mongo, mode: str) -> Api:
+    db = AsyncMongoMockClient(mock_mongo_client=mongo)["hearyou"]
+    app = Starlette(routes=asgi_server.ROUTES)
+    app.state.db = db
+    app.state.settings_cache = AsyncSettingsCache(db)
+    app.state.event_store = EventStore(mongo["hearyou"], EventDeduplicator(mongo["hearyou"], mode=mode))
+    return Api(TestClient(app, raise_server_exceptions=False), mongo["hearyou"])
+
+
+@pytest.fixture(params=["flask", "asgi"])
+def make_api(request):
+    """Builds an API over a fresh in-memory database; ``mode`` is the dedupe mode."""
+    build = _flask_api if request.param == "flask" else _asgi_api
+    return lambda mode="merge": build(mongomock.MongoClient(), mode)
+
+
+@pytest.fixture
+def api(make_api):
+    return make_api()
@@ -0,0 +1,40 @@
+import numpy as np
+
+from audio_stream import AudioRingBuffer
+
+
+def _samples(begin: int, end: int) -> np.ndarray:
+    return np.arange(begin, end, dtype=np.float32)
+
+
+def test_read_returns_windows_across_the_wrap():
+    ring = AudioRingBuffer(8)
+    ring.write(_samples(0, 6))
+    ring.write(_samples(6, 11))
+
+    assert (ring.read(11, 6) == _samples(5, 11)).all()
+    assert ring.read(12, 4) is None  # not written yet
+
+
+def test_read_drops_windows_the_writer_lapped():
+    ring = AudioRingBuffer(8)
+    ring.write(_samples(0, 8))
+    ring.write(_samples(8, 12))
+
+    assert ring.read(6, 4) is None  # samples 2 and 3 are gone
+    assert (ring.read(8, 4) == _samples(4, 8)).all()
+
+
+def test_read_drops_windows_a_write_in_progress_is_overwriting():
+    ring = AudioRingBuffer(8)
+    ring.write(_samples(0, 8))
+
+    class RacingBuffer(np.ndarray):
+        def __getitem__(self, key):
+            # The producer starts its next 3-sample block while the reader copies
+            ring.writing = ring.written + 3
+            return super().__getitem__(key)
+
+    ring.buf = ring.buf.view(RacingBuffer)
+    assert ring.read(8, 8) is None  # samples 0..2 are being overwritten
+    assert ring.read(8, 5) is not None  # samples 3..7 are not
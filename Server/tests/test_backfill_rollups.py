@@ -0,0 +1,51 @@
+import os
+import sys
+from datetime import datetime, timezone
+
+import mongomock
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
+
+import backfill_event_rollups  # noqa: E402
+from event_rollups import ROLLUPS_COLLECTION  # noqa: E402
+
+AT = "2026-01-05T08:30:00+00:00"
+
+
+def _rollups(db) -> dict:
+    return {d["_id"]: (d["total"], d["counts"]) for d in db[ROLLUPS_COLLECTION].find()}
+
+
+def test_backfill_matches_live_counting(api):
+    api.post("/events/batch", {"events": [
+        {"title": "Baby crying", "eventAt": AT},
+        {"title": "Doorbell", "eventAt": "2026-01-06T09:00:00+00:00"},
+    ]})
+    # Legacy rows without a datetime eventAt are not counted live either
+    api.db["events"].insert_many([
+        {"title": "Doorbell", "createdAt": datetime(2026, 1, 5, tzinfo=timezone.utc)},
+        {"title": "Doorbell", "eventAt": "2026-01-05T10:00:00"},
+    ])
+    live = _rollups(api.db)
+
+    assert backfill_event_rollups.backfill(api.db) == 4
+    assert _rollups(api.db) == live
+    assert "uid_granularity_bucketStart" in api.db[ROLLUPS_COLLECTION].index_information()
+
+
+def test_backfill_keeps_rollups_if_events_arrive_meanwhile(monkeypatch):
+    db = mongomock.MongoClient()["hearyou"]
+    db["events"].insert_one({"title": "Doorbell", "eventAt": datetime(2026, 1, 5, tzinfo=timezone.utc)})
+    db[ROLLUPS_COLLECTION].insert_one({"_id": "kept", "total": 7, "counts": {}})
+    flush = backfill_event_rollups._flush
+
+    def flush_and_ingest(target, batch):
+        db["events"].insert_one({"title": "Doorbell", "eventAt": datetime(2026, 1, 6, tzinfo=timezone.utc)})
+        return flush(target, batch)
+
+    monkeypatch.setattr(backfill_event_rollups, "_flush", flush_and_ingest)
+    with pytest.raises(backfill_event_rollups.EventsChanged):
+        backfill_event_rollups.backfill(db)
+    assert _rollups(db) == {"kept": (7, {})}
+    assert backfill_event_rollups.REBUILD_COLLECTION not in db.list_collection_names()
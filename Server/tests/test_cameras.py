@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+import camera_paths
+
+
+@pytest.fixture(autouse=True)
+def camera_dirs(tmp_path, monkeypatch):
+    media, output = tmp_path / "media", tmp_path / "annotated"
+    media.mkdir()
+    output.mkdir()
+    (media / "crib.mp4").write_bytes(b"")
+    monkeypatch.setattr(camera_paths, "CAMERA_MEDIA_DIR", str(media))
+    monkeypatch.setattr(camera_paths, "CAMERA_OUTPUT_DIR", str(output))
+    return media, output
+
+
+@pytest.mark.parametrize("source", ["0", "rtsp://10.0.0.7/stream1", "https://cam.local/mjpeg", "bus:nursery", "crib.mp4"])
+def test_allowed_sources_are_saved(api, source):
+    status, body = api.put("/cameras/crib", {"source": source, "annotate": "crib/"})
+
+    assert status == 200
+    assert body["camera"]["source"] == source
+    assert body["camera"]["annotate"] == "crib/"
+
+
+@pytest.mark.parametrize("source", [
+    "/etc/passwd",
+    "../secrets.mp4",
+    "clips/../../secrets.mp4",
+    "file:///etc/passwd",
+    "rtsp:/no-host",
+    "udp://0.0.0.0:1234",
+    "bus:../nursery",
+])
+def test_sources_outside_the_allowlist_are_rejected(api, source):
+    status, body = api.put("/cameras/crib", {"source": source})
+
+    assert status == 400
+    assert api.db["cameras"].find_one({"_id": "crib"}) is None
+
+
+@pytest.mark.parametrize("annotate", ["/tmp/out.mp4", "../out.mp4", "crib/../../out.mp4"])
+def test_annotate_outside_the_output_dir_is_rejected(api, annotate):
+    status, body = api.put("/cameras/crib", {"source": "0", "annotate": annotate})
+
+    assert status == 400
+    assert api.db["cameras"].find_one({"_id": "crib"}) is None
+
+
+def test_symlinks_cannot_leave_the_output_dir(api, camera_dirs, tmp_path):
+    _, output = camera_dirs
+    os.symlink(tmp_path, output / "escape")
+
+    status, _ = api.put("/cameras/crib", {"source": "0", "annotate": "escape/out.mp4"})
+
+    assert status == 400
+
+
+def test_paths_resolve_under_the_configured_dirs(camera_dirs):
+    media, output = camera_dirs
+
+    assert camera_paths.check_source("crib.mp4") == str(media / "crib.mp4")
+    assert camera_paths.resolve_annotate("crib/") == str(output / "crib")
@@ -0,0 +1,43 @@
+from mongomock.collection import Collection
+
+import event_service
+from notifications import OUTBOX_COLLECTION
+
+
+def _flaky_outbox(monkeypatch, failures: int, partial: bool = True):
+    original = Collection.insert_many
+    calls = []
+
+    def insert_many(self, docs, *args, **kwargs):
+        if self.name == OUTBOX_COLLECTION:
+            calls.append(len(docs))
+            if len(calls) <= failures:
+                if partial:
+                    original(self, docs[:1], *args, **kwargs)  # part of the jobs made it
+                raise RuntimeError("connection reset")
+        return original(self, docs, *args, **kwargs)
+
+    monkeypatch.setattr(Collection, "insert_many", insert_many)
+    return calls
+
+
+def _setup(monkeypatch):
+    monkeypatch.setenv("FCM_SERVER_KEY", "test")
+    monkeypatch.setattr(event_service, "OUTBOX_RETRY_SECONDS", 0)
+
+
+def test_outbox_insert_is_retried_without_duplicate_jobs(api, monkeypatch):
+    _setup(monkeypatch)
+    calls = _flaky_outbox(monkeypatch, failures=1)
+    status, _ = api.post("/events/batch", {"events": [{"title": "a", "uid": "u1"}, {"title": "b", "uid": "u2"}]})
+    assert status == 201
+    assert len(calls) == 2
+    assert sorted(j["uid"] for j in api.db[OUTBOX_COLLECTION].find()) == ["u1", "u2"]
+
+
+def test_outbox_failure_is_logged_with_event_ids(api, monkeypatch, capsys):
+    _setup(monkeypatch)
+    _flaky_outbox(monkeypatch, failures=event_service.OUTBOX_ATTEMPTS, partial=False)
+    status, body = api.post("/events/", {"title": "a", "uid": "u1"})
+    assert status == 201
+    assert f"events {body['event']['id']}: connection reset" in capsys.readouterr().out
@@ -0,0 +1,76 @@
+import time
+
+import pytest
+
+import event_spool
+from event_spool import EventSpool
+
+
+class _Resp:
+    def __init__(self, status: int, body: dict | None = None):
+        self.status_code = status
+        self._body = body or {}
+
+    def json(self):
+        return self._body
+
+
+def _api(received: list, down: bool = False):
+    """Fake POST /events/batch that answers 500 for any batch holding a "bad" event."""
+
+    def post(url, json, timeout):
+        events = json["events"]
+        if down or any(e["title"] == "bad" for e in events):
+            return _Resp(500)
+        received.extend(e["title"] for e in events)
+        return _Resp(201, {"results": [{"ok": True} for _ in events]})
+
+    return post
+
+
+@pytest.fixture
+def spool(tmp_path, monkeypatch):
+    clock = [time.time()]
+
+    def now():
+        clock[0] += 0.5  # every call moves time on, so rows set aside come back
+        return clock[0]
+
+    monkeypatch.setattr(event_spool.time, "time", now)
+    monkeypatch.setattr(event_spool, "SPOOL_MAX_ATTEMPTS", 2)
+    spool = EventSpool(str(tmp_path / "events.db"), batch_size=8)
+    yield spool
+    spool.close()
+
+
+def _drain(spool: EventSpool, rounds: int = 100):
+    for _ in range(rounds):
+        spool.flush_once()
+
+
+def test_one_bad_row_does_not_block_the_batch(spool, monkeypatch):
+    received = []
+    monkeypatch.setattr(event_spool.http_client, "post", _api(received))
+    for i in range(8):
+        spool.submit({"title": "bad" if i == 5 else f"e{i}"})
+
+    _drain(spool)
+    assert sorted(received) == sorted(f"e{i}" for i in range(8) if i != 5)
+    # It kept failing alone while other rows got through
+    assert spool.pending() == 0
+    assert spool.dropped == 1
+
+
+def test_outage_drops_nothing(spool, monkeypatch):
+    received = []
+    monkeypatch.setattr(event_spool.http_client, "post", _api(received, down=True))
+    for i in range(4):
+        spool.submit({"title": f"e{i}"})
+
+    _drain(spool)
+    assert spool.pending() == 4
+    assert spool.dropped == 0
+
+    monkeypatch.setattr(event_spool.http_client, "post", _api(received))
+    _drain(spool)
+    assert sorted(received) == ["e0", "e1", "e2", "e3"]
@@ -0,0 +1,23 @@
+import mongomock
+from flask import Flask
+
+import events
+from event_stream import EventBroadcaster
+
+
+def test_flask_stream_is_capped(monkeypatch):
+    db = mongomock.MongoClient()["hearyou"]
+    broadcaster = EventBroadcaster(db)
+    app = Flask(__name__)
+    app.config["DB"] = db
+    app.config["EVENT_BROADCASTER"] = broadcaster
+    app.register_blueprint(events.events_bp, url_prefix="/events")
+    monkeypatch.setattr(events, "FLASK_MAX_SUBSCRIBERS", 1)
+    try:
+        assert broadcaster.subscribe("", lambda doc: None, limit=1) is not None
+        resp = app.test_client().get("/events/stream")
+        assert resp.status_code == 503
+        assert resp.headers["Retry-After"]
+        assert broadcaster.subscriber_count == 1
+    finally:
+        broadcaster.stop()
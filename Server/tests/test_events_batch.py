@@ -0,0 +1,138 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from bson import ObjectId
+from mongomock.collection import Collection
+
+from dedupe import EventDeduplicator
+
+AT = "2026-01-05T10:00:00+00:00"
+
+
+def _events(api, title):
+    return list(api.db["events"].find({"title": title}))
+
+
+def test_batch_groups_in_batch_duplicates(api):
+    status, body = api.post("/events/batch", {"events": [
+        {"title": "Baby crying"},
+        {"title": "Door knocking"},
+        {"title": "Baby crying"},
+        {"title": "Baby crying"},
+    ]})
+    assert status == 201
+    assert body["inserted"] == 2
+    results = body["results"]
+    crying = _events(api, "Baby crying")
+    assert len(crying) == 1
+    assert crying[0]["occurrences"] == 3
+    assert results[0]["event"]["occurrences"] == 3
+    for index in (2, 3):
+        assert results[index]["ok"] and results[index]["duplicate"]
+        assert results[index]["event"]["id"] == str(crying[0]["_id"])
+
+
+def test_batch_duplicate_of_stored_event_merges_group_count(api):
+    api.post("/events/", {"title": "Baby crying"})
+    status, body = api.post("/events/batch", {"events": [{"title": "Baby crying"}, {"title": "Baby crying"}]})
+    assert status == 200
+    assert body["inserted"] == 0
+    assert all(r["duplicate"] for r in body["results"])
+    [stored] = _events(api, "Baby crying")
+    assert stored["occurrences"] == 3
+
+
+def test_batch_reject_mode_rejects_in_batch_duplicates(make_api):
+    api = make_api("reject")
+    status, body = api.post("/events/batch", {"events": [{"title": "Phone call"}, {"title": "Phone call"}]})
+    assert status == 201
+    [stored] = _events(api, "Phone call")
+    assert stored["occurrences"] == 1
+    assert body["results"][1] == {
+        "index": 1, "ok": False, "duplicate": True,
+        "message": "Duplicate event within cooldown", "eventId": str(stored["_id"]),
+    }
+
+
+def test_batch_validates_every_item_before_writing(api):
+    status, body = api.post("/events/batch", {"events": [{"title": "ok"}, {"title": 5}, {"uid": ["x"], "title": "a"}]})
+    assert status == 201
+    assert body["results"][1] == {"index": 1, "ok": False, "message": "title must be a string"}
+    assert body["results"][2] == {"index": 2, "ok": False, "message": "uid must be a string"}
+    assert len(_events(api, "ok")) == 1
+
+
+def test_failed_batch_releases_its_claims(api, monkeypatch):
+    def fail(self, *args, **kwargs):
+        raise RuntimeError("connection reset")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(Collection, "insert_many", fail)
+        status, _ = api.post("/events/batch", {"events": [{"title": "ok"}, {"title": "Door knocking"}]})
+    assert status == 500
+    assert api.db["event_dedupe"].count_documents({}) == 0
+
+    status, body = api.post("/events/", {"title": "ok"})
+    assert status == 201
+    assert body["ok"] and "duplicate" not in body
+    assert len(_events(api, "ok")) == 1
+
+
+@pytest.mark.parametrize("mode", ["merge", "reject"])
+def test_window_held_by_missing_event_is_reclaimed(make_api, mode):
+    api = make_api(mode)
+    ghost = ObjectId()
+    key = EventDeduplicator(api.db).window_key({"eventAt": datetime.fromisoformat(AT)}, "ok")
+    api.db["event_dedupe"].insert_one({
+        "_id": key,
+        "eventId": ghost,
+        "expiresAt": datetime.now(timezone.utc) + timedelta(minutes=5),
+    })
+    status, body = api.post("/events/batch", {"events": [{"title": "ok", "eventAt": AT}, {"title": "ok", "eventAt": AT}]})
+    assert status == 201
+    [stored] = _events(api, "ok")
+    assert body["results"][0]["event"]["id"] == str(stored["_id"])
+    assert api.db["event_dedupe"].find_one({"_id": key})["eventId"] == stored["_id"]
+
+    status, body = api.post("/events/", {"title": "ok", "eventAt": AT})
+    assert body["duplicate"]
+    assert status == (200 if mode == "merge" else 409)
+
+
+def test_backlog_dedupes_on_event_time_not_arrival(api):
+    start = datetime(2026, 1, 5, 8, 0, tzinfo=timezone.utc)
+    backlog = [{"title": "Baby crying", "eventAt": (start + timedelta(hours=h)).isoformat()} for h in range(3)]
+    backlog.append({"title": "Baby crying", "eventAt": (start + timedelta(hours=2, seconds=5)).isoformat()})
+    status, body = api.post("/events/batch", {"events": backlog})
+    assert status == 201
+    assert body["inserted"] == 3
+    assert body["results"][3]["duplicate"]
+    assert sorted(d["occurrences"] for d in _events(api, "Baby crying")) == [1, 1, 2]
+
+
+def test_cooldown_slides_across_a_window_boundary(api):
+    boundary = datetime(2026, 1, 5, 8, 0, tzinfo=timezone.utc)  # a multiple of the 120 s cooldown
+    before, after = boundary - timedelta(seconds=0.5), boundary + timedelta(seconds=0.5)
+
+    status, first = api.post("/events/", {"title": "Baby crying", "eventAt": after.isoformat()})
+    assert status == 201
+    status, second = api.post("/events/", {"title": "Baby crying", "eventAt": before.isoformat()})
+    assert second["duplicate"]
+    assert second["event"]["id"] == first["event"]["id"]
+
+    later = boundary + timedelta(seconds=125)  # next window, outside the cooldown of `after`
+    status, _ = api.post("/events/", {"title": "Baby crying", "eventAt": later.isoformat()})
+    assert status == 201
+    assert len(_events(api, "Baby crying")) == 2
+
+
+def test_batch_groups_copies_across_a_window_boundary(api):
+    boundary = datetime(2026, 1, 5, 8, 0, tzinfo=timezone.utc)
+    copies = [{"title": "Doorbell", "eventAt": (boundary + timedelta(seconds=s)).isoformat()} for s in (-1, 1)]
+
+    status, body = api.post("/events/batch", {"events": copies})
+
+    assert status == 201
+    assert body["inserted"] == 1
+    assert body["results"][1]["duplicate"]
+    assert [d["occurrences"] for d in _events(api, "Doorbell")] == [2]
@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote
+
+from bson import ObjectId
+
+
+def _pages(api, limit: int) -> list[list[str]]:
+    pages = []
+    path = f"/events/?limit={limit}"
+    while True:
+        status, body = api.get(path)
+        assert status == 200
+        pages.append([e["title"] for e in body["events"]])
+        if not body["nextCursor"]:
+            return pages
+        path = f"/events/?limit={limit}&before={quote(body['nextCursor'])}"
+
+
+def test_pages_continue_past_events_without_event_time(api):
+    start = datetime(2026, 1, 5, tzinfo=timezone.utc)
+    docs = [{"_id": ObjectId(), "title": f"t{i}", "eventAt": start + timedelta(minutes=i)} for i in range(3)]
+    docs += [{"_id": ObjectId(), "title": "legacy0", "createdAt": start}]
+    docs += [{"_id": ObjectId(), "title": "legacy1", "eventAt": None, "createdAt": start}]
+    docs += [{"_id": ObjectId(), "title": "legacy2"}]
+    api.db["events"].insert_many(docs)
+
+    pages = _pages(api, 2)
+    assert pages == [["t2", "t1"], ["t0", "legacy2"], ["legacy1", "legacy0"]]
+
+
+def test_pages_include_events_with_string_event_time(api):
+    start = datetime(2026, 1, 5, tzinfo=timezone.utc)
+    docs = [{"_id": ObjectId(), "title": f"t{i}", "eventAt": start + timedelta(minutes=i)} for i in range(2)]
+    docs += [{"_id": ObjectId(), "title": f"raw{i}", "eventAt": f"2025-12-0{i + 1}T10:00:00_x"} for i in range(3)]
+    docs += [{"_id": ObjectId(), "title": "raw-dup", "eventAt": "2025-12-02T10:00:00_x"}]
+    docs += [{"_id": ObjectId(), "title": "legacy"}]
+    api.db["events"].insert_many(docs)
+
+    pages = _pages(api, 2)
+    assert pages == [["t1", "t0"], ["raw2", "raw-dup"], ["raw1", "raw0"], ["legacy"]]
@@ -0,0 +1,67 @@
+import uuid
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+import frame_broadcast  # noqa: E402
+from frame_broadcast import FrameBroadcaster, StreamProfile, _ProfileFeed  # noqa: E402
+from frame_bus import BusCapture, FrameBusWriter  # noqa: E402
+
+
+@pytest.fixture
+def bus_camera():
+    name = f"test-{uuid.uuid4().hex[:8]}"
+    writer = FrameBusWriter(name, (8, 8, 3), slots=2)
+    camera = BusCapture(name)
+    yield writer, camera
+    camera.release()
+    writer.close()
+
+
+def _watched(broadcaster: FrameBroadcaster) -> _ProfileFeed:
+    feed = broadcaster.feeds[StreamProfile().key] = _ProfileFeed(StreamProfile())
+    feed.viewers = 1
+    return feed
+
+
+def _encode_once(broadcaster, monkeypatch, during=lambda: None):
+    """Patches imencode to run ``during`` and stop the loop after one frame."""
+    encode = cv2.imencode
+
+    def imencode(*args):
+        during()
+        broadcaster._stop.set()
+        return encode(*args)
+
+    monkeypatch.setattr(frame_broadcast.cv2, "imencode", imencode)
+
+
+def test_intact_frames_are_published(bus_camera, monkeypatch):
+    writer, camera = bus_camera
+    broadcaster = FrameBroadcaster("bus:test", realtime=False)
+    feed = _watched(broadcaster)
+    writer.publish(np.zeros((8, 8, 3), np.uint8))
+    _encode_once(broadcaster, monkeypatch)
+
+    broadcaster._capture_loop(camera)
+
+    assert feed.seq == 1 and feed.jpeg
+
+
+def test_frames_overwritten_mid_encode_are_dropped(bus_camera, monkeypatch):
+    writer, camera = bus_camera
+    broadcaster = FrameBroadcaster("bus:test", realtime=False)
+    feed = _watched(broadcaster)
+    writer.publish(np.zeros((8, 8, 3), np.uint8))
+
+    def lap_the_ring():
+        for value in (1, 2):
+            writer.publish(np.full((8, 8, 3), value, np.uint8))
+
+    _encode_once(broadcaster, monkeypatch, during=lap_the_ring)
+
+    broadcaster._capture_loop(camera)
+
+    assert feed.seq == 0 and feed.jpeg is None
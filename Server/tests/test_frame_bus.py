@@ -0,0 +1,162 @@
+import time
+import uuid
+
+import numpy as np
+import pytest
+
+import frame_bus
+from frame_bus import BusCapture, FrameBusReader, FrameBusWriter, frame_intact, shm_name
+
+SHAPE = (4, 6, 3)
+
+
+def _frame(value: int) -> np.ndarray:
+    return np.full(SHAPE, value, dtype=np.uint8)
+
+
+def _make_stale(writer: FrameBusWriter):
+    writer.block.times[frame_bus._T_HEARTBEAT] = time.time() - frame_bus.STALE_SECONDS - 1
+
+
+@pytest.fixture
+def bus():
+    """A fresh bus name; whatever is published under it is closed afterwards."""
+    name = f"test-{uuid.uuid4().hex[:8]}"
+    opened = []
+
+    def open_writer(slots: int = 3) -> FrameBusWriter:
+        writer = FrameBusWriter(name, SHAPE, fps=25.0, slots=slots)
+        opened.append(writer)
+        return writer
+
+    yield name, open_writer
+    for writer in reversed(opened):
+        writer.close()
+
+
+def test_reader_sees_published_frames(bus):
+    name, open_writer = bus
+    writer = open_writer()
+    reader = FrameBusReader(name)
+    try:
+        assert reader.latest() is None
+        writer.publish(_frame(1), timestamp=10.0)
+        seq, timestamp, view = reader.wait_next(timeout=0.1)
+        assert (seq, timestamp) == (1, 10.0)
+        assert (view == 1).all()
+        assert not view.flags.writeable
+        assert reader.fps == 25.0
+        assert reader.wait_next(timeout=0.01) is None  # nothing newer yet
+        del view
+    finally:
+        reader.close()
+
+
+def test_lapped_frames_are_no_longer_valid(bus):
+    name, open_writer = bus
+    writer = open_writer(slots=3)
+    reader = FrameBusReader(name)
+    try:
+        writer.publish(_frame(1))
+        seq, _, view = reader.latest()
+        writer.publish(_frame(2))
+        assert reader.valid(seq)  # other slot
+        writer.publish(_frame(3))
+        writer.publish(_frame(4))  # back in the first frame's slot
+        assert not reader.valid(seq)
+        assert (view == 4).all()
+
+        seq, _, latest = reader.latest()
+        assert seq == 4 and reader.valid(seq)
+        assert (latest == 4).all()
+        del view, latest
+    finally:
+        reader.close()
+
+
+def test_bus_capture_detects_frames_overwritten_while_in_use(bus):
+    name, open_writer = bus
+    writer = open_writer(slots=2)
+    capture = BusCapture(name)
+    try:
+        writer.publish(_frame(1))
+        ok, frame = capture.read()
+        copy = frame.copy()
+        assert ok and frame_intact(capture)
+        writer.publish(_frame(2))
+        writer.publish(_frame(3))
+        assert not frame_intact(capture)
+        assert (copy == 1).all()
+        del frame
+    finally:
+        capture.release()
+
+
+def test_live_publisher_is_not_replaced(bus):
+    name, open_writer = bus
+    open_writer()
+    with pytest.raises(RuntimeError):
+        FrameBusWriter(name, SHAPE)
+
+
+def test_stale_block_is_replaced(bus):
+    name, open_writer = bus
+    old = FrameBusWriter(name, SHAPE, slots=3)
+    old.publish(_frame(1))
+    _make_stale(old)
+
+    new = open_writer(slots=4)
+    old.block.release()  # left behind by a dead publisher; its name now belongs to `new`
+    reader = FrameBusReader(name)
+    try:
+        assert reader.latest() is None
+        assert reader.block.slots == 4
+        new.publish(_frame(2))
+        assert reader.latest()[0] == 1
+    finally:
+        reader.close()
+
+
+def test_reader_close_leaves_the_block(bus):
+    name, open_writer = bus
+    writer = open_writer()
+    FrameBusReader(name).close()
+    writer.publish(_frame(5))
+    reader = FrameBusReader(name)
+    try:
+        assert reader.latest()[0] == 1
+    finally:
+        reader.close()
+
+
+def test_bus_capture_stops_when_the_publisher_goes_stale(bus):
+    name, open_writer = bus
+    writer = open_writer()
+    capture = BusCapture(name)
+    try:
+        writer.publish(_frame(1))
+        assert capture.read()[0]
+        writer.publish(_frame(2))
+        _make_stale(writer)
+        assert capture.read() == (False, None)
+    finally:
+        capture.release()
+
+
+def test_missing_bus_is_not_opened():
+    capture = BusCapture(f"missing-{uuid.uuid4().hex[:8]}")
+    assert not capture.isOpened()
+    assert capture.read() == (False, None)
+    assert shm_name("x") == "hearyou-frames-x"
+
+
+def test_bus_capture_reports_the_publisher_fps(bus):
+    cv2 = pytest.importorskip("cv2")
+    name, open_writer = bus
+    open_writer()
+    capture = BusCapture(name)
+    try:
+        assert capture.get(cv2.CAP_PROP_FPS) == 25.0
+        assert capture.get(cv2.CAP_PROP_FRAME_WIDTH) == 0.0
+    finally:
+        capture.release()
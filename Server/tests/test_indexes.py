@@ -0,0 +1,27 @@
+import mongomock
+from mongomock.collection import Collection
+from pymongo.errors import OperationFailure
+
+import indexes
+
+
+def test_conflicting_index_does_not_stop_the_rest(monkeypatch):
+    db = mongomock.MongoClient()["hearyou"]
+    original = Collection.create_indexes
+
+    def create_indexes(self, models, *args, **kwargs):
+        if models[0].document["name"] == "expiresAt_ttl":
+            raise OperationFailure("Index with name: expiresAt_ttl already exists with different options", code=85)
+        return original(self, models, *args, **kwargs)
+
+    monkeypatch.setattr(Collection, "create_indexes", create_indexes)
+    assert indexes.ensure_indexes(db) == ["event_dedupe.expiresAt_ttl"]
+    assert "status_lockedUntil" in db["notification_outbox"].index_information()
+
+
+def test_route_queries_come_from_the_route_builders():
+    db = mongomock.MongoClient()["hearyou"]
+    queries = indexes._route_queries(db)
+    assert {"GET /events/rollups", "GET /events/stream?uid (replay)", "NotificationWorker.claim"} <= set(queries)
+    for name, cursor in queries.items():
+        list(cursor)  # each one is a runnable query
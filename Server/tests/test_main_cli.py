@@ -0,0 +1,34 @@
+import pytest
+
+pytest.importorskip("cv2")  # main imports movement_pipeline
+
+import camera_paths  # noqa: E402
+import main  # noqa: E402
+from movement_service import CameraSpec  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def elsewhere(tmp_path, monkeypatch):
+    # The CLI's paths must not depend on the configured media/output dirs
+    monkeypatch.setattr(camera_paths, "CAMERA_MEDIA_DIR", str(tmp_path / "media"))
+    monkeypatch.setattr(camera_paths, "CAMERA_OUTPUT_DIR", str(tmp_path / "annotated"))
+
+
+def test_default_spec_opens_the_bundled_sample():
+    spec = main.preview_spec(main.parse_args([]))
+
+    assert spec.source_path == main.video_path
+    assert spec.is_file
+
+
+def test_absolute_annotate_path_is_kept(tmp_path):
+    target = str(tmp_path / "out.mp4")
+
+    spec = main.preview_spec(main.parse_args(["--source", "0", "--annotate", target]))
+
+    assert spec.annotate_path == target
+
+
+def test_same_paths_are_rejected_from_config():
+    with pytest.raises(ValueError):
+        CameraSpec({"id": "preview", "source": main.video_path})
@@ -1,13 +1,15 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
 from flask import Blueprint, current_app, jsonify, request
 from bson import ObjectId
 
+from event_rollups import ROLLUPS_COLLECTION, bucket_start, rollup_id, weekly_summary
+
 
 weekly_reports_bp = Blueprint("weekly_reports_bp", __name__)
 
 
-def _serialize_report(doc: dict) -> dict:
+def serialize_report(doc: dict) -> dict:
     created_at = (
         doc.get("generatedAt")
         or doc.get("createdAt")
@@ -44,14 +46,7 @@ def _serialize_report(doc: dict) -> dict:
     }
 
 
-@weekly_reports_bp.route("/", methods=["GET"])  
-def list_weekly_reports():
-    db = current_app.config.get("DB")
-    coll = db["weekly_reports"]
-    user_id = request.args.get("userId", "").strip()
-    email = request.args.get("email", "").strip().lower()
-
-    query = {}
+def build_reports_query(user_id: str, email: str) -> dict:
     ors = []
     if user_id:
         ors.append({"userId": user_id})
@@ -67,13 +62,42 @@ def list_weekly_reports():
             pass
     if email:
         ors.append({"email": email})
+    return {"$or": ors} if ors else {}
+
 
-    if ors:
-        query = {"$or": ors}
+@weekly_reports_bp.route("/", methods=["GET"])  
+def list_weekly_reports():
+    db = current_app.config.get("DB")
+    coll = db["weekly_reports"]
+    user_id = request.args.get("userId", "").strip()
+    email = request.args.get("email", "").strip().lower()
+    query = build_reports_query(user_id, email)
 
     items = list(coll.find(query).sort("createdAt", -1))
     if not items:
         items = list(coll.find({}).sort("createdAt", -1).limit(20))
-    return jsonify({"ok": True, "reports": [_serialize_report(x) for x in items]})
+    return jsonify({"ok": True, "reports": [serialize_report(x) for x in items]})
+
 
+def summary_week(args) -> tuple[str, datetime]:
+    """(uid, week start) for GET /weekly_reports/summary; raises ValueError on bad input."""
+    uid = (args.get("userId") or args.get("uid") or "").strip()
+    week = (args.get("weekStart") or "").strip()
+    try:
+        day = datetime.fromisoformat(week.replace("Z", "+00:00")) if week else datetime.now(timezone.utc)
+    except ValueError:
+        raise ValueError("weekStart must be an ISO-8601 date")
+    return uid, bucket_start(day, "week")
 
+
+@weekly_reports_bp.route("/summary", methods=["GET"])
+def weekly_report_summary():
+    db = current_app.config.get("DB")
+    try:
+        uid, week_start = summary_week(request.args)
+    except ValueError as exc:
+        return jsonify({"ok": False, "message": str(exc)}), 400
+    coll = db[ROLLUPS_COLLECTION]
+    current = coll.find_one({"_id": rollup_id(uid, "week", week_start)})
+    previous = coll.find_one({"_id": rollup_id(uid, "week", week_start - timedelta(days=7))})
+    return jsonify({"ok": True, "summary": weekly_summary(uid, week_start, current, previous)})
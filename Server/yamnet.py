@@ -0,0 +1,141 @@
+"""YAMNet loading and inference shared by audio.py and inference_server.py.
+
+The model is served from a local SavedModel store (YAMNET_MODEL_DIR, default
+Server/models/yamnet) so detectors start without network access. Populate it
+once while online:
+
+    python yamnet.py --fetch
+"""
+import os
+import csv
+import json
+import time
+import shutil
+import argparse
+
+import numpy as np
+import tensorflow as tf
+
+from audio_backends import CLASS_CACHE_FILE, YAMNET_MODEL_DIR as MODEL_DIR, AudioBackend
+
+
+YAMNET_HANDLE = "https://tfhub.dev/google/yamnet/1"
+SAMPLE_RATE = 16000
+PATCH_SAMPLES = 15360  # 0.96 s, one YAMNet patch
+PATCH_HOP_SAMPLES = 7680  # YAMNet frames patches every 0.48 s
+
+
+def fetch_model(model_dir: str = MODEL_DIR, handle: str = YAMNET_HANDLE) -> str:
+    """Copies the TF-Hub SavedModel into ``model_dir`` (the only step that needs network)."""
+    import tensorflow_hub as hub
+
+    print(f"⬇️ Fetching YAMNet from {handle}...")
+    src = hub.resolve(handle)
+    tmp = model_dir + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    shutil.copytree(src, tmp)
+    shutil.rmtree(model_dir, ignore_errors=True)
+    os.replace(tmp, model_dir)
+    print(f"✅ YAMNet stored in {model_dir}")
+    return model_dir
+
+
+def resolve_model_dir(model_dir: str = MODEL_DIR) -> str:
+    if os.path.exists(os.path.join(model_dir, "saved_model.pb")):
+        return model_dir
+    try:
+        return fetch_model(model_dir)
+    except Exception as exc:
+        raise RuntimeError(
+            f"No YAMNet SavedModel in {model_dir} and it could not be downloaded ({exc}). "
+            "Run `python yamnet.py --fetch` on a connected machine and copy the directory, "
+            "or point YAMNET_MODEL_DIR at an existing copy."
+        ) from exc
+
+
+def _parse_class_map(class_map_path: str) -> list[str]:
+    with open(class_map_path, "r", newline="") as f:
+        rows = csv.reader(f)
+        next(rows)
+        return [row[2] for row in rows if len(row) >= 3]
+
+
+def load_class_names(model, model_dir: str) -> list[str]:
+    cache_path = os.path.join(model_dir, CLASS_CACHE_FILE)
+    try:
+        with open(cache_path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+    class_names = _parse_class_map(model.class_map_path().numpy().decode("utf-8"))
+    try:
+        with open(cache_path, "w") as f:
+            json.dump(class_names, f)
+    except OSError:
+        pass  # read-only store; parse again next time
+    return class_names
+
+
+class YamnetModel(AudioBackend):
+    name = "tf"
+
+    def __init__(self, model_dir: str = MODEL_DIR, warmup: bool = True):
+        started = time.perf_counter()
+        model_dir = resolve_model_dir(model_dir)
+
+        print("🔄 Loading YAMNet model...")
+        t0 = time.perf_counter()
+        self.model = tf.saved_model.load(model_dir)
+        t1 = time.perf_counter()
+        self.class_names = load_class_names(self.model, model_dir)
+        t2 = time.perf_counter()
+        if warmup:
+            # The first call traces the graph; pay for it before audio arrives
+            self.scores(np.zeros(PATCH_SAMPLES, dtype=np.float32))
+        t3 = time.perf_counter()
+
+        self.startup_timings = {
+            "load": t1 - t0,
+            "classes": t2 - t1,
+            "warmup": t3 - t2,
+            "total": t3 - started,
+        }
+        print(
+            f"✅ Model loaded in {self.startup_timings['total']:.2f}s "
+            f"(load {t1 - t0:.2f}s, class map {(t2 - t1) * 1000:.1f}ms, warmup {t3 - t2:.2f}s)"
+        )
+
+    def scores(self, samples: np.ndarray) -> np.ndarray:
+        """Per-patch class scores, shape (patches, classes)."""
+        scores, _, _ = self.model(tf.convert_to_tensor(samples, dtype=tf.float32))
+        return scores.numpy()
+
+    def classify_batch(self, windows: list[np.ndarray]) -> list[tuple[str, float, np.ndarray]]:
+        """classify() for many windows, running one model call for the whole batch.
+
+        The hub model only takes a single waveform, so one-patch windows are
+        laid end to end: YAMNet's patch 2k then starts exactly at window k.
+        Each patch also sees the first 15 ms of the following window where a
+        lone call would see zero padding, which does not move the scores in
+        practice. Windows of any other length are run one at a time.
+        """
+        if len(windows) > 1 and all(len(w) == PATCH_SAMPLES for w in windows):
+            scores = self.scores(np.concatenate(windows))
+            return self._classify_rows(scores[0::2][:len(windows)])
+        return [self.classify(w) for w in windows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the local YAMNet model store")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--fetch", action="store_true", help="download (or refresh) the SavedModel")
+    args = parser.parse_args()
+
+    if args.fetch:
+        fetch_model(args.model_dir)
+    model = YamnetModel(args.model_dir)
+    print(f"{len(model.class_names)} classes; startup {json.dumps({k: round(v, 3) for k, v in model.startup_timings.items()})}")
+
+
+if __name__ == "__main__":
+    main()